@@ -47,8 +47,17 @@ const EditRendezVousModal = ({
   useEffect(() => {
     const fetchMedecins = async () => {
       try {
-        const response = await api.get<MedecinType[]>("/medecins");
-        setMedecins(response.data);
+        // Liste paginée côté serveur : on suit X-Next-Cursor jusqu'à la dernière page
+        const tous: MedecinType[] = [];
+        let cursor: string | undefined;
+        do {
+          const response = await api.get<MedecinType[]>("/medecins", {
+            params: { sort: "nom", limit: 500, cursor },
+          });
+          tous.push(...response.data);
+          cursor = response.headers["x-next-cursor"] ?? undefined;
+        } while (cursor);
+        setMedecins(tous);
       } catch (error) {
         console.error(
           "❌ Erreur lors de la récupération des médecins :",
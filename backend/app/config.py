@@ -1,18 +1,159 @@
+import asyncio
+import importlib.util
+import logging
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
 from dotenv import load_dotenv
+from app.services.metrics import mongo_listener
+from app.services.query_recorder import query_recorder
 
 # Charger les variables d'environnement
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-DB_NAME = "bienetre"
+DB_NAME = os.getenv("MONGO_DB_NAME", "bienetre")
+
+# 🔹 Pool de connexions (par worker : à dimensionner selon le nombre de workers gunicorn)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Attente maximale d'une connexion libre dans le pool avant erreur
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+# Compresseurs proposés au serveur, dans l'ordre de préférence (ceux non installés sont ignorés)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+# Connexions ouvertes au démarrage pour ne pas payer l'établissement sur les premières requêtes
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", str(MONGO_MIN_POOL_SIZE or 4)))
+# Préférence de lecture par défaut ; surchargeable par routeur avec MONGO_READ_PREFERENCE_<ROUTEUR>
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def read_preference(variable: str, value: str):
+    """Préférence de lecture pymongo nommée par `value` (lue dans la variable `variable`)."""
+    try:
+        return READ_PREFERENCES[value]
+    except KeyError:
+        raise ValueError(
+            f"{variable}={value!r} invalide ; valeurs possibles : {', '.join(READ_PREFERENCES)}"
+        ) from None
+
+
+def check_read_preferences(environ=os.environ):
+    """Valider MONGO_READ_PREFERENCE et ses variantes par routeur dès le démarrage."""
+    for variable, value in environ.items():
+        if value and (variable == "MONGO_READ_PREFERENCE" or variable.startswith("MONGO_READ_PREFERENCE_")):
+            read_preference(variable, value)
+
+
+check_read_preferences()
+
+# Module Python requis par chaque compresseur
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors(requested: str = MONGO_COMPRESSORS) -> list[str]:
+    compressors = []
+    for name in (c.strip() for c in requested.split(",") if c.strip()):
+        module = COMPRESSOR_MODULES.get(name)
+        if module and importlib.util.find_spec(module) is not None:
+            compressors.append(name)
+    return compressors
+
+
+class Database:
+    """Client Motor du worker et base `bienetre`.
+
+    Le client est créé au premier usage dans le processus (après un éventuel
+    fork de gunicorn), préchauffé par `start()` et fermé par `close()` dans
+    le lifespan de l'application. `db["collection"]` et les autres attributs
+    de la base Motor restent utilisables directement.
+    """
+
+    def __init__(self, url: str = MONGO_URL, name: str = DB_NAME, listeners=()):
+        self.url = url
+        self.name = name
+        self.client = None
+        self._database = None
+        self._routed = {}
+        self.ready = False
+        # CommandListener pymongo, passés au client à sa création
+        self.listeners = list(listeners)
+
+    def add_listener(self, listener):
+        """Enregistrer un CommandListener ; impossible une fois le client créé (il ne le verrait pas)."""
+        if self.client is not None:
+            raise RuntimeError("Client MongoDB déjà créé : enregistrer les listeners avant le premier accès à la base")
+        self.listeners.append(listener)
+
+    def client_options(self) -> dict:
+        options = {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+            "read_preference": read_preference("MONGO_READ_PREFERENCE", MONGO_READ_PREFERENCE),
+            "event_listeners": list(self.listeners),
+        }
+        compressors = available_compressors()
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+        return options
+
+    @property
+    def database(self):
+        if self._database is None:
+            self.client = AsyncIOMotorClient(self.url, **self.client_options())
+            self._database = self.client[self.name]
+        return self._database
+
+    def __getitem__(self, collection: str):
+        return self.database[collection]
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.database, attribute)
+
+    def for_reads(self, router: str):
+        """Base à utiliser pour les lectures d'un routeur (MONGO_READ_PREFERENCE_MEDECINS=secondaryPreferred…)."""
+        database = self.database
+        variable = f"MONGO_READ_PREFERENCE_{router.upper()}"
+        preference = os.getenv(variable)
+        if not preference:
+            return database
+        if router not in self._routed:
+            self._routed[router] = self.client.get_database(
+                self.name, read_preference=read_preference(variable, preference)
+            )
+        return self._routed[router]
+
+    async def ping(self):
+        await self.database.command("ping")
+
+    async def start(self):
+        """Vérifier la connexion et ouvrir quelques connexions d'avance."""
+        await self.ping()
+        await asyncio.gather(*(self.ping() for _ in range(MONGO_WARMUP_CONNECTIONS)))
+        logger.info(f"🍃 MongoDB prêt ({MONGO_WARMUP_CONNECTIONS} connexion(s) préchauffée(s))")
+
+    def close(self):
+        self.ready = False
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self._database = None
+        self._routed = {}
 
-# Connexion à MongoDB
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
 
-# Collections
-users_collection = db["users"]  # Collection des utilisateurs
-patients_collection = db["patients"]  # Collection des patients
-appointments_collection = db["appointments"]  # Collection des rendez-vous
+# Connexion à MongoDB ; métriques et budgets de requêtes écoutent toutes les commandes
+db = Database(listeners=[mongo_listener, query_recorder])
@@ -0,0 +1,41 @@
+# app/features.py
+"""Sous-systèmes optionnels et leurs dépendances.
+
+Chaque fonctionnalité s'active avec une variable d'environnement (activée
+par défaut) et n'est effectivement disponible que si ses dépendances sont
+installées. La vérification utilise `importlib.util.find_spec`, qui ne
+charge pas le module : démarrer un worker ne coûte rien tant que la
+fonctionnalité n'est pas utilisée.
+"""
+import importlib.util
+import logging
+import os
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# nom : (variable d'environnement, modules requis)
+FEATURES = {
+    "face_login": ("FEATURE_FACE_LOGIN", ["numpy", "cv2", "face_recognition"]),
+    "chatbot_llm": ("FEATURE_CHATBOT_LLM", ["openai", "httpx"]),
+    "assistant_ia": ("FEATURE_ASSISTANT_IA", ["httpx"]),
+}
+
+
+def _installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+@lru_cache(maxsize=None)
+def enabled(name: str) -> bool:
+    variable, modules = FEATURES[name]
+    if os.getenv(variable, "true").lower() in ("0", "false", "no"):
+        return False
+    missing = [m for m in modules if not _installed(m)]
+    if missing:
+        logger.warning(f"⚠️ Fonctionnalité '{name}' désactivée : modules absents ({', '.join(missing)})")
+        return False
+    return True
@@ -0,0 +1,75 @@
+# app/importtime.py
+"""Budget de temps d'import de l'application.
+
+    python -m app.importtime check
+
+importe `app.main` dans un interpréteur neuf avec `python -X importtime`,
+échoue si le temps cumulé dépasse le budget ou si un module lourd (ML, SDK)
+est chargé dès l'import au lieu de l'être à la première utilisation.
+"""
+import os
+import subprocess
+import sys
+
+# Temps d'import maximal de app.main (millisecondes)
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+# Modules qui ne doivent être importés qu'à la demande
+LAZY_MODULES = ["numpy", "cv2", "dlib", "face_recognition", "openai", "httpx", "requests"]
+
+TARGET = "app.main"
+
+
+def measure(target: str = TARGET, prelude: str = ""):
+    """Retourner (durées cumulées en µs par module, modules chargés) pour un import à froid.
+
+    `prelude` est exécuté avant l'import mesuré (ex: modules factices pour les tests).
+    """
+    code = f"{prelude}\nimport sys, {target}; print(','.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import échoué")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # Format : "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumul, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumul)
+    return cumulative, set(result.stdout.strip().split(","))
+
+
+def _check():
+    cumulative, loaded = measure()
+    total_ms = cumulative.get(TARGET, 0) / 1000
+    eager = [m for m in LAZY_MODULES if m in loaded]
+
+    slowest = sorted(
+        ((us, name) for name, us in cumulative.items() if "." not in name or name.startswith("app.")),
+        reverse=True,
+    )[:10]
+    for us, name in slowest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if total_ms > IMPORT_TIME_BUDGET_MS:
+        print(f"❌ Import de {TARGET} : {total_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+        failed = True
+    for module in eager:
+        print(f"❌ Module importé au démarrage au lieu d'à la demande : {module}")
+        failed = True
+    if failed:
+        return 1
+    print(f"✅ Import de {TARGET} : {total_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["check"]:
+        print("Usage : python -m app.importtime check")
+        sys.exit(2)
+    sys.exit(_check())
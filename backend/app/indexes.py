@@ -0,0 +1,275 @@
+# app/indexes.py
+"""Registre des index MongoDB requis par les routes.
+
+Chaque requête fréquente de `app/routes` déclare ici l'index qui la sert et
+une forme de requête représentative. Les index sont créés au démarrage
+(voir `lifespan` dans `app/main.py`) et la commande
+
+    python -m app.indexes check
+
+exécute `explain()` sur chaque forme enregistrée et échoue si l'une d'elles
+produit un COLLSCAN.
+
+Un index existant qui diffère de celui du registre (autre nom, unicité,
+filtre partiel, TTL…) n'est jamais supprimé au démarrage : le conflit est
+journalisé et l'application reste non prête. Après vérification,
+
+    python -m app.indexes migrate
+
+remplace les index en conflit, sous bail, par un seul processus.
+"""
+import asyncio
+import logging
+import sys
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.services.leases import MIGRATION_LEASE_SECONDS, acquire, release
+from app.services.llm_cache import LLM_CACHE_TTL_SECONDS
+from app.services.chat_sessions import CHAT_TEMP_TTL_SECONDS
+from app.services.face_index import FACE_EVENTS_COLLECTION, FACE_EVENTS_TTL_SECONDS
+from app.services.outbox import OUTBOX_SENT_TTL_SECONDS, OUTBOX_DEAD_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Index existant sous un autre nom / même nom avec une autre définition
+INDEX_OPTIONS_CONFLICT = 85
+INDEX_KEY_SPECS_CONFLICT = 86
+INDEX_MIGRATION_LEASE = "indexes:migrate"
+
+
+class IndexConflict(Exception):
+    """Des index existants diffèrent du registre ; `python -m app.indexes migrate` les remplace."""
+
+    def __init__(self, conflicts: list):
+        names = ", ".join(f"{collection}.{model.document['name']}" for collection, model in conflicts)
+        super().__init__(
+            f"{len(conflicts)} index en conflit ({names}) : vérifier puis exécuter `python -m app.indexes migrate`"
+        )
+        self.conflicts = conflicts
+
+# 🔹 Index par collection
+INDEXES = {
+    "rendezvous": [
+        # get_occupees, get_heures_occupees, créneaux libres
+        IndexModel([("medecin_id", ASCENDING), ("date", ASCENDING), ("heure", ASCENDING)], name="medecin_date_heure"),
+        # Réservation : l'insertion échoue si un rendez-vous actif occupe déjà le créneau
+        IndexModel(
+            [("medecin_id", ASCENDING), ("date", ASCENDING), ("heure", ASCENDING), ("slot_actif", ASCENDING)],
+            name="creneau_actif_unique",
+            unique=True,
+            partialFilterExpression={"slot_actif": True},
+        ),
+        # get_rendezvous : branche patient du $or (la branche médecin utilise l'index ci-dessus)
+        IndexModel([("patient_id", ASCENDING), ("date", ASCENDING)], name="patient_date"),
+        # archive_once : sélection des rendez-vous au-delà de l'horizon
+        IndexModel([("date", ASCENDING)], name="date"),
+    ],
+    # get_rendezvous?include_archive=true
+    "rendezvous_archive": [
+        IndexModel([("patient_id", ASCENDING), ("date", ASCENDING)], name="patient_date"),
+        IndexModel([("medecin_id", ASCENDING), ("date", ASCENDING)], name="medecin_date"),
+    ],
+    "chat_history_archive": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "disponibilites": [
+        IndexModel([("medecin_id", ASCENDING), ("jour", ASCENDING)], name="medecin_jour"),
+    ],
+    "dossiersmedicaux": [
+        # Pagination par (date_visite, _id) décroissants, filtres de période et export
+        IndexModel([("patient_id", ASCENDING), ("date_visite", DESCENDING), ("_id", DESCENDING)],
+                   name="patient_date_visite"),
+        IndexModel([("medecin_id", ASCENDING), ("date_visite", DESCENDING), ("_id", DESCENDING)],
+                   name="medecin_date_visite"),
+    ],
+    "patients": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Listes paginées triées par nom normalisé (keyset sur nom_normalise, _id) et recherche par préfixe
+        IndexModel([("nom_normalise", ASCENDING), ("_id", ASCENDING)], name="nom_normalise_id"),
+        IndexModel([("genre", ASCENDING), ("nom_normalise", ASCENDING), ("_id", ASCENDING)],
+                   name="genre_nom_normalise_id"),
+    ],
+    "medecins": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("nom_normalise", ASCENDING), ("_id", ASCENDING)], name="nom_normalise_id"),
+        IndexModel([("specialite", ASCENDING), ("nom_normalise", ASCENDING), ("_id", ASCENDING)],
+                   name="specialite_nom_normalise_id"),
+    ],
+    "contacts": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "adresses": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    # Collections interrogées par app/routes/contacts.py et app/routes/adresses.py
+    "Contacts": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "Adresses": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "allergies": [IndexModel([("user_id", ASCENDING)], name="user_id")],
+    "chat_temp": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("updated_at", ASCENDING)], name="ttl_updated_at", expireAfterSeconds=CHAT_TEMP_TTL_SECONDS),
+    ],
+    "notifications_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        # Les messages traités ne s'accumulent pas (adresses e-mail conservées au plus N jours)
+        IndexModel([("sent_at", ASCENDING)], name="ttl_sent_at", expireAfterSeconds=OUTBOX_SENT_TTL_SECONDS),
+        IndexModel([("dead_at", ASCENDING)], name="ttl_dead_at", expireAfterSeconds=OUTBOX_DEAD_TTL_SECONDS),
+    ],
+    "llm_cache": [
+        IndexModel([("created_at", ASCENDING)], name="ttl_created_at", expireAfterSeconds=LLM_CACHE_TTL_SECONDS),
+    ],
+    # Synchronisation de l'index facial entre workers (FaceIndex.sync)
+    FACE_EVENTS_COLLECTION: [
+        IndexModel([("at", ASCENDING)], name="ttl_at", expireAfterSeconds=FACE_EVENTS_TTL_SECONDS),
+    ],
+    "UserPatients": [IndexModel([("username", ASCENDING)], name="username")],
+    "UserMedecins": [IndexModel([("username", ASCENDING)], name="username")],
+    "admins": [IndexModel([("username", ASCENDING)], name="username")],
+}
+
+# 🔹 Formes de requêtes à vérifier : (route, collection, filtre)
+QUERY_SHAPES = [
+    ("reservations.backfill_active_slots", "rendezvous",
+     {"medecin_id": "m", "date": "2025-01-01", "heure": "09:00", "slot_actif": True}),
+    ("rendezvous.get_occupees", "rendezvous",
+     {"medecin_id": "m", "date": "2025-01-01", "statut": {"$ne": "Annulé"}}),
+    ("availability.booked_masks", "rendezvous",
+     {"medecin_id": "m", "date": {"$gte": "2025-01-01", "$lte": "2025-01-31"}, "statut": {"$ne": "Annulé"}}),
+    ("rendezvous.get_rendezvous", "rendezvous",
+     {"$or": [{"patient_id": "u"}, {"medecin_id": "u"}]}),
+    ("rendezvous.get_rendezvous", "rendezvous_archive",
+     {"$or": [{"patient_id": "u"}, {"medecin_id": "u"}]}),
+    ("archive.archive_once", "rendezvous",
+     {"date": {"$lt": "2024-01-01"}, "$or": [{"statut": {"$in": ["Annulé", "Terminé"]}}, {"visite_faite": True}]}),
+    ("disponibilites.get_disponibilites_for_day", "disponibilites",
+     {"medecin_id": "m", "jour": "lundi"}),
+    ("dossiersmedicaux.get_dossiers_by_patient", "dossiersmedicaux", {"patient_id": "p"}),
+    ("dossiersmedicaux.get_dossiers_by_medecin", "dossiersmedicaux", {"medecin_id": "m"}),
+    ("patients.get_patient", "patients", {"user_id": "u"}),
+    ("patients.get_patient", "adresses", {"user_id": "u"}),
+    ("patients.get_patient", "contacts", {"user_id": "u"}),
+    ("medecins.get_medecin_full_profile", "medecins", {"user_id": "u"}),
+    ("medecins.get_medecins", "medecins", {"specialite": "Cardiologie"}),
+    ("patients.get_all_patients", "patients", {"nom_normalise": {"$regex": "^dup"}}),
+    ("medecins.get_medecins", "medecins", {"nom_normalise": {"$regex": "^mar"}}),
+    ("contacts.get_contact", "Contacts", {"user_id": "u"}),
+    ("adresses.get_address", "Adresses", {"user_id": "u"}),
+    ("allergies.get_allergies", "allergies", {"user_id": "u"}),
+    ("chatbot.chat_with_bot", "chat_temp", {"user_id": "u"}),
+    ("outbox.dispatch_once", "notifications_outbox", {"status": "pending"}),
+    ("face_index.sync", FACE_EVENTS_COLLECTION, {"at": {"$gt": "2025-01-01"}}),
+    ("auth.login", "UserPatients", {"username": "u"}),
+    ("auth.login", "UserMedecins", {"username": "u"}),
+    ("auth.admin_login", "admins", {"username": "u"}),
+]
+
+
+def _key(keys) -> list:
+    return [(field, int(direction) if isinstance(direction, float) else direction) for field, direction in keys]
+
+
+async def _replace_conflicting(collection, model: IndexModel):
+    """Supprimer l'index qui porte le même nom ou les mêmes clés, puis créer celui du registre."""
+    spec = model.document
+    existing = await collection.index_information()
+    for name, info in existing.items():
+        if name == "_id_":
+            continue
+        if name == spec["name"] or _key(info["key"]) == _key(spec["key"].items()):
+            logger.warning(f"⚠️ Index '{name}' de {collection.name} remplacé par '{spec['name']}'")
+            await collection.drop_index(name)
+    await collection.create_indexes([model])
+
+
+async def ensure_indexes(db):
+    """Créer (de façon idempotente) tous les index déclarés.
+
+    Les index sans conflit sont tous créés ; un index existant qui diffère
+    de celui du registre est laissé en place et signalé par IndexConflict.
+    """
+    conflicts = []
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            if e.code not in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                raise
+            for model in models:
+                try:
+                    await db[collection].create_indexes([model])
+                except OperationFailure as e:
+                    if e.code not in (INDEX_OPTIONS_CONFLICT, INDEX_KEY_SPECS_CONFLICT):
+                        raise
+                    logger.error(f"❌ Index '{model.document['name']}' de {collection} en conflit : {e.details.get('errmsg', e)}")
+                    conflicts.append((collection, model))
+    if conflicts:
+        raise IndexConflict(conflicts)
+
+
+async def migrate_indexes(db) -> list:
+    """Remplacer les index en conflit par ceux du registre (étape explicite, un seul processus).
+
+    Retourne la liste (collection, index) des index remplacés.
+    """
+    if not await acquire(INDEX_MIGRATION_LEASE, MIGRATION_LEASE_SECONDS):
+        raise RuntimeError("Migration des index déjà en cours dans un autre processus")
+    try:
+        try:
+            await ensure_indexes(db)
+            return []
+        except IndexConflict as e:
+            for collection, model in e.conflicts:
+                await _replace_conflicting(db[collection], model)
+            return e.conflicts
+    finally:
+        await release(INDEX_MIGRATION_LEASE)
+
+
+def _stages(plan):
+    """Parcourir récursivement les étapes d'un plan d'exécution."""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for sub in plan.get("inputStages", []):
+        yield from _stages(sub)
+
+
+async def find_collscans(db):
+    """Retourner les formes de requêtes dont le plan gagnant contient un COLLSCAN."""
+    failures = []
+    for route, collection, query in QUERY_SHAPES:
+        explanation = await db[collection].find(query).explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _stages(winning_plan):
+            failures.append((route, collection, query))
+    return failures
+
+
+async def _check():
+    from app.config import db
+
+    await ensure_indexes(db)
+    failures = await find_collscans(db)
+    for route, collection, query in failures:
+        print(f"❌ COLLSCAN : {route} sur '{collection}' avec {query}")
+    if failures:
+        return 1
+    print(f"✅ {len(QUERY_SHAPES)} formes de requêtes servies par un index")
+    return 0
+
+
+async def _migrate():
+    from app.config import db
+
+    replaced = await migrate_indexes(db)
+    for collection, model in replaced:
+        print(f"🔁 Index '{model.document['name']}' de {collection} remplacé")
+    print(f"✅ Index conformes au registre ({len(replaced)} remplacé(s))")
+    return 0
+
+
+COMMANDS = {"check": _check, "migrate": _migrate}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        print("Usage : python -m app.indexes check|migrate")
+        sys.exit(2)
+    sys.exit(asyncio.run(COMMANDS[sys.argv[1]]()))
@@ -1,6 +1,27 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, medecins, usermedecins, rendezvous, patients, userpatients, facial, admin
+from app import features
+from app.config import db
+from app.indexes import IndexConflict, ensure_indexes
+from app.services.reservations import backfill_active_slots
+from app.services.visits import migrate_visites
+from app.services.leases import run_once
+from app.services.pagination import backfill_search_keys
+from app.services.face_index import face_index
+from app.services.face_encoder import face_encoder
+from app.services.outbox import run_dispatcher
+from app.services.archive import run_archiver
+from app.services.llm import ollama
+from app.services.openai_chat import openai_chat
+from app.services.chat_sessions import chat_sessions
+from app.services.metrics import MetricsMiddleware, registry, track_outbound
+from app.services.query_recorder import QueryRecorderMiddleware
+from app.routes import auth, medecins, usermedecins, rendezvous, patients, userpatients, admin
 from app.routes.chatbot import router as chatbot_router
 from app.routes.adresses import router as adresses_router  
 from app.routes.contacts import router as contacts_router  
@@ -8,17 +29,65 @@ from app.routes import visites
 from app.routes import allergies
 from app.routes import disponibilites
 from app.routes import mental 
-from app.routes import assistant_ia
 from app.routes import dossiersmedicaux
 
 
 
+logger = logging.getLogger(__name__)
+
+# Délai entre deux tentatives de connexion à MongoDB au démarrage
+MONGO_RETRY_SECONDS = float(os.getenv("MONGO_RETRY_SECONDS", "5"))
+
+
+async def prepare_database():
+    """Connexion, migrations et index ; /ready répond 503 tant que ce n'est pas terminé."""
+    while True:
+        try:
+            await db.start()
+            await backfill_active_slots()
+            await migrate_visites()
+            await run_once("nom_normalise", lambda: backfill_search_keys(db))
+            await ensure_indexes(db)
+            if features.enabled("face_login"):
+                await face_index.load(db)
+            db.ready = True
+            return
+        except asyncio.CancelledError:
+            raise
+        except IndexConflict as e:
+            # Rien n'est supprimé automatiquement : l'application reste non prête jusqu'à la migration
+            logger.error(f"❌ {e} ; nouvelle vérification dans {MONGO_RETRY_SECONDS:.0f} s")
+            await asyncio.sleep(MONGO_RETRY_SECONDS)
+        except Exception as e:
+            logger.error(f"❌ MongoDB indisponible, nouvelle tentative dans {MONGO_RETRY_SECONDS:.0f} s : {e}")
+            await asyncio.sleep(MONGO_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preparation = asyncio.create_task(prepare_database())
+    tasks = [asyncio.create_task(run_dispatcher()), asyncio.create_task(run_archiver())]
+    if features.enabled("face_login"):
+        face_encoder.start()
+        tasks.append(asyncio.create_task(face_index.run_sync()))
+    yield
+    preparation.cancel()
+    for task in tasks:
+        task.cancel()
+    await ollama.aclose()
+    await openai_chat.aclose()
+    await chat_sessions.flush()
+    face_encoder.shutdown()
+    db.close()
+
+
 app = FastAPI(
     title="BienEtre API",
     description="API pour l'authentification et la gestion des patients et des médecins",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 origines = [
@@ -35,14 +104,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing", "Retry-After"],
 )
+# Ajouté en dernier : englobe toute la pile, y compris CORS
+app.add_middleware(QueryRecorderMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/auth", tags=["Authentification"])
 app.include_router(medecins.router, prefix="/medecins", tags=["Médecins"])
 app.include_router(rendezvous.router, prefix="/rendezvous", tags=["Rendez-vous"])
 app.include_router(patients.router, prefix="/patients", tags=["Patients"])
 app.include_router(userpatients.router, prefix="/userpatients", tags=["Utilisateurs Patients"])
-app.include_router(facial.router, prefix="/facial", tags=["Reconnaissance Faciale"])
 app.include_router(admin.router, prefix="/admin", tags=["Administrateurs"])
 app.include_router(chatbot_router, prefix="/api", tags=["Chatbox"])
 app.include_router(adresses_router, prefix="/adresses", tags=["Adresses"])  
@@ -52,9 +124,18 @@ app.include_router(visites.router, prefix="/visites", tags= ["Visites"])
 app.include_router(allergies.router, prefix="/allergies",tags=["allergies"])
 app.include_router(disponibilites.router, prefix="/disponibilites")
 app.include_router(mental.router, prefix="/mental", tags=["Santé mentale"])
-app.include_router(assistant_ia.router)
 app.include_router(dossiersmedicaux.router, prefix="/dossiersmedicaux", tags=["Dossiers médicaux"])
 
+# 🔹 Sous-systèmes optionnels (voir app/features.py)
+if features.enabled("face_login"):
+    from app.routes import facial
+    app.include_router(facial.router, prefix="/facial", tags=["Reconnaissance Faciale"])
+    app.include_router(facial.login_router, prefix="/auth", tags=["Authentification"])
+
+if features.enabled("assistant_ia"):
+    from app.routes import assistant_ia
+    app.include_router(assistant_ia.router)
+
 
 
 from fastapi.staticfiles import StaticFiles
@@ -72,27 +153,47 @@ async def get_phq9_form():
 
 
 
-import httpx
 from fastapi import Request, HTTPException
 
 @app.post("/mental/phq9")
 async def proxy_phq9(request: Request):
+    import httpx
+
     try:
         payload = await request.json()
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://screening.mhanational.org/api/v1/phq9/",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
+        with track_outbound("phq9"):
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    "https://screening.mhanational.org/api/v1/phq9/",
+                    json=payload,
+                    headers={"Content-Type": "application/json"},
+                    timeout=10
+                )
 
         return response.json()
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques au format texte Prometheus."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+async def ready():
+    """Prêt à recevoir du trafic : MongoDB joignable et index créés."""
+    if not db.ready:
+        return JSONResponse(status_code=503, content={"ready": False, "detail": "Initialisation de MongoDB en cours"})
+    try:
+        await db.ping()
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"ready": False, "detail": str(e)})
+    return {"ready": True}
+
+
 @app.get("/")
 async def root():
     return {"message": "Bienvenue sur l'API BienEtre"}
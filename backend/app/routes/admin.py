@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
 from pydantic import BaseModel
 from bson import ObjectId
 from datetime import datetime
 from app.config import db
-from app.services.security import verify_password, hash_password
+from app.services.passwords import verify_and_update, hash_password
 from app.utils import create_access_token
-from app.routes.auth import get_current_user
+from app.routes.auth import get_current_user, require_admin
+from app.services.bulk_import import import_stream, guess_format
+from typing import Literal, Optional
 
 router = APIRouter()
 
@@ -22,11 +24,18 @@ class AdminCreate(BaseModel):
 @router.post("/admin-login")
 async def admin_login(admin: AdminLogin):
     existing_admin = await db["admins"].find_one({"username": admin.username})
-    if not existing_admin or not verify_password(admin.password, existing_admin["password"]):
+    if not existing_admin:
         raise HTTPException(status_code=401, detail="Nom d'utilisateur ou mot de passe incorrect.")
 
+    valid, new_hash = await verify_and_update(admin.password, existing_admin["password"])
+    if not valid:
+        raise HTTPException(status_code=401, detail="Nom d'utilisateur ou mot de passe incorrect.")
+    if new_hash:
+        await db["admins"].update_one({"_id": existing_admin["_id"]}, {"$set": {"password": new_hash}})
+
     # ✅ Generar el token JWT
     token = create_access_token({
+        "sub": str(existing_admin["_id"]),
         "user_id": str(existing_admin["_id"]),  
         "user_type": "Admin"
     })
@@ -49,7 +58,7 @@ async def create_admin(admin: AdminCreate):
         raise HTTPException(status_code=400, detail="Nom d'utilisateur déjà utilisé")
 
     # Hasher le mot de passe avant de l'enregistrer
-    hashed_password = hash_password(admin.password)
+    hashed_password = await hash_password(admin.password)
 
     # Créer l'administrateur dans la base de données
     new_admin = {"username": admin.username, "password": hashed_password}
@@ -59,4 +68,18 @@ async def create_admin(admin: AdminCreate):
         "message": "Administrateur créé avec succès",
         "admin_id": str(result.inserted_id),
         "username": admin.username
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/import/{kind}", tags=["Administrateurs"])
+async def bulk_import(
+    kind: Literal["medecins", "patients"],
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="Déduit de l'extension si absent"),
+    admin=Depends(require_admin),
+):
+    """📥 Importer en masse des médecins ou des patients depuis un fichier CSV ou JSONL.
+
+    Les lignes en erreur sont listées dans le rapport sans interrompre l'import.
+    """
+    return await import_stream(kind, file.file, format or guess_format(file.filename))
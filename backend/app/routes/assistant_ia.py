@@ -1,90 +1,153 @@
-from fastapi import APIRouter, Body, HTTPException
-import requests
+from fastapi import APIRouter, Body, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.services.llm import ollama, ndjson_stream, LLMError
+from app.services.llm_cache import llm_cache, cache_key
+from app.services.llm_scheduler import llm_scheduler, QueueFull
+from app.routes.auth import require_admin
 
 router = APIRouter()
 
-@router.post("/assistant-ia/")
-def call_medical_model(symptoms: str = Body(..., embed=True)):
-    try:
-        prompt = (
-            "You are an advanced AI medical assistant. Based on the following symptoms, "
-            "provide a probable diagnosis and next steps.\n\n"
-            f"Symptoms: {symptoms}"
-        )
+# Délais par route (secondes)
+ASSISTANT_TIMEOUT = 60
+DIAGNOSTIC_TIMEOUT = 60
+TRAITEMENT_TIMEOUT = 60
+
+
+def prompt_assistant(symptoms: str) -> str:
+    return (
+        "You are an advanced AI medical assistant. Based on the following symptoms, "
+        "provide a probable diagnosis and next steps.\n\n"
+        f"Symptoms: {symptoms}"
+    )
+
+
+def prompt_diagnostic(symptomes: str) -> str:
+    return (
+        "Tu es un assistant médical intelligent. À partir des symptômes ci-dessous, "
+        "fournis un diagnostic médical probable.\n\n"
+        f"Symptômes : {symptomes}"
+    )
+
+
+def prompt_traitement(diagnostic: str) -> str:
+    return (
+        "Tu es un assistant médical intelligent. En te basant sur le diagnostic suivant, "
+        "suggère un traitement médical adapté.\n\n"
+        f"Diagnostic : {diagnostic}"
+    )
 
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "ALIENTELLIGENCE/medicaldiagnostictools", 
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=60
-        )
 
-        result = response.json()
+def _queue_full(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-        # 🧠 Verifica si hay un campo llamado "response" o "message"
-        print("🧠 Réponse brute de l'IA (pour debug):", result)
 
-        generated = result.get("response") or result.get("message")
+async def generate_cached(prompt_fn, text: str, kind: str, timeout: float) -> str:
+    """Réponse du modèle, servie depuis le cache si la même saisie a déjà été traitée."""
+    key = cache_key(ollama.model, prompt_fn, text, symptoms=kind == "diagnostic")
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        return cached
 
-        # También puede venir como lista (algunos modelos)
-        if not generated and isinstance(result, list) and len(result) > 0:
-            generated = result[0].get("response") or result[0].get("message")
+    generated = await llm_scheduler.generate(prompt_fn(text), kind, timeout=timeout)
+    await llm_cache.set(key, generated)
+    return generated
 
-        if not generated or not generated.strip():
-            return {"response": "Pas de réponse utile de l'IA pour cette requête."}
 
-        return {"response": generated.strip()}
+async def _single(text: str):
+    yield text
 
-    except Exception as e:
+
+async def _stream_and_cache(key: str, prompt: str, kind: str, timeout: float):
+    fragments = []
+    async for token in llm_scheduler.stream(prompt, kind, timeout=timeout):
+        fragments.append(token)
+        yield token
+    await llm_cache.set(key, "".join(fragments).strip())
+
+
+async def stream_cached(prompt_fn, text: str, kind: str, timeout: float, field: str) -> StreamingResponse:
+    """Variante en flux : un succès de cache est renvoyé d'un bloc, un échec est mis en cache à la fin.
+
+    L'admission est vérifiée avant d'ouvrir le flux, pour pouvoir répondre 429.
+    """
+    key = cache_key(ollama.model, prompt_fn, text, symptoms=kind == "diagnostic")
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        tokens = _single(cached)
+    else:
+        try:
+            llm_scheduler.admit()
+        except QueueFull as e:
+            raise _queue_full(e)
+        tokens = _stream_and_cache(key, prompt_fn(text), kind, timeout)
+    return StreamingResponse(ndjson_stream(tokens, field), media_type="application/x-ndjson")
+
+
+@router.post("/assistant-ia/")
+async def call_medical_model(symptoms: str = Body(..., embed=True)):
+    try:
+        generated = await llm_scheduler.generate(prompt_assistant(symptoms), "libre", timeout=ASSISTANT_TIMEOUT)
+    except QueueFull as e:
+        raise _queue_full(e)
+    except LLMError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if not generated:
+        return {"response": "Pas de réponse utile de l'IA pour cette requête."}
+
+    return {"response": generated}
+
+
+@router.post("/assistant-ia/stream")
+async def call_medical_model_stream(symptoms: str = Body(..., embed=True)):
+    """Variante en flux : une ligne NDJSON {"response": fragment} par fragment généré."""
+    try:
+        llm_scheduler.admit()
+    except QueueFull as e:
+        raise _queue_full(e)
+    tokens = llm_scheduler.stream(prompt_assistant(symptoms), "libre", timeout=ASSISTANT_TIMEOUT)
+    return StreamingResponse(ndjson_stream(tokens, "response"), media_type="application/x-ndjson")
+
 
 @router.post("/assistant-ia/diagnostic-ia")
-def diagnostiquer(symptomes: str = Body(..., embed=True)):
+async def diagnostiquer(symptomes: str = Body(..., embed=True)):
     try:
-        prompt = (
-            "Tu es un assistant médical intelligent. À partir des symptômes ci-dessous, "
-            "fournis un diagnostic médical probable.\n\n"
-            f"Symptômes : {symptomes}"
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "ALIENTELLIGENCE/medicaldiagnostictools",
-                "prompt": prompt,
-                "stream": False,
-            },
-            timeout=60,
-        )
-        result = response.json()
-        return {"diagnostic": result.get("response", "Pas de réponse utile.")}
-    except Exception as e:
+        generated = await generate_cached(prompt_diagnostic, symptomes, "diagnostic", DIAGNOSTIC_TIMEOUT)
+    except QueueFull as e:
+        raise _queue_full(e)
+    except LLMError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"diagnostic": generated or "Pas de réponse utile."}
+
+
+@router.post("/assistant-ia/diagnostic-ia/stream")
+async def diagnostiquer_stream(symptomes: str = Body(..., embed=True)):
+    return await stream_cached(prompt_diagnostic, symptomes, "diagnostic", DIAGNOSTIC_TIMEOUT, "diagnostic")
 
 
 @router.post("/assistant-ia/traitement-ia")
-def suggerer_traitement(diagnostic: str = Body(..., embed=True)):
+async def suggerer_traitement(diagnostic: str = Body(..., embed=True)):
     try:
-        prompt = (
-            "Tu es un assistant médical intelligent. En te basant sur le diagnostic suivant, "
-            "suggère un traitement médical adapté.\n\n"
-            f"Diagnostic : {diagnostic}"
-        )
-
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "ALIENTELLIGENCE/medicaldiagnostictools",
-                "prompt": prompt,
-                "stream": False,
-            },
-            timeout=60,
-        )
-        result = response.json()
-        return {"traitement": result.get("response", "Pas de réponse utile.")}
-    except Exception as e:
+        generated = await generate_cached(prompt_traitement, diagnostic, "traitement", TRAITEMENT_TIMEOUT)
+    except QueueFull as e:
+        raise _queue_full(e)
+    except LLMError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"traitement": generated or "Pas de réponse utile."}
+
+
+@router.post("/assistant-ia/traitement-ia/stream")
+async def suggerer_traitement_stream(diagnostic: str = Body(..., embed=True)):
+    return await stream_cached(prompt_traitement, diagnostic, "traitement", TRAITEMENT_TIMEOUT, "traitement")
+
+
+@router.get("/assistant-ia/cache-stats", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    """📊 Compteurs de succès/échecs du cache des réponses IA"""
+    return llm_cache.stats()
+
+
+@router.get("/assistant-ia/queue-stats", dependencies=[Depends(require_admin)])
+async def queue_stats():
+    """📊 Profondeur de la file, générations en cours et temps d'attente"""
+    return llm_scheduler.stats()
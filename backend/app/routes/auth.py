@@ -1,15 +1,13 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-import numpy as np
-import cv2
-from jose import jwt, JWTError
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from bson import ObjectId
 from app.models.user import UserLogin, UserAdmin, TwoFAVerify
-from app.services.security import verify_password, hash_password
-from app.services.facial import encode_face, match_face
-from app.services.twofa import send_verification_email, store_verification_code, verify_code, generate_verification_code
+from app.services.passwords import verify_and_update, password_metrics
+from app.services.twofa import store_verification_code, verify_code, generate_verification_code
+from app.services.outbox import enqueue_notification
+from app.services.principals import principals, AuthError
 from app.config import db
-from app.utils import create_access_token, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.utils import create_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -24,9 +22,14 @@ async def login(user: UserLogin):
 
     collection = "UserPatients" if user.user_type == "Patient" else "UserMedecins"
     existing_user = await db[collection].find_one({"username": user.username})
+    if not existing_user:
+        raise HTTPException(status_code=401, detail="Identifiants incorrects")
 
-    if not existing_user or not verify_password(user.password, existing_user["password"]):
+    valid, new_hash = await verify_and_update(user.password, existing_user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Identifiants incorrects")
+    if new_hash:
+        await db[collection].update_one({"_id": existing_user["_id"]}, {"$set": {"password": new_hash}})
 
     
     contact = await db["contacts"].find_one({"user_id": str(existing_user["_id"])})
@@ -35,7 +38,7 @@ async def login(user: UserLogin):
 
     code = generate_verification_code()
     await store_verification_code(str(existing_user["_id"]), code)
-    send_verification_email(contact["email"], code)
+    await enqueue_notification("verification", contact["email"], code=code)
 
     return {
         "message": "Un code de vérification a été envoyé à votre adresse email.",
@@ -73,62 +76,20 @@ async def verify_2fa_code(data: TwoFAVerify):
         "user_id": str(user["_id"])
     }
 
-@router.post("/login-face")
-async def login_face(file: UploadFile = File(...)):
-    """🟢 Connexion avec reconnaissance faciale"""
-    
-    if not file:
-        raise HTTPException(status_code=400, detail="Aucune image reçue")
-
-    image = np.frombuffer(file.file.read(), np.uint8)
-    image = cv2.imdecode(image, cv2.IMREAD_COLOR)
-    encoding = await encode_face(image)
-    if not encoding:
-        raise HTTPException(status_code=400, detail="Aucun visage détecté")
-
-    user = await match_face(encoding)
-    if not user:
-        raise HTTPException(status_code=401, detail="Visage non reconnu")
-
-    token = create_access_token({
-        "sub": str(user["_id"]),
-        "user_type": user["user_type"]
-    })
-
-    return {
-        "message": "Connexion réussie",
-        "token": token,
-        "user_type": user["user_type"],
-        "username": user["username"],
-        "user_id": str(user["_id"])
-    }
-
-
 @router.get("/me")
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """👤 Obtenir l'utilisateur authentifié à partir du token"""
-    print(f"🔍 Token reçu : {token}")
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        user_type: str = payload.get("user_type")
-
-        if not user_id or not user_type:
-            raise HTTPException(status_code=401, detail="Token invalide")
-
-        user = await db["UserPatients"].find_one({"_id": ObjectId(user_id)}) or await db["UserMedecins"].find_one({"_id": ObjectId(user_id)})
-
-        if not user:
-            raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+        return await principals.authenticate(token)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
 
-        return {
-            "user_id": str(user["_id"]),
-            "user_type": user_type,
-            "username": user["username"]
-        }
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token invalide ou utilisateur non authentifié")
+async def require_admin(user=Depends(get_current_user)):
+    """🔒 Dépendance réservée aux administrateurs"""
+    if user["user_type"] != "Admin":
+        raise HTTPException(status_code=403, detail="Accès refusé.")
+    return user
 
 
 @router.post("/admin-login")
@@ -136,9 +97,14 @@ async def admin_login(admin: UserAdmin):
     """🔑 Authentification d'un administrateur et génération de token"""
 
     existing_admin = await db["admins"].find_one({"username": admin.username})
+    if not existing_admin:
+        raise HTTPException(status_code=401, detail="Identifiants incorrects")
 
-    if not existing_admin or not verify_password(admin.password, existing_admin["password"]):
+    valid, new_hash = await verify_and_update(admin.password, existing_admin["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Identifiants incorrects")
+    if new_hash:
+        await db["admins"].update_one({"_id": existing_admin["_id"]}, {"$set": {"password": new_hash}})
 
     token = create_access_token({
         "sub": str(existing_admin["_id"]),
@@ -153,26 +119,21 @@ async def admin_login(admin: UserAdmin):
 
 
 @router.get("/admin/me")
-async def get_current_admin(token: str = Depends(oauth2_scheme)):
+async def get_current_admin(admin=Depends(require_admin)):
     """👤 Obtenir l'administrateur authentifié à partir du token"""
+    return {
+        "admin_id": admin["user_id"],
+        "username": admin["username"]
+    }
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        admin_id: str = payload.get("sub")
-        user_type: str = payload.get("user_type")
-
-        if not admin_id or user_type != "Admin":
-            raise HTTPException(status_code=401, detail="Token invalide")
-
-        admin = await db["admins"].find_one({"_id": ObjectId(admin_id)})
 
-        if not admin:
-            raise HTTPException(status_code=401, detail="Administrateur non trouvé")
+@router.get("/password-metrics", dependencies=[Depends(require_admin)])
+async def get_password_metrics():
+    """📊 Durée des opérations bcrypt, pour ajuster le coût au p99 de connexion"""
+    return password_metrics()
 
-        return {
-            "admin_id": str(admin["_id"]),
-            "username": admin["username"]
-        }
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token invalide ou administrateur non authentifié")
+@router.get("/cache-stats", dependencies=[Depends(require_admin)])
+async def get_auth_cache_stats():
+    """📊 Succès/échecs du cache des utilisateurs authentifiés"""
+    return principals.stats()
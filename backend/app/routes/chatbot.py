@@ -1,53 +1,51 @@
 #Funcional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from contextlib import aclosing
 from datetime import datetime
-import os
-import dotenv
+import json
+import logging
 from app.config import db
-from app.services.notifications import envoyer_notification_creation
-import asyncio  # ✅ Agregado para usar asyncio.to_thread
+from app.services.openai_chat import openai_chat
+from app.services.outbox import enqueue_notification
+from app.services.availability import free_slots_for_date, jour_de_semaine
+from app.services.reservations import reserver_creneau, SlotTaken, SlotUnavailable
+from app.services.chat_sessions import chat_sessions
+from app.services.medecin_directory import medecin_directory
 
-dotenv.load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("API Key de OpenAI no encontrada")
-
-openai_client = OpenAI(api_key=openai_api_key)
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Réponse quand le modèle de langage n'est pas configuré (pas de clé OpenAI ou SDK absent)
+LLM_INDISPONIBLE = "Je peux vous aider à prendre un rendez-vous : dites simplement 'Je veux un rendez-vous'."
 
 class ChatRequest(BaseModel):
     user_id: str
     message: str
 
-@router.post("/chat")
-async def chat_with_bot(request: ChatRequest):
-    user_id = request.user_id
-    message = request.message.strip()
-    print(f"\n🟢 Nouveau message de {user_id}: '{message}'")
+async def repondre_scenario(user_id: str, message: str):
+    """Étapes scriptées (prise de rendez-vous). Retourne None si aucune ne s'applique."""
 
     if message.lower() in ["annuler", "je veux annuler", "annuler le rendez-vous", "stop"]:
-        await db["chat_temp"].delete_one({"user_id": user_id})
+        chat_sessions.delete(user_id)
         return {
             "message": message,
             "response": "La création du rendez-vous a été annulée 🚫 . Si vous souhaitez en créer un autre, dites simplement : 'Je veux un rendez-vous'."
         }
 
     if message.lower() in ["je veux un rendez-vous", "je veux prendre rendez-vous"]:
-        medecins = await db["medecins"].find().to_list(length=None)
-        print(f"📋 Médécins récupérés: {len(medecins)}")
+        medecins = await medecin_directory.all()
+        logger.debug(f"📋 Médecins récupérés : {len(medecins)}")
 
         if not medecins:
             return {"message": message, "response": "Aucun médecin disponible pour le moment."}
 
-        liste = "\n".join([f"- {m['nom']} – {m['specialite']}" for m in medecins])
-        await db["chat_temp"].update_one({"user_id": user_id}, {
-            "$set": {"progress": "medecin", "data": {}}
-        }, upsert=True)
+        liste = "\n".join([f"- {m['nom']} – {m.get('specialite', '')}" for m in medecins])
+        chat_sessions.set(user_id, {"progress": "medecin", "data": {}})
         return {"message": message, "response": f"Très bien. Voici les médecins disponibles :\n{liste}\nQuel médecin choisissez-vous ?"}
 
-    state = await db["chat_temp"].find_one({"user_id": user_id})
+    state = await chat_sessions.get(user_id)
     print(f"📦 État trouvé pour {user_id}: {state}")
 
     if state and state.get("progress"):
@@ -57,57 +55,35 @@ async def chat_with_bot(request: ChatRequest):
         print(f"📌 Données temporaires: {data}")
 
         if progress == "medecin":
-            med = await db["medecins"].find_one({"nom": {"$regex": message, "$options": "i"}})
-            print(f"🔍 Médecin recherché: {message}")
-            print(f"🔍 Résultat: {med}")
+            med, candidats = await medecin_directory.match(message)
+            logger.debug(f"🔍 Médecin recherché : '{message}' → {med['nom'] if med else None} ({len(candidats)} candidats)")
+            if not med and candidats:
+                liste = "\n".join([f"- {m.get('prenom', '')} {m['nom']} – {m.get('specialite', '')}" for m in candidats])
+                return {"message": message, "response": f"Plusieurs médecins correspondent :\n{liste}\nPrécisez le nom du médecin."}
             if not med:
                 return {"message": message, "response": "Médecin non trouvé. Veuillez réessayer."}
-            await db["chat_temp"].update_one({"user_id": user_id}, {
-                "$set": {
-                    "progress": "date",
-                    "data.medecin_id": str(med["user_id"]),
-                    "data.medecin_nom": med["nom"]
-                }
-            })
+            data.update({"medecin_id": str(med["user_id"]), "medecin_nom": med["nom"]})
+            chat_sessions.set(user_id, {**state, "progress": "date", "data": data})
             return {"message": message, "response": f"Pour quelle date souhaitez-vous un rendez-vous avec le Dr. {med['nom']} ? (ex: 2025-04-10)"}
 
         if progress == "date":
             try:
-                date_obj = datetime.strptime(message, "%Y-%m-%d")
-                jours = {
-                    "monday": "lundi",
-                    "tuesday": "mardi",
-                    "wednesday": "mercredi",
-                    "thursday": "jeudi",
-                    "friday": "vendredi",
-                    "saturday": "samedi",
-                    "sunday": "dimanche"
-                }
-                jour = jours[date_obj.strftime("%A").lower()]
+                date_obj = datetime.strptime(message, "%Y-%m-%d").date()
+                jour = jour_de_semaine(date_obj)
                 medecin_id = data["medecin_id"]
 
                 print(f"📆 Date saisie: {message} → Jour détecté: {jour}")
-                print(f"🔗 Requête dans disponibilites: medecin_id = {medecin_id}, jour = {jour}")
 
-                dispo = await db["disponibilites"].find_one({
-                    "medecin_id": medecin_id,
-                    "jour": jour
-                })
+                heures_libres = await free_slots_for_date(medecin_id, date_obj)
 
-                print(f"📂 Disponibilités récupérées: {dispo}")
+                print(f"📂 Heures libres: {heures_libres}")
 
-                if not dispo or not dispo.get("heures"):
+                if not heures_libres:
                     return {"message": message, "response": f"Le Dr. {data['medecin_nom']} n'est pas disponible ce jour-là. Choisissez une autre date."}
 
-                await db["chat_temp"].update_one({"user_id": user_id}, {
-                    "$set": {
-                        "progress": "heure",
-                        "data.date": message,
-                        "data.jour": jour,
-                        "data.heures_disponibles": dispo["heures"]
-                    }
-                })
-                return {"message": message, "response": f"Heures disponibles le {message} : {', '.join(dispo['heures'])}\nQuelle heure préférez-vous ?"}
+                data.update({"date": message, "jour": jour, "heures_disponibles": heures_libres})
+                chat_sessions.set(user_id, {**state, "progress": "heure", "data": data})
+                return {"message": message, "response": f"Heures disponibles le {message} : {', '.join(heures_libres)}\nQuelle heure préférez-vous ?"}
             except ValueError:
                 return {"message": message, "response": "Format de date invalide. Utilisez AAAA-MM-JJ."}
 
@@ -116,24 +92,20 @@ async def chat_with_bot(request: ChatRequest):
             print(f"⏰ Heures disponibles: {data.get('heures_disponibles')}")
             if message not in data.get("heures_disponibles", []):
                 return {"message": message, "response": f"Heure non disponible. Choisissez parmi : {', '.join(data['heures_disponibles'])}"}
-            await db["chat_temp"].update_one({"user_id": user_id}, {
-                "$set": {"progress": "type", "data.heure": message}
-            })
+            data["heure"] = message
+            chat_sessions.set(user_id, {**state, "progress": "type", "data": data})
             return {"message": message, "response": "Quel type de consultation ? (Consultation générale, Examen de routine, Urgence)"}
 
         if progress == "type":
             print(f"📌 Type de consultation: {message}")
-            await db["chat_temp"].update_one({"user_id": user_id}, {
-                "$set": {"progress": "motif", "data.type": message}
-            })
+            data["type"] = message
+            chat_sessions.set(user_id, {**state, "progress": "motif", "data": data})
             return {"message": message, "response": "Quel est le motif de votre rendez-vous ?"}
 
         if progress == "motif":
             print(f"📝 Motif reçu: {message}")
             data["motif"] = message
-            await db["chat_temp"].update_one({"user_id": user_id}, {
-                "$set": {"progress": "confirmation", "pending_rdv": data}
-            })
+            chat_sessions.set(user_id, {**state, "progress": "confirmation", "data": data, "pending_rdv": data})
             summary = (
                 f"🗓 Résumé :\n"
                 f"👨‍⚕️ Médecin : Dr. {data['medecin_nom']}\n"
@@ -148,56 +120,93 @@ async def chat_with_bot(request: ChatRequest):
         if progress == "confirmation" and message.lower() in ["oui", "je confirme", "confirme"]:
             rdv = state.get("pending_rdv")
             print(f"✅ Insertion rendez-vous: {rdv}")
-            new_rdv = {
-                "date": rdv["date"],
-                "heure": rdv["heure"],
-                "type": rdv["type"],
-                "motif": rdv["motif"],
-                "medecin_id": rdv["medecin_id"],
-                "patient_id": user_id,
-                "statut": "En attente",
-                "visite_faite": False,
-                "created_at": datetime.utcnow()
-            }
-            await db["rendezvous"].insert_one(new_rdv)
-            await db["chat_temp"].delete_one({"user_id": user_id})
-            
-            medecin = await db["medecins"].find_one({"user_id": rdv["medecin_id"]})
+            try:
+                await reserver_creneau(
+                    rdv["medecin_id"], user_id, rdv["date"], rdv["heure"], rdv["type"], rdv["motif"]
+                )
+            except (SlotTaken, SlotUnavailable) as e:
+                state.pop("pending_rdv", None)
+                chat_sessions.set(user_id, {**state, "progress": "date"})
+                alternatives = getattr(e, "alternatives", [])
+                proposition = (
+                    "Prochains créneaux libres : " + ", ".join(f"{a['date']} à {a['heure']}" for a in alternatives) + "\n"
+                    if alternatives else ""
+                )
+                return {"message": message, "response": f"😕 Le créneau du {rdv['date']} à {rdv['heure']} n'est plus disponible.\n{proposition}Pour quelle date souhaitez-vous un rendez-vous ?"}
+
+            chat_sessions.delete(user_id)
+
             contact_medecin = await db["contacts"].find_one({"user_id": rdv["medecin_id"]})
             contact_patient = await db["contacts"].find_one({"user_id": user_id})
 
-            if contact_patient and contact_patient.get("email"):
-                envoyer_notification_creation(
-                    contact_patient["email"],
-                    rdv["medecin_nom"],
-                    rdv["date"],
-                    rdv["heure"]
-                )
-
-            if contact_medecin and contact_medecin.get("email"):
-                envoyer_notification_creation(
-                    contact_medecin["email"],
-                    rdv["medecin_nom"],
-                    rdv["date"],
-                    rdv["heure"]
-                )
+            for contact in (contact_patient, contact_medecin):
+                if contact and contact.get("email"):
+                    await enqueue_notification(
+                        "creation", contact["email"],
+                        nom_medecin=rdv["medecin_nom"], date=rdv["date"], heure=rdv["heure"]
+                    )
             return {"message": message, "response": f"🎉 Rendez-vous confirmé avec le Dr. {rdv['medecin_nom']} le {rdv['date']} à {rdv['heure']}."}
 
-    print("🔄 Aucune progression en cours. Utilisation de OpenAI.")
+    return None
 
-    def call_openai():
-        return openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Tu es Khodia, un assistant médical de la clinique Bienêtre. Réponds toujours en français."},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
 
-    fallback = await asyncio.to_thread(call_openai)
+@router.post("/chat")
+async def chat_with_bot(request: ChatRequest):
+    user_id = request.user_id
+    message = request.message.strip()
+    print(f"\n🟢 Nouveau message de {user_id}: '{message}'")
+
+    async with chat_sessions.lock(user_id):
+        reply = await repondre_scenario(user_id, message)
+    if reply:
+        return reply
+
+    if not openai_chat.available:
+        return {"message": message, "response": LLM_INDISPONIBLE}
+
+    print("🔄 Aucune progression en cours. Utilisation de OpenAI.")
 
-    response_text = fallback.choices[0].message.content.strip()
+    response_text = await openai_chat.complete(message)
     await db["chat_history"].insert_one({"user_id": user_id, "message": message, "response": response_text})
     return {"message": message, "response": response_text}
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_bot_stream(request: ChatRequest):
+    """Variante SSE : événements {"delta": ...} puis {"done": true, "response": ...}."""
+    user_id = request.user_id
+    message = request.message.strip()
+
+    async with chat_sessions.lock(user_id):
+        reply = await repondre_scenario(user_id, message)
+
+    async def events():
+        if reply:
+            yield _sse({"delta": reply["response"]})
+            yield _sse({"done": True, **reply})
+            return
+        if not openai_chat.available:
+            yield _sse({"delta": LLM_INDISPONIBLE})
+            yield _sse({"done": True, "message": message, "response": LLM_INDISPONIBLE})
+            return
+
+        fragments = []
+        try:
+            # aclosing : sur déconnexion du client, le flux amont est fermé aussitôt
+            async with aclosing(openai_chat.stream(message)) as deltas:
+                async for delta in deltas:
+                    fragments.append(delta)
+                    yield _sse({"delta": delta})
+        except Exception as e:
+            yield _sse({"error": str(e), "done": True})
+            return
+
+        response_text = "".join(fragments).strip()
+        await db["chat_history"].insert_one({"user_id": user_id, "message": message, "response": response_text})
+        yield _sse({"done": True, "message": message, "response": response_text})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
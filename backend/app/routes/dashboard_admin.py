@@ -1,12 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.routes.auth import get_current_user
+from fastapi import APIRouter, Depends
+from app.routes.auth import require_admin
 
 router = APIRouter()
 
 @router.get("/admin/dashboard")
-async def admin_dashboard(user=Depends(get_current_user)):
+async def admin_dashboard(user=Depends(require_admin)):
     """Accès sécurisé au tableau de bord de l'administrateur"""
-    if user["user_type"] != "Admin":
-        raise HTTPException(status_code=403, detail="Accès refusé.")
-    
     return {"message": "Bienvenue sur le tableau de bord administrateur", "admin": user}
@@ -1,14 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from app.config import db
+from app.services.availability import (
+    availability, invalidate_template, MAX_RANGE_DAYS, DEFAULT_HOURS, WEEKDAYS,
+)
 
 router = APIRouter()
 
-# Définir l'horaire standard de 9h à 18h
-DEFAULT_HOURS = [f"{h:02d}:00" for h in range(9, 19)]
-
-# Jours de semaine en français
-WEEKDAYS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi"]
-
 @router.post("/init/{medecin_id}")
 async def init_disponibilites(medecin_id: str):
     """Créer les disponibilités standard de lundi à vendredi pour un médecin"""
@@ -26,9 +25,32 @@ async def init_disponibilites(medecin_id: str):
     ]
 
     await db["disponibilites"].insert_many(operations)
+    invalidate_template(medecin_id)
     return {"message": "Disponibilités créées avec succès pour la semaine."}
 
 
+# ✅ Endpoint pour récupérer les créneaux libres sur une plage de dates
+@router.get("/{medecin_id}/libres")
+async def get_creneaux_libres(
+    medecin_id: str,
+    date_debut: date = Query(..., alias="from"),
+    date_fin: Optional[date] = Query(None, alias="to"),
+):
+    """Récupérer, pour chaque date de la plage, les heures ouvertes, réservées et libres"""
+    date_fin = date_fin or date_debut + timedelta(days=6)
+    if date_fin < date_debut:
+        raise HTTPException(status_code=400, detail="La date de fin précède la date de début")
+    if (date_fin - date_debut).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Plage limitée à {MAX_RANGE_DAYS} jours")
+
+    return {
+        "medecin_id": medecin_id,
+        "from": date_debut.isoformat(),
+        "to": date_fin.isoformat(),
+        "jours": await availability(medecin_id, date_debut, date_fin),
+    }
+
+
 # ✅ Endpoint pour récupérer les heures d'un jour
 @router.get("/{medecin_id}/{jour}")
 async def get_disponibilites_for_day(medecin_id: str, jour: str):
@@ -54,6 +76,7 @@ async def update_disponibilites_for_day(medecin_id: str, jour: str, heures: list
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Disponibilités non trouvées pour ce jour")
 
+    invalidate_template(medecin_id)
     return {"message": "Disponibilités mises à jour avec succès."}
 
 
@@ -68,3 +91,4 @@ async def create_default_disponibilites(medecin_id: str):
         for jour in WEEKDAYS
     ]
     await db["disponibilites"].insert_many(operations)
+    invalidate_template(medecin_id)
@@ -1,11 +1,29 @@
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, HTTPException, Query, Response, Depends
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
+from bson.errors import InvalidId
+from typing import Optional
 from app.config import db
-from datetime import datetime
+from app.routes.auth import get_current_user
+from app.services.patient_feed import parse_fields, attach_patient_fields
+from app.services.pagination import paginate, InvalidCursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from datetime import date, datetime, time, timedelta
 from fastapi import Body
 
 router = APIRouter()
 
+# Champs d'un dossier pouvant être demandés via `dossier_fields`
+DOSSIER_FIELDS = [
+    "patient_id", "medecin_id", "date_visite", "etablissement", "symptomes", "diagnostic",
+    "source_diagnostic", "traitement", "source_traitement", "resume_visite",
+    "notes_pour_medecins", "debut_maladie", "fin_maladie", "created_at",
+]
+# Clé de pagination : du plus récent au plus ancien
+DOSSIER_SORT = "date_visite"
+# Taille des lots lus depuis MongoDB pendant un export
+EXPORT_BATCH_SIZE = 200
+
 def normalize_date_field(field):
     """Convert date field to ISO string or empty string if invalid or empty."""
     if isinstance(field, datetime):
@@ -17,40 +35,165 @@ def normalize_date_field(field):
             return ""
     return ""
 
-@router.get("/by-medecin/{medecin_id}")
-async def get_dossiers_by_medecin(medecin_id: str):
+
+def parse_dossier_fields(fields: Optional[str]):
+    """Projection MongoDB pour `dossier_fields` ; None = dossier complet."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in DOSSIER_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs de dossier inconnus : {', '.join(unknown)}")
+    # La clé de tri et les identifiants restent nécessaires au curseur et à l'enrichissement
+    return {f: 1 for f in {*requested, DOSSIER_SORT, "patient_id", "medecin_id"}}
+
+
+def dossier_query(owner_field: str, owner_id: str, date_debut: Optional[date], date_fin: Optional[date]) -> dict:
+    query = {owner_field: ObjectId(owner_id)}
+    if date_debut or date_fin:
+        query[DOSSIER_SORT] = {}
+        if date_debut:
+            query[DOSSIER_SORT]["$gte"] = datetime.combine(date_debut, time.min)
+        if date_fin:
+            query[DOSSIER_SORT]["$lt"] = datetime.combine(date_fin + timedelta(days=1), time.min)
+    return query
+
+
+def serialize_dossier(d: dict, projection: Optional[dict] = None) -> dict:
+    """Dossier prêt pour JSON ; seuls les champs projetés (tous si None) sont normalisés ou complétés."""
+    d["_id"] = str(d["_id"])
+    d["patient_id"] = str(d["patient_id"])
+    d["medecin_id"] = str(d["medecin_id"])
+
+    def wanted(field):
+        return projection is None or field in projection
+
+    # Normaliser les champs de date
+    for field in ("debut_maladie", "fin_maladie"):
+        if wanted(field):
+            d[field] = normalize_date_field(d.get(field))
+
+    # S'assurer que le champ existe toujours quand il est demandé
+    if wanted("notes_pour_medecins"):
+        d["notes_pour_medecins"] = d.get("notes_pour_medecins", "")
+    return d
+
+
+async def page_dossiers(response: Response, owner_field: str, owner_id: str, limit: int,
+                        cursor: Optional[str], dossier_fields: Optional[str],
+                        date_debut: Optional[date], date_fin: Optional[date]):
+    """Une page de dossiers ; le curseur de la page suivante part dans X-Next-Cursor."""
     try:
-        dossiers = await db["dossiersmedicaux"].find({"medecin_id": ObjectId(medecin_id)}).to_list(100)
+        projection = parse_dossier_fields(dossier_fields)
+        query = dossier_query(owner_field, owner_id, date_debut, date_fin)
+        docs, next_cursor = await paginate(
+            db["dossiersmedicaux"], query, projection, DOSSIER_SORT, limit, cursor, direction=-1
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Identifiant invalide")
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
 
-        for d in dossiers:
-            d["_id"] = str(d["_id"])
-            d["patient_id"] = str(d["patient_id"])
-            d["medecin_id"] = str(d["medecin_id"])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [serialize_dossier(d, projection) for d in docs]
 
-            # Normaliser les champs de date
-            d["debut_maladie"] = normalize_date_field(d.get("debut_maladie"))
-            d["fin_maladie"] = normalize_date_field(d.get("fin_maladie"))
 
-            # S'assurer que le champ existe toujours
-            d["notes_pour_medecins"] = d.get("notes_pour_medecins", "")
+@router.get("/by-medecin/{medecin_id}")
+async def get_dossiers_by_medecin(
+    medecin_id: str,
+    response: Response,
+    enrich: bool = Query(False, description="Joindre les informations du patient à chaque dossier"),
+    fields: Optional[str] = Query(None, description="Champs patient à joindre, ex: nom,prenom,email"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    dossier_fields: Optional[str] = Query(None, description="Champs du dossier à renvoyer, ex: date_visite,diagnostic"),
+    date_debut: Optional[date] = Query(None, alias="from"),
+    date_fin: Optional[date] = Query(None, alias="to"),
+):
+    if enrich or fields:
+        try:
+            patient_fields = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        patient_fields = None
+
+    dossiers = await page_dossiers(
+        response, "medecin_id", medecin_id, limit, cursor, dossier_fields, date_debut, date_fin
+    )
+    if patient_fields:
+        await attach_patient_fields(dossiers, patient_fields)
+    return dossiers
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+@router.get("/export")
+async def export_dossiers(
+    patient_id: Optional[str] = None,
+    medecin_id: Optional[str] = None,
+    date_debut: Optional[date] = Query(None, alias="from"),
+    date_fin: Optional[date] = Query(None, alias="to"),
+    current_user=Depends(get_current_user),
+):
+    """📤 Exporter des dossiers en NDJSON (un dossier par ligne), lus au fil du curseur MongoDB.
+
+    Un médecin n'exporte que les dossiers qu'il a rédigés ; un administrateur, tous.
+    """
+    if current_user["user_type"] not in ("Médecin", "Admin"):
+        raise HTTPException(status_code=403, detail="Export réservé aux médecins et administrateurs")
+    # Un médecin n'exporte que ses propres dossiers ; l'administrateur exporte tout
+    if current_user["user_type"] == "Médecin":
+        if medecin_id and medecin_id != current_user["user_id"]:
+            raise HTTPException(status_code=403, detail="Export limité à vos propres dossiers")
+        medecin_id = current_user["user_id"]
+    if not patient_id and not medecin_id:
+        raise HTTPException(status_code=400, detail="Préciser patient_id ou medecin_id")
 
-        return dossiers
+    try:
+        query = dossier_query("patient_id", patient_id, date_debut, date_fin) if patient_id \
+            else dossier_query("medecin_id", medecin_id, date_debut, date_fin)
+        if patient_id and medecin_id:
+            query["medecin_id"] = ObjectId(medecin_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Identifiant invalide")
+
+    cursor = db["dossiersmedicaux"].find(query).sort([(DOSSIER_SORT, 1), ("_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+
+    async def body():
+        async for dossier in cursor:
+            yield json.dumps(dossier, default=_json_default, ensure_ascii=False) + "\n"
+
+    filename = f"dossiers-{patient_id or medecin_id}.ndjson"
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    except Exception as e:
-        print(f"[ERROR] ❌ Erreur pendant la récupération: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{patient_id}")
-async def get_dossiers_by_patient(patient_id: str):
-    try:
-        dossiers = await db["dossiersmedicaux"].find({"patient_id": ObjectId(patient_id)}).to_list(100)
-        for d in dossiers:
-            d["_id"] = str(d["_id"])
-            d["patient_id"] = str(d["patient_id"])
-            d["medecin_id"] = str(d["medecin_id"])
-        return dossiers
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_dossiers_by_patient(
+    patient_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    dossier_fields: Optional[str] = Query(None, description="Champs du dossier à renvoyer, ex: date_visite,diagnostic"),
+    date_debut: Optional[date] = Query(None, alias="from"),
+    date_fin: Optional[date] = Query(None, alias="to"),
+):
+    return await page_dossiers(
+        response, "patient_id", patient_id, limit, cursor, dossier_fields, date_debut, date_fin
+    )
 
 @router.put("/{dossier_id}")
 async def update_dossier(dossier_id: str, data: dict = Body(...)):
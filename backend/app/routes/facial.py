@@ -1,23 +1,67 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import numpy as np
-import cv2
-from app.services.facial import encode_face  
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from app.routes.auth import require_admin
+from app.services.face_encoder import face_encoder, EncoderBusy
+from app.services.face_index import face_index
+from app.utils import create_access_token
 
 router = APIRouter()
+# Connexion faciale, montée sous /auth quand la fonctionnalité est active
+login_router = APIRouter()
 
 @router.post("/encode")
 async def encode_face_route(file: UploadFile = File(...)):
     """📸 Reçoit une image, la traite et renvoie l'encodage facial."""
     try:
         contents = await file.read()
-        np_arr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
 
-        encoding = await encode_face(image)
+        encoding = await face_encoder.encode(contents)
         if encoding is None:
             raise HTTPException(status_code=400, detail="Aucun visage détecté.")
 
         return {"face_encoding": encoding}
 
+    except HTTPException:
+        raise
+    except EncoderBusy:
+        raise HTTPException(status_code=503, detail="Service de reconnaissance faciale surchargé, réessayez")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors du traitement de l'image : {str(e)}")
+
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def encoder_metrics():
+    """📊 Profondeur de la file et latences du pool d'encodage facial."""
+    return face_encoder.metrics()
+
+
+@login_router.post("/login-face")
+async def login_face(file: UploadFile = File(...)):
+    """🟢 Connexion avec reconnaissance faciale"""
+    
+    if not file:
+        raise HTTPException(status_code=400, detail="Aucune image reçue")
+
+    contents = await file.read()
+    try:
+        encoding = await face_encoder.encode(contents)
+    except EncoderBusy:
+        raise HTTPException(status_code=503, detail="Service de reconnaissance faciale surchargé, réessayez")
+    if not encoding:
+        raise HTTPException(status_code=400, detail="Aucun visage détecté")
+
+    user = face_index.match(encoding)
+    if not user:
+        raise HTTPException(status_code=401, detail="Visage non reconnu")
+
+    token = create_access_token({
+        "sub": str(user["_id"]),
+        "user_type": user["user_type"]
+    })
+
+    return {
+        "message": "Connexion réussie",
+        "token": token,
+        "user_type": user["user_type"],
+        "username": user["username"],
+        "user_id": str(user["_id"])
+    }
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel
 from bson import ObjectId
 from datetime import datetime
+from typing import Literal, Optional
 from app.config import db
-from app.services.security import hash_password
+from app.services.pagination import (
+    paginate, count_total, prefix_filter, with_search_key, InvalidCursor,
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_FIELDS,
+)
+from app.services.passwords import hash_password
 from app.routes.disponibilites import create_default_disponibilites
+from app.services.face_index import face_index
+from app.services.medecin_directory import medecin_directory
+from app.services.principals import principals
+from app.services.query_recorder import query_budget
 
 router = APIRouter()
 
@@ -15,12 +24,45 @@ class MedecinCreationModel(BaseModel):
     contact: dict
 
 
+MEDECIN_LIST_FIELDS = ["user_id", "nom", "prenom", "specialite", "genre", "date_naissance"]
+
+
 @router.get("/")
-async def get_medecins():
-    """Récupérer tous les médecins avec leurs informations principales"""
+async def get_medecins(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    sort: Literal["_id", "nom"] = "_id",
+    specialite: Optional[str] = None,
+    genre: Optional[str] = None,
+    nom: Optional[str] = Query(None, description="Préfixe du nom"),
+    include_total: bool = False,
+):
+    """Récupérer les médecins page par page avec leurs informations principales"""
+
+    query = {}
+    if specialite:
+        query["specialite"] = specialite
+    if genre:
+        query["genre"] = genre
+    if nom:
+        query.update(prefix_filter(nom))
+
+    reads = db.for_reads("medecins")
+    try:
+        docs, next_cursor = await paginate(
+            reads["medecins"], query, {f: 1 for f in MEDECIN_LIST_FIELDS}, SORT_FIELDS[sort], limit, cursor
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if include_total:
+        response.headers["X-Total-Count"] = str(await count_total(reads["medecins"], query))
 
     medecins = []
-    async for medecin in db["medecins"].find({}):
+    for medecin in docs:
         medecins.append({
             "_id": str(medecin["_id"]),
             "user_id": str(medecin["user_id"]),
@@ -31,7 +73,7 @@ async def get_medecins():
             "date_naissance": medecin.get("date_naissance", "")
         })
 
-    if not medecins:
+    if not medecins and not cursor and not query:
         raise HTTPException(status_code=404, detail="Aucun médecin enregistré")
 
     return medecins
@@ -107,8 +149,9 @@ async def update_medecin_profile(user_id: str, update_data: dict):
         medecin_data.pop("user_id", None)  # Éviter d’écraser accidentellement
         await db["medecins"].update_one(
             {"user_id": ObjectId(user_id)},
-            {"$set": medecin_data}
+            {"$set": with_search_key(medecin_data)}
         )
+        await medecin_directory.refresh(user_id)
 
     # 🔐 Mise à jour ou insertion de l'adresse
     adresse_data = update_data.get("adresse")
@@ -138,17 +181,23 @@ async def update_medecin_profile(user_id: str, update_data: dict):
         user_data.pop("_id", None)
         user_data.pop("user_type", None)  # Pour éviter de le modifier depuis le frontend
         if "password" in user_data:
-            user_data["password"] = hash_password(user_data["password"])
+            user_data["password"] = await hash_password(user_data["password"])
 
         await db["UserMedecins"].update_one(
             {"_id": ObjectId(user_id)},
             {"$set": user_data}
         )
+        principals.invalidate_user(user_id)
+
+        if "face_encoding" in user_data or "username" in user_data:
+            await face_index.changed("Médecin", user_id)
 
     return {"message": "Profil médecin mis à jour avec succès"}
 
 
 @router.post("/")
+# 7 requêtes, 9 avec une empreinte faciale (événement face_index + relecture du compte)
+@query_budget(9)
 async def create_medecin(data: MedecinCreationModel):
     """Créer un nouveau médecin complet : compte, médecin, adresse, contact, disponibilités"""
 
@@ -164,7 +213,7 @@ async def create_medecin(data: MedecinCreationModel):
 
     # 🔐 Hacher le mot de passe
     if "password" in user_data:
-        user_data["password"] = hash_password(user_data["password"])
+        user_data["password"] = await hash_password(user_data["password"])
 
     # 🔹 Créer l'utilisateur
     new_user = {
@@ -173,10 +222,13 @@ async def create_medecin(data: MedecinCreationModel):
     }
     result_user = await db["UserMedecins"].insert_one(new_user)
     user_id = str(result_user.inserted_id)
+    if new_user.get("face_encoding"):
+        await face_index.changed("Médecin", user_id)
 
     # 🔹 Créer les données du médecin
     medecin_data["user_id"] = ObjectId(user_id)
-    await db["medecins"].insert_one(medecin_data)
+    await db["medecins"].insert_one(with_search_key(medecin_data))
+    await medecin_directory.refresh(user_id)
 
     # 🔹 Ajouter adresse et contact
     adresse_data["user_id"] = user_id
@@ -213,6 +265,9 @@ async def delete_medecin(medecin_id: str):
         await db["medecins"].delete_one({"user_id": ObjectId(user_id)})
         await db["adresses"].delete_one({"user_id": user_id})
         await db["contacts"].delete_one({"user_id": user_id})
+        await face_index.changed("Médecin", user_id)
+        medecin_directory.remove(user_id)
+        principals.invalidate_user(user_id)
 
         return {"message": "Médecin supprimé avec succès"}
 
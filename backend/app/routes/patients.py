@@ -1,8 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
+from typing import Literal, Optional
 from app.config import db
+from app.routes.auth import get_current_user
+from app.services.pagination import (
+    paginate, count_total, prefix_filter, with_search_key, InvalidCursor,
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_FIELDS,
+)
+from app.services.principals import principals
+from app.services.patient_chart import (
+    load_chart, parse_sections, server_timing, DEFAULT_CHART_LIMIT, MAX_CHART_LIMIT,
+)
 
 router = APIRouter()
 
@@ -28,12 +40,40 @@ class PatientUpdate(BaseModel):
 
 from bson.errors import InvalidId
 
+PATIENT_LIST_FIELDS = ["user_id", "nom", "prenom", "numero_assurance", "genre", "date_naissance", "date_creation"]
+
 # ✅ Endpoint pour lister tous les patients (utile pour l'admin)
 @router.get("/")
-async def get_all_patients():
-    """Lister tous les patients avec leurs informations principales"""
+async def get_all_patients(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    sort: Literal["_id", "nom"] = "_id",
+    genre: Optional[str] = None,
+    nom: Optional[str] = Query(None, description="Préfixe du nom"),
+    include_total: bool = False,
+):
+    """Lister les patients page par page avec leurs informations principales"""
+    query = {}
+    if genre:
+        query["genre"] = genre
+    if nom:
+        query.update(prefix_filter(nom))
+
+    try:
+        docs, next_cursor = await paginate(
+            db["patients"], query, {f: 1 for f in PATIENT_LIST_FIELDS}, SORT_FIELDS[sort], limit, cursor
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if include_total:
+        response.headers["X-Total-Count"] = str(await count_total(db["patients"], query))
+
     patients = []
-    async for patient in db["patients"].find({}):
+    for patient in docs:
         patients.append({
             "_id": str(patient["_id"]),
             "user_id": patient.get("user_id", ""),
@@ -45,7 +85,7 @@ async def get_all_patients():
             "date_creation": patient.get("date_creation", "")
         })
 
-    if not patients:
+    if not patients and not cursor and not query:
         raise HTTPException(status_code=404, detail="Aucun patient enregistré")
 
     return patients
@@ -82,7 +122,7 @@ async def create_patient(patient: PatientCreate):
         "date_creation": datetime.utcnow(),
     }
 
-    patient_result = await db["patients"].insert_one(new_patient)
+    patient_result = await db["patients"].insert_one(with_search_key(new_patient))
 
     # 🔹 Enregistrer l'adresse associée (si fournie)
     if patient.adresse and patient.ville:
@@ -108,18 +148,52 @@ async def create_patient(patient: PatientCreate):
     return {"message": "Patient enregistré avec succès", "patient_id": str(patient_result.inserted_id)}
 
 
+# ✅ Dossier complet du patient en un seul appel
+@router.get("/{user_id}/chart")
+async def get_patient_chart(
+    user_id: str,
+    response: Response,
+    sections: Optional[str] = Query(None, description="Sections à inclure, ex: allergies,dossiers"),
+    limit: int = Query(DEFAULT_CHART_LIMIT, ge=1, le=MAX_CHART_LIMIT, description="Nombre maximal d'éléments par section"),
+    current_user=Depends(get_current_user),
+):
+    """Patient, adresse, contact, allergies, dossiers et rendez-vous, chargés en parallèle.
+
+    Un patient ne consulte que son propre dossier ; médecins et administrateurs
+    consultent tous les dossiers. La durée de chaque section est renvoyée dans
+    l'en-tête `Server-Timing`.
+    """
+    # 🔒 Vérifier le rôle et la propriété du dossier
+    if current_user["user_type"] not in ("Médecin", "Admin") and current_user["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Accès refusé.")
+
+    try:
+        requested = parse_sections(sections)
+        chart, timings = await load_chart(user_id, requested, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Identifiant patient invalide")
+
+    response.headers["Server-Timing"] = server_timing(timings)
+    if chart is None:
+        raise HTTPException(status_code=404, detail="Patient non trouvé")
+    return chart
+
+
 # ✅ Endpoint pour récupérer les informations d'un patient
 @router.get("/{user_id}")
 async def get_patient(user_id: str):
     """Récupérer les informations complètes d'un patient"""
-    
-    patient = await db["patients"].find_one({"user_id": user_id})
+
+    patient, address, contact = await asyncio.gather(
+        db["patients"].find_one({"user_id": user_id}),
+        db["adresses"].find_one({"user_id": user_id}),
+        db["contacts"].find_one({"user_id": user_id}),
+    )
     if not patient:
         raise HTTPException(status_code=404, detail="Patient non trouvé")
 
-    address = await db["adresses"].find_one({"user_id": user_id})
-    contact = await db["contacts"].find_one({"user_id": user_id})
-
     patient["_id"] = str(patient["_id"])
     if address:
         address["_id"] = str(address["_id"])
@@ -149,7 +223,7 @@ async def update_patient(user_id: str, patient_data: PatientUpdate):
         "date_naissance": patient_data.patient["date_naissance"],
         "genre": patient_data.patient["genre"],
     }
-    await db["patients"].update_one({"user_id": user_id}, {"$set": update_patient_data})
+    await db["patients"].update_one({"user_id": user_id}, {"$set": with_search_key(update_patient_data)})
 
     # 🔹 Mise à jour de l'adresse
     update_address_data = {
@@ -183,5 +257,6 @@ async def delete_patient(user_id: str):
     await db["patients"].delete_one({"user_id": user_id})
     await db["adresses"].delete_one({"user_id": user_id})
     await db["contacts"].delete_one({"user_id": user_id})
+    principals.invalidate_user(user_id)
 
     return {"message": "Patient et ses données associées supprimés avec succès"}
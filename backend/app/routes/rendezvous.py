@@ -4,13 +4,15 @@ from bson import ObjectId
 from datetime import datetime
 from app.config import db
 from app.routes.auth import get_current_user
+from app.services.patient_feed import parse_fields, attach_patient_fields
+from app.services.reservations import reserver_creneau, next_free_slots, slot_update, SlotTaken, SlotUnavailable
+from app.services.availability import on_grid
+from pymongo.errors import DuplicateKeyError
 from typing import Optional
 import logging
-from app.services.notifications import (
-    envoyer_notification_creation,
-    envoyer_notification_modification,
-    envoyer_notification_annulation,
-)
+from app.services.outbox import enqueue_notification
+from app.services.archive import find_with_archive, archive_collection
+from app.services.query_recorder import query_budget
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -33,6 +35,7 @@ class RendezvousUpdate(BaseModel):
     visite_faite: Optional[bool] = None
 
 @router.post("/")
+@query_budget(8)
 async def create_rendezvous(rendezvous: RendezvousCreate, current_user=Depends(get_current_user)):
     if "user_id" not in current_user:
         raise HTTPException(status_code=401, detail="Utilisateur non authentifié")
@@ -47,46 +50,27 @@ async def create_rendezvous(rendezvous: RendezvousCreate, current_user=Depends(g
     if not medecin:
         raise HTTPException(status_code=404, detail="Médecin non trouvé")
 
-    date_obj = datetime.strptime(rendezvous.date, "%Y-%m-%d")
-    jours_fr = {
-        "monday": "lundi", "tuesday": "mardi", "wednesday": "mercredi",
-        "thursday": "jeudi", "friday": "vendredi", "saturday": "samedi", "sunday": "dimanche"
-    }
-    jour = jours_fr[date_obj.strftime("%A").lower()]
-
-    dispo = await db["disponibilites"].find_one({"medecin_id": rendezvous.medecin_id, "jour": jour})
-    if not dispo or rendezvous.heure not in dispo.get("heures", []):
+    try:
+        rendezvous_id = await reserver_creneau(
+            rendezvous.medecin_id, rendezvous.patient_id, rendezvous.date,
+            rendezvous.heure, rendezvous.type, rendezvous.motif
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date ou heure invalide. Utilisez AAAA-MM-JJ et HH:MM.")
+    except SlotUnavailable:
         raise HTTPException(
             status_code=400,
-            detail=f"Le médecin n'est pas disponible le {jour} à {rendezvous.heure}"
+            detail=f"Le médecin n'est pas disponible le {rendezvous.date} à {rendezvous.heure}"
         )
-
-    existing = await db["rendezvous"].find_one({
-        "medecin_id": rendezvous.medecin_id,
-        "date": rendezvous.date,
-        "heure": rendezvous.heure,
-        "statut": {"$ne": "Annulé"}
-    })
-    if existing:
+    except SlotTaken as e:
         raise HTTPException(
-            status_code=400,
-            detail=f"Le créneau {rendezvous.heure} est déjà réservé pour le {rendezvous.date}."
+            status_code=409,
+            detail={
+                "message": f"Le créneau {rendezvous.heure} est déjà réservé pour le {rendezvous.date}.",
+                "alternatives": e.alternatives,
+            }
         )
 
-    new_rendezvous = {
-        "date": rendezvous.date,
-        "heure": rendezvous.heure,
-        "medecin_id": rendezvous.medecin_id,
-        "patient_id": rendezvous.patient_id,
-        "type": rendezvous.type,
-        "motif": rendezvous.motif,
-        "statut": "En attente",
-        "created_at": datetime.utcnow(),
-        "visite_faite": False
-    }
-
-    result = await db["rendezvous"].insert_one(new_rendezvous)
-
     contact_patient = await db["contacts"].find_one({"user_id": rendezvous.patient_id})
     email_patient = contact_patient["email"] if contact_patient else None
 
@@ -95,17 +79,18 @@ async def create_rendezvous(rendezvous: RendezvousCreate, current_user=Depends(g
 
     nom_medecin = medecin.get("nom")
 
-    if email_patient and nom_medecin:
-        if not envoyer_notification_creation(email_patient, nom_medecin, rendezvous.date, rendezvous.heure):
-            logger.error(f"❌ Échec de la notification de création au patient {email_patient}")
+    if nom_medecin:
+        for email in (email_patient, email_medecin):
+            if email:
+                await enqueue_notification(
+                    "creation", email,
+                    nom_medecin=nom_medecin, date=rendezvous.date, heure=rendezvous.heure
+                )
 
-    if email_medecin and nom_medecin:
-        if not envoyer_notification_creation(email_medecin, nom_medecin, rendezvous.date, rendezvous.heure):
-            logger.error(f"❌ Échec de la notification de création au médecin {email_medecin}")
-
-    return {"message": "Rendez-vous créé avec succès", "rendezvous_id": str(result.inserted_id)}
+    return {"message": "Rendez-vous créé avec succès", "rendezvous_id": str(rendezvous_id)}
 
 @router.put("/{rendezvous_id}")
+@query_budget(9)
 async def update_rendezvous(rendezvous_id: str, updated_data: RendezvousUpdate, current_user=Depends(get_current_user)):
     if "user_id" not in current_user:
         raise HTTPException(status_code=401, detail="Utilisateur non authentifié")
@@ -126,7 +111,24 @@ async def update_rendezvous(rendezvous_id: str, updated_data: RendezvousUpdate,
     else:
         medecin = await db["medecins"].find_one({"user_id": ObjectId(rendezvous["medecin_id"])})
 
-    await db["rendezvous"].update_one({"_id": ObjectId(rendezvous_id)}, {"$set": update_fields})
+    if "heure" in update_fields and not on_grid(update_fields["heure"]):
+        raise HTTPException(status_code=400, detail="Heure invalide : choisissez un créneau (HH:MM par quart d'heure).")
+    modification = slot_update(rendezvous, update_fields)
+
+    try:
+        if modification:
+            await db["rendezvous"].update_one({"_id": ObjectId(rendezvous_id)}, modification)
+    except DuplicateKeyError:
+        medecin_id = update_fields.get("medecin_id", rendezvous["medecin_id"])
+        date = update_fields.get("date", rendezvous["date"])
+        heure = update_fields.get("heure", rendezvous["heure"])
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": f"Le créneau {heure} est déjà réservé pour le {date}.",
+                "alternatives": await next_free_slots(medecin_id, date, heure),
+            }
+        )
     updated_rendezvous = await db["rendezvous"].find_one({"_id": ObjectId(rendezvous_id)})
     updated_rendezvous["_id"] = str(updated_rendezvous["_id"])
 
@@ -141,27 +143,42 @@ async def update_rendezvous(rendezvous_id: str, updated_data: RendezvousUpdate,
     heure_notif = updated_data.heure or rendezvous["heure"]
 
     if update_fields.get("statut") == "Annulé":
-        if email_patient:
-            envoyer_notification_annulation(email_patient, nom_medecin, date_notif, heure_notif)
-        if email_medecin:
-            envoyer_notification_annulation(email_medecin, nom_medecin, date_notif, heure_notif)
+        destinataires, kind = (email_patient, email_medecin), "annulation"
     else:
-        if email_patient:
-            envoyer_notification_modification(email_patient, nom_medecin, date_notif, heure_notif)
+        destinataires, kind = (email_patient,), "modification"
+
+    for email in destinataires:
+        if email:
+            await enqueue_notification(kind, email, nom_medecin=nom_medecin, date=date_notif, heure=heure_notif)
 
     return {"message": "Rendez-vous mis à jour avec succès", "rendezvous": updated_rendezvous}
 
 
 @router.get("/{user_id}")
-async def get_rendezvous(user_id: str, current_user=Depends(get_current_user)):
+async def get_rendezvous(
+    user_id: str,
+    enrich: bool = Query(False, description="Joindre les informations du patient à chaque rendez-vous"),
+    fields: Optional[str] = Query(None, description="Champs patient à joindre, ex: nom,prenom,email"),
+    include_archive: bool = Query(False, description="Inclure les rendez-vous archivés"),
+    current_user=Depends(get_current_user),
+):
     user = await db["UserPatients"].find_one({"_id": ObjectId(user_id)}) or await db["UserMedecins"].find_one({"_id": ObjectId(user_id)})
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
-    rendezvous_list = []
-    async for rendezvous in db["rendezvous"].find({"$or": [{"patient_id": user_id}, {"medecin_id": user_id}]}):
+    rendezvous_list = await find_with_archive(
+        "rendezvous", {"$or": [{"patient_id": user_id}, {"medecin_id": user_id}]}, include_archive,
+        database=db.for_reads("rendezvous"),
+    )
+    for rendezvous in rendezvous_list:
         rendezvous["_id"] = str(rendezvous["_id"])
-        rendezvous_list.append(rendezvous)
+
+    if enrich or fields:
+        try:
+            patient_fields = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await attach_patient_fields(rendezvous_list, patient_fields)
 
     return rendezvous_list
 
@@ -191,8 +208,10 @@ async def get_heures_occupees(medecin_id: str, jour: str, date: str = Query(...)
 
 
 @router.get("/by-id/{rendezvous_id}")
-async def get_rendezvous_by_id(rendezvous_id: str):
+async def get_rendezvous_by_id(rendezvous_id: str, include_archive: bool = Query(False)):
     rendezvous = await db["rendezvous"].find_one({"_id": ObjectId(rendezvous_id)})
+    if not rendezvous and include_archive:
+        rendezvous = await archive_collection("rendezvous").find_one({"_id": ObjectId(rendezvous_id)})
     if not rendezvous:
         raise HTTPException(status_code=404, detail="Rendez-vous non trouvé")
 
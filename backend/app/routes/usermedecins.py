@@ -3,7 +3,9 @@ from pydantic import BaseModel
 from bson import ObjectId
 from datetime import datetime
 from app.config import db  
-from app.services.security import hash_password  
+from app.services.passwords import hash_password
+from app.services.face_index import face_index
+from app.services.principals import principals
 
 router = APIRouter()
 
@@ -29,7 +31,7 @@ async def create_user_medecin(user: UserMedecinCreate):
         raise HTTPException(status_code=400, detail="El usuario ya está registrado.")
 
     # Hashear la contraseña antes de guardarla
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
 
     # Crear el nuevo usuario médico
     new_user = {
@@ -44,6 +46,10 @@ async def create_user_medecin(user: UserMedecinCreate):
     # Insertar el nuevo usuario en la base de datos
     result = await db["UserMedecins"].insert_one(new_user)
 
+    # Mettre à jour l'index facial de tous les workers
+    if user.face_encoding:
+        await face_index.changed("Médecin", str(result.inserted_id))
+
     # Retornar una respuesta con el ID del usuario creado
     return {
         "message": "Usuario médico registrado exitosamente",
@@ -62,13 +68,18 @@ async def update_user_medecin(user_id: str, user: UserMedecinUpdate):
 
     # Si se proporciona una nueva contraseña, hashearla
     if "password" in update_data:
-        update_data["password"] = hash_password(update_data["password"])
+        update_data["password"] = await hash_password(update_data["password"])
 
     # Actualizar el usuario en la base de datos
     result = await db["UserMedecins"].update_one(
         {"_id": ObjectId(user_id)},
         {"$set": update_data}
     )
+    principals.invalidate_user(user_id)
+
+    # Mettre à jour l'index facial de tous les workers (encodage ou nom affiché)
+    if "face_encoding" in update_data or "username" in update_data:
+        await face_index.changed("Médecin", user_id)
 
     # Verificar si se realizó la actualización
     if result.modified_count == 1:
@@ -3,7 +3,8 @@ from pydantic import BaseModel
 from bson import ObjectId
 from datetime import datetime
 from app.config import db
-from app.services.security import hash_password  
+from app.services.passwords import hash_password
+from app.services.face_index import face_index
 
 router = APIRouter()
 
@@ -19,7 +20,7 @@ async def create_user_patient(user: UserPatientCreate):
     if existing_user:
         raise HTTPException(status_code=400, detail="El usuario ya está registrado.")
 
-    hashed_password = hash_password(user.password)  
+    hashed_password = await hash_password(user.password)
 
     new_user = {
         "username": user.username,
@@ -30,6 +31,10 @@ async def create_user_patient(user: UserPatientCreate):
     }
 
     result = await db["UserPatients"].insert_one(new_user)
+
+    if user.face_encoding:
+        await face_index.changed("Patient", str(result.inserted_id))
+
     return {
         "message": "Usuario registrado exitosamente",
         "user_id": str(result.inserted_id),
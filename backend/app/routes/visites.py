@@ -5,7 +5,9 @@ from datetime import datetime
 from typing import Optional
 from bson import ObjectId
 from app.config import db
-import requests
+from app.services.llm import LLMError
+from app.services.llm_scheduler import llm_scheduler, QueueFull
+from app.services.visits import dossier_from_visite
 
 router = APIRouter()
 
@@ -38,26 +40,9 @@ async def creer_visite(visite: Visite):
         if visite.fin_maladie:
             visite_dict["fin_maladie"] = datetime.fromisoformat(visite.fin_maladie)
 
-        await db["visites"].insert_one(visite_dict)
-
-        # 🔹 Stockage dans la collection "dossiersmedicaux"
-
-        dossier = {
-            "patient_id": visite_dict["patient_id"],
-            "medecin_id": visite_dict["medecin_id"],
-            "date_visite": visite_dict["date_visite"],
-            "etablissement": visite_dict.get("etablissement", ""),
-            "symptomes": visite.symptomes or visite.resume_visite,
-            "diagnostic": visite.diagnostic,
-            "source_diagnostic": visite.source_diagnostic,
-            "traitement": visite.traitement,
-            "source_traitement": visite.source_traitement,
-            "resume_visite": visite.resume_visite,
-            "notes_pour_medecins": visite.notes_pour_medecins or "",
-            "debut_maladie": visite_dict.get("debut_maladie"),
-            "fin_maladie": visite_dict.get("fin_maladie"),
-            "created_at": datetime.utcnow()
-        }
+        # 🔹 Une seule écriture : "visites" est une vue sur "dossiersmedicaux"
+        dossier = dossier_from_visite(visite_dict)
+        dossier["created_at"] = datetime.utcnow()
         await db["dossiersmedicaux"].insert_one(dossier)
 
 
@@ -69,18 +54,15 @@ async def creer_visite(visite: Visite):
 
 # ✅ FICHIER: app/routers/assistant_ia.py
 @router.post("/diagnostic-ia/")
-def diagnostiquer(symptomes: str):
+async def diagnostiquer(symptomes: str):
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "ALIENTELLIGENCE/medicaldiagnostictools",
-                "prompt": f"Patient symptoms: {symptomes}\nWhat is the most probable diagnosis?",
-                "stream": False
-            },
+        generated = await llm_scheduler.generate(
+            f"Patient symptoms: {symptomes}\nWhat is the most probable diagnosis?",
+            "diagnostic",
             timeout=60
         )
-        result = response.json()
-        return {"diagnostic": result.get("response", "Aucune réponse utile de l'IA.")}
-    except Exception as e:
+        return {"diagnostic": generated or "Aucune réponse utile de l'IA."}
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except LLMError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.config import db
+from app.services.leases import acquire
+
+logger = logging.getLogger(__name__)
+
+# Rendez-vous plus anciens que cet horizon (jours) déplacés vers l'archive
+RENDEZVOUS_ARCHIVE_DAYS = int(os.getenv("RENDEZVOUS_ARCHIVE_DAYS", "365"))
+# Historique du chatbot plus ancien que cet horizon (jours) déplacé vers l'archive
+CHAT_HISTORY_ARCHIVE_DAYS = int(os.getenv("CHAT_HISTORY_ARCHIVE_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", str(6 * 3600)))
+# Bail de l'archiveur : renouvelé à chaque passage, repris par un autre worker s'il expire
+ARCHIVE_LEASE = "archiver"
+ARCHIVE_LEASE_SECONDS = float(os.getenv("ARCHIVE_LEASE_SECONDS", str(2 * ARCHIVE_INTERVAL_SECONDS)))
+# Rendez-vous clos : seuls ceux-là quittent la collection chaude
+ARCHIVABLE_STATUTS = ["Annulé", "Terminé"]
+
+# Collection chaude → collection d'archive
+ARCHIVES = {
+    "rendezvous": "rendezvous_archive",
+    "chat_history": "chat_history_archive",
+}
+
+DUPLICATE_KEY = 11000
+
+
+def archive_collection(collection: str, database=None):
+    return (db if database is None else database)[ARCHIVES[collection]]
+
+
+def _rendezvous_filter(now: datetime) -> dict:
+    # Les dates sont des chaînes AAAA-MM-JJ : la comparaison lexicale suit l'ordre chronologique
+    cutoff = (now - timedelta(days=RENDEZVOUS_ARCHIVE_DAYS)).strftime("%Y-%m-%d")
+    # Un rendez-vous ancien encore ouvert (visite non saisie) reste visible
+    return {
+        "date": {"$lt": cutoff},
+        "$or": [{"statut": {"$in": ARCHIVABLE_STATUTS}}, {"visite_faite": True}],
+    }
+
+
+def _chat_history_filter(now: datetime) -> dict:
+    # chat_history n'a pas d'horodatage : celui de l'ObjectId fait foi
+    cutoff = ObjectId.from_datetime(now - timedelta(days=CHAT_HISTORY_ARCHIVE_DAYS))
+    return {"_id": {"$lt": cutoff}}
+
+
+ARCHIVE_FILTERS = {
+    "rendezvous": _rendezvous_filter,
+    "chat_history": _chat_history_filter,
+}
+
+
+async def move_batch(collection: str, query: dict, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Copier un lot vers l'archive puis le supprimer de la collection chaude.
+
+    Rejouable : un lot déjà copié (arrêt entre copie et suppression) est
+    ignoré à l'insertion grâce à la clé _id conservée.
+    """
+    docs = await db[collection].find(query).limit(batch_size).to_list(length=batch_size)
+    if not docs:
+        return 0
+
+    try:
+        await archive_collection(collection).insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+            raise
+
+    await db[collection].delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+    return len(docs)
+
+
+async def archive_once(batch_size: int = ARCHIVE_BATCH_SIZE) -> dict:
+    """Déplacer vers l'archive tout ce qui dépasse l'horizon, lot par lot."""
+    now = datetime.utcnow()
+    moved = {}
+    for collection, make_filter in ARCHIVE_FILTERS.items():
+        query = make_filter(now)
+        total = 0
+        while True:
+            count = await move_batch(collection, query, batch_size)
+            total += count
+            if count < batch_size:
+                break
+            # Laisser passer le trafic entre deux lots
+            await asyncio.sleep(0)
+        moved[collection] = total
+
+    # États de conversation antérieurs à l'horodatage : leur donner une date pour que le TTL s'applique
+    await db["chat_temp"].update_many({"updated_at": {"$exists": False}}, {"$set": {"updated_at": now}})
+    return moved
+
+
+async def archive_as_leader(batch_size: int = ARCHIVE_BATCH_SIZE):
+    """archive_once si ce worker détient le bail de l'archiveur ; None sinon."""
+    if not await acquire(ARCHIVE_LEASE, ARCHIVE_LEASE_SECONDS):
+        return None
+    return await archive_once(batch_size)
+
+
+async def run_archiver():
+    """Boucle de fond démarrée dans le lifespan de chaque worker ; un seul archive."""
+    while True:
+        try:
+            moved = await archive_as_leader()
+            if moved and any(moved.values()):
+                logger.info(f"🗄️ Archivage : {moved}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur de l'archivage : {e}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+async def find_with_archive(collection: str, query: dict, include_archive: bool, database=None) -> list:
+    """Documents de la collection chaude, complétés par l'archive si demandé."""
+    database = db if database is None else database
+    if not include_archive:
+        return await database[collection].find(query).to_list(length=None)
+    hot, cold = await asyncio.gather(
+        database[collection].find(query).to_list(length=None),
+        archive_collection(collection, database).find(query).to_list(length=None),
+    )
+    return hot + cold
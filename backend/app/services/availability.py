@@ -0,0 +1,150 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+from app.config import db
+
+# Jours de la semaine indexés comme date.weekday()
+JOURS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+
+# Jours ouvrés créés par défaut pour un nouveau médecin
+WEEKDAYS = JOURS[:5]
+
+# Horaire standard de 9h à 18h
+DEFAULT_HOURS = [f"{h:02d}:00" for h in range(9, 19)]
+
+# Granularité des masques : un bit par quart d'heure (96 bits par jour)
+SLOT_MINUTES = 15
+
+# Plage maximale d'une requête de disponibilités (un mois et quelques jours)
+MAX_RANGE_DAYS = 62
+
+# Durée de validité des gabarits hebdomadaires en mémoire (secondes)
+TEMPLATE_CACHE_TTL = float(os.getenv("TEMPLATE_CACHE_TTL", "300"))
+
+_template_cache = {}
+
+
+def jour_de_semaine(d: date) -> str:
+    return JOURS[d.weekday()]
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def heure_to_bit(heure: str) -> int:
+    h, m = heure.split(":")
+    return (int(h) * 60 + int(m)) // SLOT_MINUTES
+
+
+def on_grid(heure: str) -> bool:
+    """Heure valide tombant exactement sur un créneau (09:00, 09:15… mais pas 09:07)."""
+    try:
+        h, m = heure.split(":")
+        h, m = int(h), int(m)
+    except (ValueError, AttributeError):
+        return False
+    return 0 <= h < 24 and 0 <= m < 60 and m % SLOT_MINUTES == 0
+
+
+def bit_to_heure(bit: int) -> str:
+    minutes = bit * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def heures_to_mask(heures) -> int:
+    mask = 0
+    for heure in heures:
+        try:
+            mask |= 1 << heure_to_bit(heure)
+        except (ValueError, AttributeError):
+            continue
+    return mask
+
+
+def mask_to_heures(mask: int) -> list[str]:
+    heures = []
+    bit = 0
+    while mask:
+        if mask & 1:
+            heures.append(bit_to_heure(bit))
+        mask >>= 1
+        bit += 1
+    return heures
+
+
+async def weekly_template(medecin_id: str, cached: bool = True) -> dict[str, int]:
+    """Masque des heures ouvertes pour chaque jour de la semaine du médecin.
+
+    Le cache n'est invalidé que dans le worker qui modifie les disponibilités :
+    il sert l'affichage ; la réservation relit la base (`cached=False`).
+    """
+    entry = _template_cache.get(medecin_id) if cached else None
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    template = {}
+    async for dispo in db["disponibilites"].find({"medecin_id": medecin_id}, {"jour": 1, "heures": 1}):
+        template[dispo["jour"]] = template.get(dispo["jour"], 0) | heures_to_mask(dispo.get("heures", []))
+    _template_cache[medecin_id] = (time.monotonic() + TEMPLATE_CACHE_TTL, template)
+    return template
+
+
+def invalidate_template(medecin_id: str):
+    """À appeler après toute modification des disponibilités d'un médecin."""
+    _template_cache.pop(medecin_id, None)
+
+
+async def booked_masks(medecin_id: str, start: date, end: date) -> dict[str, int]:
+    """Masque des créneaux réservés (non annulés) par date, en une seule requête indexée."""
+    booked = {}
+    cursor = db["rendezvous"].find(
+        {
+            "medecin_id": medecin_id,
+            "date": {"$gte": start.isoformat(), "$lte": end.isoformat()},
+            "statut": {"$ne": "Annulé"},
+        },
+        {"_id": 0, "date": 1, "heure": 1},
+    )
+    async for rdv in cursor:
+        booked[rdv["date"]] = booked.get(rdv["date"], 0) | heures_to_mask([rdv.get("heure", "")])
+    return booked
+
+
+async def availability(medecin_id: str, start: date, end: date) -> list[dict]:
+    """Heures ouvertes, réservées et libres de chaque date de la plage (bornes incluses)."""
+    template = await weekly_template(medecin_id)
+    booked = await booked_masks(medecin_id, start, end)
+
+    jours = []
+    current = start
+    while current <= end:
+        jour = jour_de_semaine(current)
+        ouvert = template.get(jour, 0)
+        reserve = booked.get(current.isoformat(), 0) & ouvert
+        jours.append({
+            "date": current.isoformat(),
+            "jour": jour,
+            "heures": mask_to_heures(ouvert),
+            "reservees": mask_to_heures(reserve),
+            "libres": mask_to_heures(ouvert & ~reserve),
+        })
+        current += timedelta(days=1)
+    return jours
+
+
+async def free_slots_for_date(medecin_id: str, day: date) -> list[str]:
+    return (await availability(medecin_id, day, day))[0]["libres"]
+
+
+async def slot_status(medecin_id: str, day: date, heure: str) -> str:
+    """Retourne "libre", "reserve" ou "indisponible" pour un créneau donné."""
+    if not on_grid(heure):
+        return "indisponible"
+    heure = bit_to_heure(heure_to_bit(heure))
+    jour = (await availability(medecin_id, day, day))[0]
+    if heure in jour["libres"]:
+        return "libre"
+    if heure in jour["reservees"]:
+        return "reserve"
+    return "indisponible"
@@ -0,0 +1,261 @@
+import asyncio
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.config import db
+from app.services.passwords import hash_password_bulk
+from app.services.pagination import with_search_key
+from app.services.medecin_directory import medecin_directory
+from app.services.availability import DEFAULT_HOURS, WEEKDAYS
+
+# Nombre de lignes traitées par lot (hachage parallèle puis insert_many)
+IMPORT_BATCH_SIZE = 1000
+
+PROFILE_FIELDS = {
+    "medecins": ["nom", "prenom", "specialite", "genre", "date_naissance"],
+    "patients": ["nom", "prenom", "numero_assurance", "date_naissance", "genre"],
+}
+ADRESSE_FIELDS = ["adresse", "rue", "ville", "code_postal", "pays"]
+CONTACT_FIELDS = ["telephone", "email"]
+REQUIRED_FIELDS = ["username", "password", "nom"]
+
+USER_COLLECTIONS = {"medecins": ("UserMedecins", "Médecin"), "patients": ("UserPatients", "Patient")}
+# Champ reliant chaque collection liée au compte
+OWNER_FIELDS = {"adresses": "user_id", "contacts": "user_id", "disponibilites": "medecin_id"}
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.importes = 0
+        self.erreurs = []
+        self._started = time.perf_counter()
+
+    def error(self, ligne: int, erreur: str):
+        self.erreurs.append({"ligne": ligne, "erreur": erreur})
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "importes": self.importes,
+            "erreurs": self.erreurs,
+            "duree_s": round(time.perf_counter() - self._started, 2),
+        }
+
+
+def _flatten(row: dict) -> dict:
+    """Accepter aussi la forme imbriquée de POST /medecins ({user, medecin, adresse, contact})."""
+    flat = {}
+    for key, value in row.items():
+        if key in ("user", "medecin", "patient", "adresse", "contact") and isinstance(value, dict):
+            flat.update(value)
+        elif key not in flat:
+            flat[key] = value
+    return {k: v.strip() if isinstance(v, str) else v for k, v in flat.items()}
+
+
+def iter_rows(stream, fmt: str):
+    """Lire un flux binaire CSV ou JSONL ligne à ligne ; produit (numéro de ligne, dict ou erreur)."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, _flatten(row)
+    else:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, ValueError(f"JSON invalide : {e.msg}")
+                continue
+            if not isinstance(row, dict):
+                yield number, ValueError("Chaque ligne doit être un objet JSON")
+                continue
+            yield number, _flatten(row)
+
+
+def _next_batch(rows, size: int):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def _failed_indexes(error: BulkWriteError) -> dict:
+    return {e["index"]: e.get("errmsg", "Erreur d'insertion") for e in error.details.get("writeErrors", [])}
+
+
+async def _insert_many(collection: str, docs: list):
+    """insert_many non ordonné ; retourne {index du document: message} pour les échecs."""
+    if not docs:
+        return {}
+    try:
+        await db[collection].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return _failed_indexes(e)
+    return {}
+
+
+async def _rollback(kind: str, users: list):
+    """Supprimer les comptes dont une insertion liée a échoué, et ce qui a été inséré pour eux.
+
+    Sans transaction (MongoDB autonome), c'est ce nettoyage qui évite les
+    comptes orphelins : une ligne est importée entièrement ou pas du tout.
+    """
+    if not users:
+        return
+    user_collection, _ = USER_COLLECTIONS[kind]
+    ids = [user["_id"] for user in users]
+    strs = [str(i) for i in ids]
+    # Le profil médecin référence le compte par ObjectId, le profil patient par chaîne
+    profile_ids = ids if kind == "medecins" else strs
+    await asyncio.gather(
+        db[user_collection].delete_many({"_id": {"$in": ids}}),
+        db[kind].delete_many({"user_id": {"$in": profile_ids}}),
+        *(db[name].delete_many({field: {"$in": strs}}) for name, field in OWNER_FIELDS.items()),
+    )
+
+
+async def _import_batch(kind: str, batch: list, report: ImportReport, seen: set):
+    user_collection, user_type = USER_COLLECTIONS[kind]
+
+    rows = []
+    for number, row in batch:
+        if isinstance(row, Exception):
+            report.error(number, str(row))
+            continue
+        missing = [f for f in REQUIRED_FIELDS if not row.get(f)]
+        if missing:
+            report.error(number, f"Champs obligatoires manquants : {', '.join(missing)}")
+            continue
+        if row["username"] in seen:
+            report.error(number, f"Nom d'utilisateur en double dans le fichier : {row['username']}")
+            continue
+        seen.add(row["username"])
+        rows.append((number, row))
+    if not rows:
+        return
+
+    existing = {
+        u["username"]
+        async for u in db[user_collection].find(
+            {"username": {"$in": [row["username"] for _, row in rows]}}, {"username": 1}
+        )
+    }
+    for number, row in [r for r in rows if r[1]["username"] in existing]:
+        report.error(number, f"Nom d'utilisateur déjà utilisé : {row['username']}")
+    rows = [r for r in rows if r[1]["username"] not in existing]
+    if not rows:
+        return
+
+    hashes = await asyncio.gather(
+        *(hash_password_bulk(str(row["password"])) for _, row in rows), return_exceptions=True
+    )
+
+    now = datetime.utcnow()
+    users, accepted = [], []
+    for (number, row), hashed in zip(rows, hashes):
+        if isinstance(hashed, Exception):
+            report.error(number, f"Hachage du mot de passe impossible : {hashed}")
+            continue
+        user = {"_id": ObjectId(), "username": row["username"], "password": hashed, "user_type": user_type}
+        if kind == "patients":
+            user.update({"face_encoding": None, "date_creation": now})
+        users.append(user)
+        accepted.append((number, row))
+
+    failures = await _insert_many(user_collection, users)
+    for index, message in failures.items():
+        report.error(accepted[index][0], message)
+    created = [(user, item) for i, (user, item) in enumerate(zip(users, accepted)) if i not in failures]
+
+    # Documents liés, insérés en parallèle sur les comptes effectivement créés
+    related = {"profils": [], "adresses": [], "contacts": [], "disponibilites": []}
+    owners = {name: [] for name in related}
+    for user, (number, row) in created:
+        user_id = str(user["_id"])
+        profile = {f: row.get(f, "") for f in PROFILE_FIELDS[kind]}
+        if kind == "medecins":
+            profile["user_id"] = user["_id"]
+        else:
+            profile.update({"user_id": user_id, "date_creation": now})
+        related["profils"].append(with_search_key(profile))
+        owners["profils"].append(number)
+
+        if row.get("adresse") or row.get("ville"):
+            related["adresses"].append({"user_id": user_id, **{f: row.get(f, "") for f in ADRESSE_FIELDS}})
+            owners["adresses"].append(number)
+        if row.get("telephone") or row.get("email"):
+            related["contacts"].append({"user_id": user_id, **{f: row.get(f, "") for f in CONTACT_FIELDS}})
+            owners["contacts"].append(number)
+        if kind == "medecins":
+            for jour in WEEKDAYS:
+                related["disponibilites"].append({"medecin_id": user_id, "jour": jour, "heures": DEFAULT_HOURS})
+                owners["disponibilites"].append(number)
+
+    collections = {"profils": kind, "adresses": "adresses", "contacts": "contacts", "disponibilites": "disponibilites"}
+    results = await asyncio.gather(*(_insert_many(collections[n], related[n]) for n in related))
+
+    failed_numbers = set()
+    for name, failures in zip(related, results):
+        for index, message in failures.items():
+            number = owners[name][index]
+            failed_numbers.add(number)
+            report.error(number, f"{collections[name]} : {message}")
+    await _rollback(kind, [user for user, (number, _) in created if number in failed_numbers])
+    report.importes += len(created) - len(failed_numbers)
+
+
+async def import_stream(kind: str, stream, fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Importer des médecins ou des patients depuis un flux CSV/JSONL, lot par lot.
+
+    Une ligne invalide est signalée dans le rapport sans interrompre l'import.
+    """
+    if kind not in USER_COLLECTIONS:
+        raise ValueError(f"Type d'import inconnu : {kind}")
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Format inconnu : {fmt} (csv ou jsonl)")
+
+    report = ImportReport()
+    seen = set()
+    rows = iter_rows(stream, fmt)
+    while True:
+        # La lecture du fichier se fait hors de la boucle d'événements
+        batch = await asyncio.to_thread(_next_batch, rows, batch_size)
+        if not batch:
+            break
+        report.total += len(batch)
+        await _import_batch(kind, batch, report, seen)
+
+    if kind == "medecins":
+        medecin_directory.invalidate()
+    return report.as_dict()
+
+
+def guess_format(filename: str) -> str:
+    return "csv" if (filename or "").lower().endswith(".csv") else "jsonl"
+
+
+async def _main(kind: str, path: str):
+    with open(path, "rb") as stream:
+        report = await import_stream(kind, stream, guess_format(path))
+    for erreur in report["erreurs"]:
+        print(f"❌ Ligne {erreur['ligne']} : {erreur['erreur']}")
+    print(f"✅ {report['importes']}/{report['total']} {kind} importés en {report['duree_s']} s")
+    return 1 if report["erreurs"] else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in USER_COLLECTIONS:
+        print("Usage : python -m app.services.bulk_import medecins|patients fichier.csv|fichier.jsonl")
+        sys.exit(2)
+    sys.exit(asyncio.run(_main(sys.argv[1], sys.argv[2])))
@@ -0,0 +1,99 @@
+import asyncio
+import copy
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from app.config import db
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie d'un état de conversation en mémoire (secondes)
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "900"))
+# Au-delà de ce nombre d'entrées, les états expirés sont purgés
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "10000"))
+# Conversation abandonnée : supprimée de `chat_temp` par MongoDB après ce délai (index TTL sur updated_at)
+CHAT_TEMP_TTL_SECONDS = int(os.getenv("CHAT_TEMP_TTL_SECONDS", str(24 * 3600)))
+
+
+class ChatSessionStore:
+    """États de conversation du chatbot, en mémoire devant la collection `chat_temp`.
+
+    Les lectures sont servies depuis le cache tant que l'entrée est fraîche ;
+    les écritures mettent le cache à jour puis partent vers MongoDB en tâche
+    de fond, dans l'ordre, pour chaque utilisateur. Le cache suppose que les
+    messages d'un même utilisateur arrivent sur le même worker (routage
+    collant) ; dans le cas contraire l'état est relu depuis MongoDB à
+    l'expiration du TTL.
+    """
+
+    def __init__(self, ttl: float = CHAT_SESSION_TTL):
+        self.ttl = ttl
+        self._cache = {}
+        self._locks = {}
+        self._writes = {}
+
+    @asynccontextmanager
+    async def lock(self, user_id: str):
+        """Sérialiser les tours d'un même utilisateur (double envoi rapide)."""
+        entry = self._locks.setdefault(user_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(user_id, None)
+
+    async def get(self, user_id: str):
+        entry = self._cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return copy.deepcopy(entry[1])
+
+        state = await db["chat_temp"].find_one({"user_id": user_id}, {"_id": 0})
+        self._cache[user_id] = (time.monotonic() + self.ttl, state)
+        return copy.deepcopy(state)
+
+    def set(self, user_id: str, state: dict):
+        state = {**state, "user_id": user_id, "updated_at": datetime.utcnow()}
+        self._cache[user_id] = (time.monotonic() + self.ttl, copy.deepcopy(state))
+        if len(self._cache) > CHAT_SESSION_MAX:
+            self.purge_expired()
+        self._write(user_id, db["chat_temp"].replace_one, {"user_id": user_id}, state, upsert=True)
+
+    def delete(self, user_id: str):
+        self._cache[user_id] = (time.monotonic() + self.ttl, None)
+        self._write(user_id, db["chat_temp"].delete_one, {"user_id": user_id})
+
+    def _write(self, user_id: str, operation, *args, **kwargs):
+        previous = self._writes.get(user_id)
+
+        async def run():
+            if previous:
+                await asyncio.gather(previous, return_exceptions=True)
+            try:
+                await operation(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"❌ Écriture de l'état de conversation {user_id} échouée : {e}")
+                self._cache.pop(user_id, None)
+            finally:
+                if self._writes.get(user_id) is task:
+                    del self._writes[user_id]
+
+        task = asyncio.create_task(run())
+        self._writes[user_id] = task
+
+    async def flush(self):
+        """Attendre la fin des écritures en cours (arrêt de l'application)."""
+        if self._writes:
+            await asyncio.gather(*self._writes.values(), return_exceptions=True)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        for user_id in [u for u, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[user_id]
+
+
+chat_sessions = ChatSessionStore()
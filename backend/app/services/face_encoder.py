@@ -0,0 +1,134 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Taille du pool et profondeur maximale de la file d'attente
+FACE_WORKERS = int(os.getenv("FACE_WORKERS", "2"))
+FACE_QUEUE_MAX = int(os.getenv("FACE_QUEUE_MAX", "32"))
+# Côté maximal de l'image utilisée pour la détection HOG
+FACE_DETECT_MAX_SIDE = int(os.getenv("FACE_DETECT_MAX_SIDE", "640"))
+
+
+class EncoderBusy(Exception):
+    """La file d'attente d'encodage est pleine."""
+
+
+# 🔹 Code exécuté dans les processus du pool
+
+def _init_worker():
+    # L'import de face_recognition charge les modèles dlib (détecteur HOG,
+    # prédicteur de points, encodeur ResNet) une seule fois par processus.
+    import face_recognition  # noqa: F401
+
+
+def _encode_image(data: bytes, max_side: int):
+    """Décoder l'image, détecter le visage sur une copie réduite et encoder en pleine résolution."""
+    import cv2
+    import numpy as np
+    import face_recognition
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    height, width = rgb.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(rgb, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    else:
+        small = rgb
+
+    locations = face_recognition.face_locations(small, model="hog")
+    if not locations:
+        return None
+
+    # Reprojeter les boîtes sur l'image originale : les points de repère et
+    # l'encodage sont calculés en pleine résolution.
+    top, right, bottom, left = locations[0]
+    box = (
+        int(top / scale),
+        min(width, int(right / scale)),
+        min(height, int(bottom / scale)),
+        int(left / scale),
+    )
+    encodings = face_recognition.face_encodings(rgb, known_face_locations=[box])
+    if not encodings:
+        return None
+    return encodings[0].tolist()
+
+
+def _timed_encode(data: bytes, max_side: int):
+    # perf_counter est monotone à l'échelle de la machine sous Linux,
+    # ce qui permet de mesurer l'attente dans la file depuis le parent.
+    started_at = time.perf_counter()
+    return _encode_image(data, max_side), started_at
+
+
+# 🔹 Côté application
+
+class FaceEncoder:
+    """Pool de processus borné pour l'encodage facial, avec métriques."""
+
+    def __init__(self, workers: int = FACE_WORKERS, queue_max: int = FACE_QUEUE_MAX,
+                 max_side: int = FACE_DETECT_MAX_SIDE):
+        self.workers = workers
+        self.queue_max = queue_max
+        self.max_side = max_side
+        self._executor = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def encode(self, data: bytes):
+        """Retourner l'encodage (liste de 128 floats) du premier visage détecté, ou None."""
+        if self._pending >= self.queue_max:
+            self._rejected += 1
+            raise EncoderBusy()
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        self._pending += 1
+        future = loop.run_in_executor(self._executor, _timed_encode, data, self.max_side)
+        try:
+            encoding, started_at = await future
+        finally:
+            self._pending -= 1
+
+        finished_at = time.perf_counter()
+        latency = finished_at - queued_at
+        self._completed += 1
+        self._total_latency += latency
+        self._total_wait += max(0.0, started_at - queued_at)
+        self._max_latency = max(self._max_latency, latency)
+        return encoding
+
+    def metrics(self):
+        completed = self._completed or 1
+        return {
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "queue_depth": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_latency_ms": round(1000 * self._total_latency / completed, 1),
+            "avg_wait_ms": round(1000 * self._total_wait / completed, 1),
+            "max_latency_ms": round(1000 * self._max_latency, 1),
+        }
+
+
+face_encoder = FaceEncoder()
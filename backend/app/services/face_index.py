@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app import features
+from app.config import db
+
+logger = logging.getLogger(__name__)
+
+# numpy n'est importé qu'au premier encodage indexé (voir _numpy)
+np = None
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+# Collections contenant des encodages faciaux, par type d'utilisateur
+FACE_COLLECTIONS = {
+    "Patient": "UserPatients",
+    "Médecin": "UserMedecins",
+}
+
+ENCODING_SIZE = 128
+DEFAULT_TOLERANCE = 0.6  # même seuil que face_recognition.compare_faces
+
+# Journal des modifications (enrôlement, suppression, changement de nom) relu par chaque worker
+FACE_EVENTS_COLLECTION = "face_index_events"
+FACE_EVENTS_TTL_SECONDS = 24 * 3600
+FACE_SYNC_SECONDS = float(os.getenv("FACE_SYNC_SECONDS", "5"))
+# Fenêtre relue à chaque synchronisation, pour tolérer les écarts d'horloge entre machines
+FACE_SYNC_OVERLAP_SECONDS = float(os.getenv("FACE_SYNC_OVERLAP_SECONDS", "60"))
+
+
+class _Partition:
+    """Matrice float32 contiguë des encodages d'un type d'utilisateur."""
+
+    def __init__(self, capacity: int = 1024):
+        _numpy()
+        self.matrix = np.empty((capacity, ENCODING_SIZE), dtype=np.float32)
+        self.sq_norms = np.empty(capacity, dtype=np.float32)
+        self.size = 0
+        self.user_ids: list[str] = []
+        self.usernames: list[str] = []
+        self.rows: dict[str, int] = {}
+
+    def _grow(self):
+        capacity = self.matrix.shape[0] * 2
+        matrix = np.empty((capacity, ENCODING_SIZE), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        sq_norms[:self.size] = self.sq_norms[:self.size]
+        self.matrix, self.sq_norms = matrix, sq_norms
+
+    def upsert(self, user_id: str, username: str, encoding):
+        vector = np.asarray(encoding, dtype=np.float32)
+        row = self.rows.get(user_id)
+        if row is None:
+            if self.size == self.matrix.shape[0]:
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[user_id] = row
+            self.user_ids.append(user_id)
+            self.usernames.append(username)
+        else:
+            self.usernames[row] = username
+        self.matrix[row] = vector
+        self.sq_norms[row] = vector @ vector
+
+    def remove(self, user_id: str):
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            # On déplace la dernière ligne dans le trou pour rester contigu
+            self.matrix[row] = self.matrix[last]
+            self.sq_norms[row] = self.sq_norms[last]
+            self.user_ids[row] = self.user_ids[last]
+            self.usernames[row] = self.usernames[last]
+            self.rows[self.user_ids[row]] = row
+        self.user_ids.pop()
+        self.usernames.pop()
+        self.size = last
+
+    def distances(self, probe, probe_sq: float):
+        """Distances euclidiennes de la sonde à toute la partition, en un seul produit matriciel."""
+        matrix = self.matrix[:self.size]
+        sq = self.sq_norms[:self.size] - 2.0 * (matrix @ probe) + probe_sq
+        return np.sqrt(np.maximum(sq, 0.0))
+
+
+class FaceIndex:
+    """Index en mémoire des encodages faciaux, partitionné par type d'utilisateur.
+
+    Les partitions sont créées au premier usage ; sans la fonctionnalité
+    `face_login`, l'index reste vide et numpy n'est jamais importé.
+
+    Chaque worker garde sa propre copie : les routes appellent `changed()`
+    après une écriture, qui met à jour l'index local et publie un événement
+    que les autres workers appliquent via `run_sync()`.
+    """
+
+    def __init__(self):
+        self.partitions = {}
+        self._synced_at = None
+        # _id des événements déjà appliqués dans la fenêtre de relecture
+        self._applied = {}
+
+    def _partition(self, user_type: str):
+        if user_type not in self.partitions:
+            self.partitions[user_type] = _Partition()
+        return self.partitions[user_type]
+
+    async def load(self, db):
+        """Charger tous les encodages enregistrés depuis MongoDB."""
+        started = datetime.utcnow()
+        self.partitions = {}
+        for user_type, collection in FACE_COLLECTIONS.items():
+            cursor = db[collection].find(
+                {"face_encoding": {"$type": "array"}},
+                {"username": 1, "face_encoding": 1},
+            )
+            async for user in cursor:
+                self.upsert(user_type, str(user["_id"]), user.get("username", ""), user["face_encoding"])
+        self._synced_at = started
+        self._applied = {}
+
+    async def refresh(self, user_type: str, user_id: str):
+        """Relire un utilisateur : encodage et nom à jour, ou retrait s'il n'existe plus."""
+        user = await db[FACE_COLLECTIONS[user_type]].find_one(
+            {"_id": ObjectId(user_id)}, {"username": 1, "face_encoding": 1}
+        )
+        if user:
+            self.upsert(user_type, user_id, user.get("username", ""), user.get("face_encoding"))
+        else:
+            self.remove(user_type, user_id)
+
+    async def changed(self, user_type: str, user_id: str):
+        """À appeler après toute écriture sur l'encodage ou le nom d'un utilisateur (ou sa suppression)."""
+        if user_type not in FACE_COLLECTIONS or not features.enabled("face_login"):
+            return
+        result = await db[FACE_EVENTS_COLLECTION].insert_one(
+            {"user_type": user_type, "user_id": user_id, "at": datetime.utcnow()}
+        )
+        self._applied[result.inserted_id] = datetime.utcnow()
+        await self.refresh(user_type, user_id)
+
+    async def sync(self):
+        """Appliquer les événements publiés par les autres workers depuis la dernière synchronisation."""
+        if self._synced_at is None:
+            return 0
+        now = datetime.utcnow()
+        since = self._synced_at - timedelta(seconds=FACE_SYNC_OVERLAP_SECONDS)
+        applied = 0
+        cursor = db[FACE_EVENTS_COLLECTION].find({"at": {"$gt": since}}).sort("at", 1)
+        async for event in cursor:
+            if event["_id"] in self._applied:
+                continue
+            await self.refresh(event["user_type"], event["user_id"])
+            self._applied[event["_id"]] = event["at"]
+            applied += 1
+        self._applied = {i: at for i, at in self._applied.items() if at > since}
+        self._synced_at = now
+        return applied
+
+    async def run_sync(self):
+        """Boucle de synchronisation lancée dans le lifespan de l'application."""
+        while True:
+            await asyncio.sleep(FACE_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Synchronisation de l'index facial : {e}")
+
+    def upsert(self, user_type: str, user_id: str, username: str, encoding):
+        """Ajouter ou remplacer l'encodage d'un utilisateur (ignoré si invalide)."""
+        if user_type not in FACE_COLLECTIONS or not features.enabled("face_login"):
+            return
+        if not encoding or len(encoding) != ENCODING_SIZE:
+            self.remove(user_type, user_id)
+            return
+        self._partition(user_type).upsert(user_id, username, encoding)
+
+    def remove(self, user_type: str, user_id: str):
+        if user_type in self.partitions:
+            self.partitions[user_type].remove(user_id)
+
+    def search(self, encoding, k: int = 1, tolerance: float = DEFAULT_TOLERANCE):
+        """Retourner les k meilleurs candidats sous le seuil, tous types confondus."""
+        _numpy()
+        probe = np.asarray(encoding, dtype=np.float32)
+        probe_sq = float(probe @ probe)
+
+        candidates = []
+        for user_type, partition in self.partitions.items():
+            if partition.size == 0:
+                continue
+            distances = partition.distances(probe, probe_sq)
+            top = min(k, partition.size)
+            best = np.argpartition(distances, top - 1)[:top]
+            for row in best:
+                distance = float(distances[row])
+                if distance <= tolerance:
+                    candidates.append({
+                        "_id": partition.user_ids[row],
+                        "username": partition.usernames[row],
+                        "user_type": user_type,
+                        "distance": distance,
+                    })
+
+        candidates.sort(key=lambda c: c["distance"])
+        return candidates[:k]
+
+    def match(self, encoding, tolerance: float = DEFAULT_TOLERANCE):
+        """Retourner l'utilisateur le plus proche sous le seuil, ou None."""
+        candidates = self.search(encoding, k=1, tolerance=tolerance)
+        return candidates[0] if candidates else None
+
+    def __len__(self):
+        return sum(p.size for p in self.partitions.values())
+
+
+face_index = FaceIndex()
@@ -0,0 +1,73 @@
+"""Baux MongoDB : une tâche à la fois parmi tous les workers.
+
+Sous gunicorn, chaque worker exécute le lifespan de l'application. Les
+tâches qui ne doivent tourner qu'une fois (migrations au démarrage,
+archivage périodique) prennent d'abord un bail dans la collection
+`leases` ; un bail non renouvelé expire, et un autre worker reprend la
+tâche si son détenteur s'est arrêté.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from app.config import db
+
+logger = logging.getLogger(__name__)
+
+LEASES_COLLECTION = "leases"
+MIGRATIONS_COLLECTION = "migrations"
+# Durée d'un bail de migration et intervalle d'attente des autres workers
+MIGRATION_LEASE_SECONDS = float(os.getenv("MIGRATION_LEASE_SECONDS", "600"))
+MIGRATION_WAIT_SECONDS = float(os.getenv("MIGRATION_WAIT_SECONDS", "1"))
+
+_TOKEN = uuid.uuid4().hex[:8]
+
+
+def owner() -> str:
+    # Le pid distingue les workers forkés après l'import du module
+    return f"{socket.gethostname()}:{os.getpid()}:{_TOKEN}"
+
+
+async def acquire(name: str, ttl_seconds: float) -> bool:
+    """Prendre (ou renouveler) le bail `name` ; False s'il est détenu par un autre worker."""
+    now = datetime.utcnow()
+    try:
+        await db[LEASES_COLLECTION].update_one(
+            {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner()}]},
+            {"$set": {"owner": owner(), "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release(name: str):
+    await db[LEASES_COLLECTION].delete_one({"_id": name, "owner": owner()})
+
+
+async def run_once(name: str, migration) -> bool:
+    """Exécuter la migration `name` une seule fois pour toute la base.
+
+    Un seul worker l'exécute ; les autres attendent qu'elle soit marquée
+    terminée dans `migrations` avant de poursuivre leur démarrage.
+    Retourne True si ce worker l'a exécutée.
+    """
+    lease = f"migration:{name}"
+    while True:
+        if await db[MIGRATIONS_COLLECTION].find_one({"_id": name}, {"_id": 1}):
+            return False
+        if await acquire(lease, MIGRATION_LEASE_SECONDS):
+            try:
+                if await db[MIGRATIONS_COLLECTION].find_one({"_id": name}, {"_id": 1}):
+                    return False
+                await migration()
+                await db[MIGRATIONS_COLLECTION].insert_one({"_id": name, "done_at": datetime.utcnow(), "by": owner()})
+                logger.info(f"🧭 Migration '{name}' terminée")
+                return True
+            finally:
+                await release(lease)
+        await asyncio.sleep(MIGRATION_WAIT_SECONDS)
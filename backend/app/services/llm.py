@@ -0,0 +1,100 @@
+import json
+import os
+from app.services.metrics import track_outbound
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "ALIENTELLIGENCE/medicaldiagnostictools")
+# Durée pendant laquelle Ollama garde le modèle chargé en mémoire après un appel
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+
+
+class LLMError(Exception):
+    """Ollama est injoignable, a expiré ou a renvoyé une réponse invalide."""
+
+
+class OllamaClient:
+    """Client Ollama asynchrone partagé, avec pool de connexions."""
+
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = OLLAMA_MODEL,
+                 keep_alive: str = OLLAMA_KEEP_ALIVE, max_connections: int = OLLAMA_MAX_CONNECTIONS):
+        self.base_url = base_url
+        self.model = model
+        self.keep_alive = keep_alive
+        self.max_connections = max_connections
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        return {"model": self.model, "prompt": prompt, "stream": stream, "keep_alive": self.keep_alive}
+
+    async def generate(self, prompt: str, timeout: float = 60) -> str:
+        """Retourner la réponse complète du modèle."""
+        import httpx
+
+        try:
+            with track_outbound("ollama"):
+                response = await self.client.post("/api/generate", json=self._payload(prompt, False), timeout=timeout)
+                response.raise_for_status()
+                result = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(str(e) or type(e).__name__)
+
+        # Certains modèles renvoient une liste ou un champ "message"
+        if isinstance(result, list):
+            result = result[0] if result else {}
+        return (result.get("response") or result.get("message") or "").strip()
+
+    async def stream(self, prompt: str, timeout: float = 60):
+        """Générer les fragments de texte au fur et à mesure qu'Ollama les produit."""
+        import httpx
+
+        try:
+            with track_outbound("ollama"):
+                async with self.client.stream(
+                    "POST", "/api/generate", json=self._payload(prompt, True), timeout=timeout
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMError(str(e) or type(e).__name__)
+
+
+def ndjson_stream(tokens, field: str):
+    """Adapter un flux de fragments en lignes NDJSON pour StreamingResponse."""
+    async def body():
+        try:
+            async for token in tokens:
+                yield json.dumps({field: token}, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+        except LLMError as e:
+            yield json.dumps({"error": str(e), "done": True}, ensure_ascii=False) + "\n"
+    return body()
+
+
+ollama = OllamaClient()
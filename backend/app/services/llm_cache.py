@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from app.config import db
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def normalize_text(text: str, symptoms: bool = False) -> str:
+    """Forme canonique d'une saisie clinique : casse, accents et espaces.
+
+    Pour une liste de symptômes (`symptoms=True`), l'ordre des éléments ne
+    compte pas : ils sont dédoublonnés et triés. Un texte libre (diagnostic)
+    garde son ordre, qui porte du sens.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    if not symptoms:
+        return re.sub(r"\s+", " ", text).strip(" .")
+    parts = re.split(r"[,;\n]+|\s+et\s+", text)
+    parts = {re.sub(r"\s+", " ", p).strip(" .") for p in parts}
+    return ", ".join(sorted(p for p in parts if p))
+
+
+def cache_key(model: str, prompt_fn, text: str, symptoms: bool = False) -> str:
+    """Clé dérivée du modèle, du gabarit de prompt et de la saisie normalisée.
+
+    Le gabarit est identifié par son rendu à vide : toute modification du
+    texte du prompt ou du modèle change la clé, sans invalidation manuelle.
+    """
+    template = prompt_fn("")
+    material = "\x1f".join([model, template, normalize_text(text, symptoms)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class LLMCache:
+    """Cache à deux niveaux : LRU en mémoire puis MongoDB avec expiration TTL.
+
+    Une erreur MongoDB n'interrompt pas la requête : elle compte comme un
+    défaut de cache et la réponse est demandée au modèle.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self.hits_memory = 0
+        self.hits_mongo = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _remember(self, key: str, value: str):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            self.hits_memory += 1
+            return self._lru[key]
+
+        try:
+            doc = await db["llm_cache"].find_one({"_id": key}, {"value": 1})
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Cache LLM indisponible en lecture : {e}")
+            doc = None
+        if doc:
+            self.hits_mongo += 1
+            self._remember(key, doc["value"])
+            return doc["value"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        if not value:
+            return
+        self._remember(key, value)
+        try:
+            await db["llm_cache"].update_one(
+                {"_id": key},
+                {"$set": {"value": value, "created_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Cache LLM indisponible en écriture : {e}")
+
+    def stats(self):
+        total = self.hits_memory + self.hits_mongo + self.misses
+        return {
+            "entries_memory": len(self._lru),
+            "hits_memory": self.hits_memory,
+            "hits_mongo": self.hits_mongo,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round((self.hits_memory + self.hits_mongo) / total, 3) if total else 0.0,
+        }
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import time
+from app.services.llm import ollama, LLMError
+
+# Ordre de service : diagnostic avant traitement avant questions libres
+PRIORITIES = {"diagnostic": 0, "traitement": 1, "libre": 2}
+
+# Générations simultanées envoyées à Ollama (une instance locale sature vite)
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "2"))
+# Demandes en attente au-delà desquelles on répond 429
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+# Attente maximale d'un créneau (secondes), indépendante du délai de génération
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+# Estimation initiale de la durée d'une génération (secondes), affinée au fil des appels
+LLM_INITIAL_SERVICE_SECONDS = float(os.getenv("LLM_INITIAL_SERVICE_SECONDS", "10"))
+
+
+class QueueFull(LLMError):
+    """File d'attente du modèle pleine ; réessayer après `retry_after` secondes."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Assistant IA saturé, réessayez dans {retry_after} s")
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """Contrôle d'admission devant Ollama.
+
+    Au plus `max_in_flight` générations à la fois ; les suivantes attendent
+    dans une file bornée, servie par priorité puis par ordre d'arrivée. Les
+    prompts identiques déjà en cours partagent la même génération.
+
+    Deux délais distincts : `queue_timeout` borne l'attente d'un créneau
+    (QueueFull au-delà), `timeout` borne la génération une fois commencée.
+    """
+
+    def __init__(self, client=ollama, max_in_flight: int = LLM_MAX_IN_FLIGHT, max_queue: int = LLM_MAX_QUEUE):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._in_flight = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._pending = {}
+        self._service_seconds = LLM_INITIAL_SERVICE_SECONDS
+        self._stats = {"completed": 0, "rejected": 0, "timed_out": 0, "deduplicated": 0, "wait_total_ms": 0.0, "wait_max_ms": 0.0}
+
+    # 🔹 Créneaux de génération
+
+    def retry_after(self) -> int:
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._service_seconds * backlog / self.max_in_flight))
+
+    def admit(self):
+        """Refuser tout de suite si la file est pleine (avant d'ouvrir un flux de réponse)."""
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise QueueFull(self.retry_after())
+
+    async def _acquire(self, priority: int, queue_timeout: float):
+        started = time.monotonic()
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+        else:
+            self.admit()
+            entry = (priority, next(self._seq), asyncio.get_running_loop().create_future())
+            heapq.heappush(self._waiters, entry)
+            try:
+                await asyncio.wait({entry[2]}, timeout=queue_timeout)
+            except asyncio.CancelledError:
+                self._abandon(entry)
+                raise
+            if not entry[2].done():
+                self._abandon(entry)
+                self._stats["timed_out"] += 1
+                raise QueueFull(self.retry_after())
+
+        waited_ms = (time.monotonic() - started) * 1000
+        self._stats["wait_total_ms"] += waited_ms
+        self._stats["wait_max_ms"] = max(self._stats["wait_max_ms"], waited_ms)
+
+    def _abandon(self, entry):
+        if entry[2].done():
+            # Le créneau venait d'être transmis : le rendre
+            self._release()
+        else:
+            entry[2].cancel()
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    def _release(self):
+        if self._waiters:
+            # Le créneau passe directement au prochain demandeur
+            _, _, future = heapq.heappop(self._waiters)
+            future.set_result(None)
+        else:
+            self._in_flight -= 1
+
+    def _record(self, started: float):
+        self._stats["completed"] += 1
+        # Moyenne glissante de la durée d'une génération, pour Retry-After
+        self._service_seconds = 0.8 * self._service_seconds + 0.2 * (time.monotonic() - started)
+
+    # 🔹 Générations
+
+    async def _generate(self, prompt: str, priority: int, timeout: float, queue_timeout: float) -> str:
+        await self._acquire(priority, queue_timeout)
+        started = time.monotonic()
+        try:
+            return await self.client.generate(prompt, timeout=timeout)
+        finally:
+            self._record(started)
+            self._release()
+
+    async def generate(self, prompt: str, kind: str = "libre", timeout: float = 60,
+                       queue_timeout: float = LLM_QUEUE_TIMEOUT) -> str:
+        """Réponse complète ; un prompt identique déjà en cours est partagé."""
+        key = hashlib.sha256(prompt.encode()).hexdigest()
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(prompt, PRIORITIES[kind], timeout, queue_timeout))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self._stats["deduplicated"] += 1
+        # shield : l'abandon d'un demandeur n'annule pas la génération partagée
+        return await asyncio.shield(task)
+
+    async def stream(self, prompt: str, kind: str = "libre", timeout: float = 60,
+                     queue_timeout: float = LLM_QUEUE_TIMEOUT):
+        """Fragments de la réponse, une fois un créneau obtenu."""
+        await self._acquire(PRIORITIES[kind], queue_timeout)
+        started = time.monotonic()
+        try:
+            async for token in self.client.stream(prompt, timeout=timeout):
+                yield token
+        finally:
+            self._record(started)
+            self._release()
+
+    def stats(self):
+        completed = self._stats["completed"]
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "completed": completed,
+            "rejected": self._stats["rejected"],
+            "timed_out": self._stats["timed_out"],
+            "deduplicated": self._stats["deduplicated"],
+            "wait_avg_ms": round(self._stats["wait_total_ms"] / completed, 1) if completed else 0.0,
+            "wait_max_ms": round(self._stats["wait_max_ms"], 1),
+            "service_avg_s": round(self._service_seconds, 2),
+        }
+
+
+llm_scheduler = LLMScheduler()
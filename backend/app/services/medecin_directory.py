@@ -0,0 +1,72 @@
+import os
+import time
+from bson import ObjectId
+from app.config import db
+from app.services.name_index import NameIndex
+
+# Durée de validité de la liste des médecins en mémoire (secondes)
+MEDECIN_DIRECTORY_TTL = float(os.getenv("MEDECIN_DIRECTORY_TTL", "300"))
+
+PROJECTION = {"user_id": 1, "nom": 1, "prenom": 1, "specialite": 1}
+
+
+class MedecinDirectory:
+    """Liste des médecins en mémoire avec index de recherche par nom.
+
+    Rechargée entièrement à l'expiration du TTL (modifications faites par un
+    autre worker) et mise à jour fiche par fiche par les routes `medecins`.
+    """
+
+    def __init__(self, ttl: float = MEDECIN_DIRECTORY_TTL):
+        self.ttl = ttl
+        self._medecins = {}
+        self._index = NameIndex()
+        self._expires_at = 0.0
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    async def _ensure_loaded(self):
+        if self._expires_at > time.monotonic():
+            return
+        medecins = await db["medecins"].find({}, PROJECTION).to_list(length=None)
+        self._medecins = {}
+        self._index.clear()
+        for medecin in medecins:
+            self._put(medecin)
+        self._expires_at = time.monotonic() + self.ttl
+
+    def _put(self, medecin: dict):
+        key = str(medecin["user_id"])
+        self._medecins[key] = medecin
+        self._index.add(key, medecin)
+
+    async def refresh(self, user_id: str):
+        """Recharger une seule fiche après création ou modification."""
+        medecin = await db["medecins"].find_one({"user_id": ObjectId(user_id)}, PROJECTION)
+        if medecin:
+            self._put(medecin)
+        else:
+            self.remove(user_id)
+
+    def remove(self, user_id: str):
+        self._medecins.pop(user_id, None)
+        self._index.remove(user_id)
+
+    async def all(self) -> list[dict]:
+        await self._ensure_loaded()
+        return list(self._medecins.values())
+
+    async def match(self, text: str, limit: int = 5):
+        """Médecin correspondant à une saisie libre (accents et fautes tolérés).
+
+        Retourne (médecin, candidats) : le médecin est None si aucun ne
+        correspond ou si plusieurs sont trop proches pour trancher.
+        """
+        await self._ensure_loaded()
+        key, results = self._index.best(text, limit)
+        candidats = [self._medecins[k] for _, k in results]
+        return (self._medecins[key] if key else None), candidats
+
+
+medecin_directory = MedecinDirectory()
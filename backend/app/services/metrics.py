@@ -0,0 +1,216 @@
+"""Métriques Prometheus de l'API (format texte, sans dépendance).
+
+- `MetricsMiddleware` : middleware ASGI pur, latence par modèle de route
+  (`/patients/{user_id}` et non l'URL réelle), requêtes en cours, statuts ;
+- `MongoCommandMetrics` : CommandListener pymongo qui attribue le nombre et
+  la durée des commandes MongoDB à la route en cours ;
+- `track_outbound(cible)` : appels sortants (Ollama, OpenAI, SMTP, PHQ-9).
+
+Chaque mise à jour est une addition sous verrou : le coût par requête reste
+de l'ordre de quelques microsecondes.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+
+# Bornes des histogrammes (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+# Requêtes hors route connue (404, tâches de fond)
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # [compte par intervalle..., +Inf], somme
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "bienetre_http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "bienetre_http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "bienetre_http_requests_in_flight", "Requêtes HTTP en cours", ("method",)))
+mongo_commands = registry.register(Counter(
+    "bienetre_mongo_commands_total", "Commandes MongoDB", ("route", "command", "outcome")))
+mongo_latency = registry.register(Histogram(
+    "bienetre_mongo_command_duration_seconds", "Durée des commandes MongoDB",
+    ("route", "command"), MONGO_BUCKETS))
+outbound_calls = registry.register(Counter(
+    "bienetre_outbound_calls_total", "Appels vers les services externes", ("target", "outcome")))
+outbound_latency = registry.register(Histogram(
+    "bienetre_outbound_call_duration_seconds", "Durée des appels vers les services externes", ("target",)))
+
+# Scope ASGI de la requête en cours (Motor copie le contexte dans ses threads)
+current_scope: ContextVar = ContextVar("current_scope", default=None)
+
+
+def route_template(scope) -> str:
+    """Modèle de la route résolue par FastAPI, ex. /patients/{user_id}."""
+    if scope is None:
+        return BACKGROUND_ROUTE
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence, statut et requêtes en cours par route."""
+
+    def __init__(self, app, exclude=("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = current_scope.set(scope)
+        http_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec(method)
+            current_scope.reset(token)
+            route = route_template(scope)
+            http_latency.observe(elapsed, method, route)
+            http_requests.inc(method, route, str(status["code"]))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Nombre et durée des commandes MongoDB, par route et par commande."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+    def _record(self, event, outcome: str):
+        route = route_template(current_scope.get())
+        mongo_commands.inc(route, event.command_name, outcome)
+        mongo_latency.observe(event.duration_micros / 1_000_000, route, event.command_name)
+
+
+@contextmanager
+def track_outbound(target: str):
+    """Compter et chronométrer un appel sortant ; une exception le compte en erreur."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        outbound_latency.observe(time.perf_counter() - start, target)
+        outbound_calls.inc(target, outcome)
+
+
+mongo_listener = MongoCommandMetrics()
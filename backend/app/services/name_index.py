@@ -0,0 +1,178 @@
+import re
+import unicodedata
+
+# Mots ignorés dans une saisie du type « Dr Lefèvre »
+STOPWORDS = {"dr", "docteur", "doctor", "pr", "professeur", "le", "la", "de", "du"}
+
+# Poids de chaque champ dans le score final
+FIELD_WEIGHTS = {"nom": 1.0, "complet": 1.0, "prenom": 0.9, "specialite": 0.7}
+
+# Score minimal pour retenir un candidat
+MIN_SCORE = 0.35
+# Score d'une correspondance par préfixe (« lef »), juste sous une correspondance exacte
+PREFIX_SCORE = 0.9
+# Écart minimal entre les deux premiers candidats pour considérer le premier comme certain
+AMBIGUITY_MARGIN = 0.1
+# Tolérance sur l'écart : 1.0 - 0.9 vaut 0.0999… en flottants
+SCORE_EPSILON = 1e-9
+
+
+def normalize(text: str) -> list[str]:
+    """Jetons d'un texte sans casse, sans accents ni ponctuation."""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in re.split(r"[^a-z0-9]+", text) if t]
+
+
+def trigrams(tokens: list[str]) -> set[str]:
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def dice(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        # Identifiants de tous les jetons passant par ce nœud (avec multiplicité)
+        self.ids = {}
+
+
+class NameIndex:
+    """Index en mémoire des noms : trie de jetons normalisés et trigrammes.
+
+    Le trie répond aux préfixes (« lef » → Lefèvre), les trigrammes aux fautes
+    de frappe ; les deux fournissent les candidats, classés ensuite par
+    similarité sur nom, prénom et spécialité.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._trigrams = {}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self.__init__()
+
+    def _fields(self, doc: dict) -> dict:
+        nom = normalize(doc.get("nom", ""))
+        prenom = normalize(doc.get("prenom", ""))
+        return {
+            "nom": nom,
+            "prenom": prenom,
+            "complet": prenom + nom,
+            "specialite": normalize(doc.get("specialite", "")),
+        }
+
+    def add(self, key: str, doc: dict):
+        self.remove(key)
+        fields = self._fields(doc)
+        grams = {name: trigrams(tokens) for name, tokens in fields.items()}
+        tokens = set(fields["nom"] + fields["prenom"] + fields["specialite"])
+        self._entries[key] = (fields, grams)
+
+        for token in tokens:
+            node = self._root
+            for char in token:
+                node = node.children.setdefault(char, _TrieNode())
+                node.ids[key] = node.ids.get(key, 0) + 1
+        for gram in set().union(*grams.values()):
+            self._trigrams.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        fields, grams = entry
+
+        for token in set(fields["nom"] + fields["prenom"] + fields["specialite"]):
+            path = [self._root]
+            for char in token:
+                path.append(path[-1].children[char])
+            for parent, char, node in zip(path, token, path[1:]):
+                node.ids[key] -= 1
+                if node.ids[key] == 0:
+                    del node.ids[key]
+                if not node.ids:
+                    del parent.children[char]
+                    break
+        for gram in set().union(*grams.values()):
+            keys = self._trigrams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._trigrams[gram]
+
+    def _prefix(self, token: str) -> set:
+        node = self._root
+        for char in token:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return set(node.ids)
+
+    @staticmethod
+    def _query(text: str) -> list[str]:
+        return [t for t in normalize(text) if t not in STOPWORDS]
+
+    def _exact(self, key: str, query: list[str]) -> bool:
+        fields, _ = self._entries[key]
+        return query in (fields["nom"], fields["complet"])
+
+    def search(self, text: str, limit: int = 5) -> list[tuple[float, str]]:
+        """Candidats (score, clé) triés par score décroissant."""
+        query = self._query(text)
+        if not query:
+            return []
+        query_grams = trigrams(query)
+
+        candidates = set()
+        for token in query:
+            candidates |= self._prefix(token)
+        for gram in query_grams:
+            candidates |= self._trigrams.get(gram, set())
+
+        scored = []
+        for key in candidates:
+            fields, grams = self._entries[key]
+            score = 0.0
+            for name, field_tokens in fields.items():
+                weight = FIELD_WEIGHTS[name]
+                score = max(score, weight * dice(query_grams, grams[name]))
+                # Chaque jeton saisi commence un jeton du champ : correspondance par préfixe
+                if all(any(t.startswith(q) for t in field_tokens) for q in query):
+                    score = max(score, PREFIX_SCORE * weight)
+            if score >= MIN_SCORE:
+                scored.append((round(score, 3), key))
+
+        scored.sort(key=lambda s: -s[0])
+        return scored[:limit]
+
+    def best(self, text: str, limit: int = 5):
+        """Meilleure clé si elle se détache nettement, sinon None ; avec la liste des candidats.
+
+        Un seul candidat dont le nom (ou prénom + nom) est exactement la saisie
+        l'emporte d'office : « Martin » désigne Martin, pas Martinez.
+        """
+        results = self.search(text, limit)
+        if not results:
+            return None, []
+        query = self._query(text)
+        exact = [key for _, key in results if self._exact(key, query)]
+        if len(exact) == 1:
+            return exact[0], results
+        if len(results) == 1 or results[0][0] - results[1][0] >= AMBIGUITY_MARGIN - SCORE_EPSILON:
+            return results[0][1], results
+        return None, results
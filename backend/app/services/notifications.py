@@ -0,0 +1,32 @@
+"""Contenu des e-mails de notification envoyés aux patients et aux médecins.
+
+Les routes ne rédigent rien elles-mêmes : elles mettent un type de
+notification et ses paramètres en file (`app.services.outbox`), et le
+dispatcher rédige le message avec `render()` au moment de l'envoi.
+"""
+
+# 🔹 Sujet et corps de chaque type de notification
+TEMPLATES = {
+    "creation": (
+        "Confirmation de votre rendez-vous",
+        "Bonjour,\n\nVotre rendez-vous avec le Dr. {nom_medecin} le {date} à {heure} a bien été enregistré.\n\nL'équipe BienEtre",
+    ),
+    "modification": (
+        "Modification de votre rendez-vous",
+        "Bonjour,\n\nVotre rendez-vous avec le Dr. {nom_medecin} a été modifié : {date} à {heure}.\n\nL'équipe BienEtre",
+    ),
+    "annulation": (
+        "Annulation de votre rendez-vous",
+        "Bonjour,\n\nVotre rendez-vous avec le Dr. {nom_medecin} du {date} à {heure} a été annulé.\n\nL'équipe BienEtre",
+    ),
+    "verification": (
+        "Votre code de vérification BienEtre",
+        "Bonjour,\n\nVotre code de vérification est : {code}\n\nL'équipe BienEtre",
+    ),
+}
+
+
+def render(kind: str, **params) -> tuple[str, str]:
+    """Retourner (sujet, corps) d'une notification."""
+    subject, body = TEMPLATES[kind]
+    return subject, body.format(**params)
@@ -0,0 +1,87 @@
+import os
+from app import features
+from app.services.metrics import track_outbound
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+# Permet de pointer vers un serveur compatible OpenAI (tests, proxy)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+SYSTEM_PROMPT = "Tu es Khodia, un assistant médical de la clinique Bienêtre. Réponds toujours en français."
+
+
+class OpenAIChat:
+    """Client AsyncOpenAI partagé entre les requêtes, avec pool de connexions borné.
+
+    Le SDK OpenAI n'est importé qu'à la création du client (premier appel).
+    """
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def available(self) -> bool:
+        return features.enabled("chatbot_llm") and bool(os.getenv("OPENAI_API_KEY"))
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=OPENAI_BASE_URL,
+                timeout=OPENAI_TIMEOUT,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                    ),
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def _messages(self, message: str):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": message},
+        ]
+
+    async def complete(self, message: str) -> str:
+        with track_outbound("openai"):
+            completion = await self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=self._messages(message),
+                max_tokens=500,
+                temperature=0.7,
+            )
+        return (completion.choices[0].message.content or "").strip()
+
+    async def stream(self, message: str):
+        """Générer les fragments de la réponse au fur et à mesure.
+
+        La réponse HTTP amont est fermée dès que le générateur l'est (client
+        déconnecté), sans attendre la fin de la génération.
+        """
+        with track_outbound("openai"):
+            stream = await self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=self._messages(message),
+                max_tokens=500,
+                temperature=0.7,
+                stream=True,
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+
+openai_chat = OpenAIChat()
@@ -0,0 +1,196 @@
+"""File d'attente des notifications e-mail (collection notifications_outbox).
+
+Les routes enregistrent le rendez-vous puis mettent la notification en file
+par une seconde écriture : ce n'est pas une transaction (MongoDB autonome),
+une panne entre les deux peut donc perdre la notification, jamais le
+rendez-vous. Le dispatcher envoie ensuite les messages par lots, réessaie
+les échecs temporaires et abandonne aussitôt les refus définitifs (5xx).
+"""
+import asyncio
+import logging
+import os
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pymongo import ReturnDocument
+from app.config import db
+from app.services.metrics import outbound_calls, track_outbound
+from app.services.notifications import TEMPLATES, render
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER or "noreply@bienetre.local")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+# Un message resté "sending" plus longtemps (worker arrêté en plein envoi) est repris
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+# Durée de conservation des messages envoyés / abandonnés (index TTL sur sent_at / dead_at)
+OUTBOX_SENT_TTL_SECONDS = int(os.getenv("OUTBOX_SENT_TTL_SECONDS", str(7 * 24 * 3600)))
+OUTBOX_DEAD_TTL_SECONDS = int(os.getenv("OUTBOX_DEAD_TTL_SECONDS", str(30 * 24 * 3600)))
+
+
+_wakeup = asyncio.Event()
+
+
+async def enqueue_notification(kind: str, to: str, **params):
+    """Mettre une notification en file ; elle sera envoyée par le dispatcher."""
+    if kind not in TEMPLATES:
+        raise ValueError(f"Type de notification inconnu : {kind}")
+
+    now = datetime.utcnow()
+    await db["notifications_outbox"].insert_one({
+        "kind": kind,
+        "to": to,
+        "params": params,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    })
+    _wakeup.set()
+
+
+def build_message(notification: dict) -> EmailMessage:
+    subject, body = render(notification["kind"], **notification.get("params", {}))
+    message = EmailMessage()
+    message["From"] = SMTP_FROM
+    message["To"] = notification["to"]
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+async def _claim_batch():
+    """Réserver atomiquement jusqu'à OUTBOX_BATCH_SIZE notifications prêtes à partir."""
+    now = datetime.utcnow()
+    batch = []
+    for _ in range(OUTBOX_BATCH_SIZE):
+        notification = await db["notifications_outbox"].find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "claimed_at": {"$lte": now - timedelta(seconds=OUTBOX_LEASE_SECONDS)}},
+            ]},
+            {"$set": {"status": "sending", "claimed_at": now}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if not notification:
+            break
+        batch.append(notification)
+    return batch
+
+
+def is_permanent(error: Exception) -> bool:
+    """Refus définitif (code 5xx, destinataire refusé, message invalide) : inutile de réessayer.
+
+    Seules les erreurs de connexion et les réponses 4xx sont temporaires.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return not isinstance(error, OSError)
+
+
+def _send_batch(batch):
+    """Envoyer un lot sur une seule connexion SMTP.
+
+    Retourne {_id: None si envoyé, sinon (erreur, définitive)}.
+    """
+    results = {}
+    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USER and SMTP_PASSWORD:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        for notification in batch:
+            try:
+                with track_outbound("smtp"):
+                    smtp.send_message(build_message(notification))
+                results[notification["_id"]] = None
+            except smtplib.SMTPServerDisconnected as e:
+                # Les messages restants seront replanifiés
+                results[notification["_id"]] = (str(e), False)
+                break
+            except Exception as e:
+                results[notification["_id"]] = (str(e), is_permanent(e))
+    return results
+
+
+async def _record_results(batch, results):
+    now = datetime.utcnow()
+    for notification in batch:
+        result = results.get(notification["_id"], ("Non envoyé", False))
+        # Un message envoyé ou abandonné perd ses paramètres (codes 2FA…) ;
+        # le document lui-même expire via l'index TTL
+        if result is None:
+            await db["notifications_outbox"].update_one(
+                {"_id": notification["_id"]},
+                {"$set": {"status": "sent", "sent_at": now}, "$unset": {"claimed_at": "", "params": ""}},
+            )
+            continue
+
+        error, permanent = result
+        attempts = notification.get("attempts", 0) + 1
+        unset = {"claimed_at": ""}
+        if permanent or attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"❌ Notification {notification['_id']} abandonnée après {attempts} tentative(s) : {error}")
+            update = {"status": "dead", "attempts": attempts, "last_error": error, "dead_at": now}
+            unset["params"] = ""
+        else:
+            delay = OUTBOX_BACKOFF_SECONDS * (2 ** (attempts - 1))
+            update = {
+                "status": "pending",
+                "attempts": attempts,
+                "last_error": error,
+                "next_attempt_at": now + timedelta(seconds=delay),
+            }
+        await db["notifications_outbox"].update_one(
+            {"_id": notification["_id"]},
+            {"$set": update, "$unset": unset},
+        )
+
+
+async def dispatch_once():
+    """Traiter un lot de la file. Retourne le nombre de notifications traitées."""
+    batch = await _claim_batch()
+    if not batch:
+        return 0
+
+    try:
+        results = await asyncio.to_thread(_send_batch, batch)
+    except Exception as e:
+        logger.error(f"❌ Connexion SMTP impossible : {e}")
+        outbound_calls.inc("smtp", "error")
+        # Échec de connexion ou de session : tout le lot est replanifié
+        results = {notification["_id"]: (str(e), False) for notification in batch}
+
+    await _record_results(batch, results)
+    return len(batch)
+
+
+async def run_dispatcher():
+    """Boucle de fond démarrée dans le lifespan de l'application."""
+    while True:
+        _wakeup.clear()
+        try:
+            processed = await dispatch_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur du dispatcher de notifications : {e}")
+            processed = 0
+
+        if processed < OUTBOX_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,125 @@
+import base64
+import json
+import re
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from app.services.name_index import normalize
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Clé de tri et de recherche dérivée de `nom` : minuscules, sans accents ni ponctuation
+NOM_KEY = "nom_normalise"
+
+# Paramètre `sort` des listes → champ réellement trié
+SORT_FIELDS = {"_id": "_id", "nom": NOM_KEY}
+
+
+class InvalidCursor(Exception):
+    """Curseur de pagination illisible ou incohérent avec le tri demandé."""
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort: str, doc: dict) -> str:
+    payload = {"s": sort, "id": str(doc["_id"])}
+    if sort != "_id":
+        payload["v"] = _dump_value(doc.get(sort))
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(sort: str, cursor: str, direction: int = 1) -> dict:
+    """Retourner le filtre Mongo qui reprend juste après le curseur (dans le sens du tri)."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        last_id = ObjectId(payload["id"])
+        value = _load_value(payload.get("v"))
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidCursor()
+    if payload.get("s") != sort:
+        raise InvalidCursor()
+
+    after = "$gt" if direction == 1 else "$lt"
+    if sort == "_id":
+        return {"_id": {after: last_id}}
+    # Les documents sans valeur (null) sont triés avant toutes les autres
+    if value is None:
+        clauses = [{sort: None, "_id": {after: last_id}}]
+        if direction == 1:
+            clauses.append({sort: {"$ne": None}})
+        return {"$or": clauses}
+    clauses = [
+        {sort: {after: value}},
+        {sort: value, "_id": {after: last_id}},
+    ]
+    if direction == -1:
+        clauses.append({sort: None})
+    return {"$or": clauses}
+
+
+def search_key(value) -> str:
+    return " ".join(normalize(value if isinstance(value, str) else ""))
+
+
+def with_search_key(doc: dict) -> dict:
+    """Poser NOM_KEY sur un document patient/médecin écrit avec un `nom`."""
+    if "nom" in doc:
+        doc[NOM_KEY] = search_key(doc["nom"])
+    return doc
+
+
+def prefix_filter(prefix: str) -> dict:
+    """Filtre « le nom commence par » : regex ancrée et sensible à la casse sur NOM_KEY,
+    donc bornée par l'index (la saisie est normalisée comme la clé)."""
+    return {NOM_KEY: {"$regex": "^" + re.escape(search_key(prefix))}}
+
+
+async def backfill_search_keys(db, collections=("patients", "medecins")):
+    """Poser NOM_KEY sur les documents écrits avant son introduction."""
+    for name in collections:
+        operations = []
+        async for doc in db[name].find({NOM_KEY: {"$exists": False}}, {"nom": 1}):
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {NOM_KEY: search_key(doc.get("nom"))}}))
+            if len(operations) == 500:
+                await db[name].bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            await db[name].bulk_write(operations, ordered=False)
+
+
+async def paginate(
+    collection, query: dict, projection: dict, sort: str, limit: int, cursor: str = None, direction: int = 1
+):
+    """Retourner (documents, curseur suivant ou None) en pagination par clé (keyset)."""
+    if cursor:
+        after = decode_cursor(sort, cursor, direction)
+        query = {"$and": [query, after]} if query else after
+
+    sort_keys = [("_id", direction)] if sort == "_id" else [(sort, direction), ("_id", direction)]
+    if projection and sort not in projection and all(projection.values()):
+        # Le curseur suivant est construit à partir du champ de tri
+        projection = {**projection, sort: 1}
+    # On lit un document de plus pour savoir s'il reste une page
+    docs = await collection.find(query, projection).sort(sort_keys).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = encode_cursor(sort, docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+async def count_total(collection, query: dict) -> int:
+    """Total approximatif sans filtre (métadonnées), exact sinon."""
+    if not query:
+        return await collection.estimated_document_count()
+    return await collection.count_documents(query)
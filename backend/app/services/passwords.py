@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Coût bcrypt : un changement déclenche un rehash transparent à la connexion
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt libère le GIL : un pool de threads suffit pour paralléliser
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Nombre maximal de hachages simultanés (les autres attendent leur tour)
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(PASSWORD_HASH_WORKERS)))
+# Import en masse : pool et file distincts, un import ne retarde jamais les connexions
+BULK_HASH_WORKERS = int(os.getenv("BULK_HASH_WORKERS", str(max(1, PASSWORD_HASH_WORKERS // 2))))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    # Tout hash d'un autre coût est considéré à mettre à jour
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_semaphore = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+_bulk_executor = ThreadPoolExecutor(max_workers=BULK_HASH_WORKERS, thread_name_prefix="bcrypt-bulk")
+_bulk_semaphore = asyncio.Semaphore(BULK_HASH_WORKERS)
+_stats = {}
+
+
+async def _run(operation: str, func, *args, executor=_executor, semaphore=_semaphore):
+    """Exécuter une opération bcrypt hors de la boucle, en mesurant sa durée."""
+    async with semaphore:
+        started = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        elapsed_ms = 1000 * (time.perf_counter() - started)
+
+    stats = _stats.setdefault(operation, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    logger.debug(f"🔐 {operation} bcrypt (coût {BCRYPT_ROUNDS}) : {elapsed_ms:.1f} ms")
+    return result
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", pwd_context.hash, password)
+
+
+async def hash_password_bulk(password: str) -> str:
+    """Hachage pour l'import en masse, sur le pool dédié."""
+    return await _run(
+        "bulk_hash", pwd_context.hash, password, executor=_bulk_executor, semaphore=_bulk_semaphore
+    )
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run("verify", pwd_context.verify, password, hashed)
+
+
+async def verify_and_update(password: str, hashed: str):
+    """Vérifier le mot de passe ; retourne (valide, nouveau_hash ou None si le coût est à jour)."""
+    return await _run("verify", pwd_context.verify_and_update, password, hashed)
+
+
+def password_metrics():
+    return {
+        "rounds": BCRYPT_ROUNDS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "concurrency": PASSWORD_HASH_CONCURRENCY,
+        "bulk_workers": BULK_HASH_WORKERS,
+        **{
+            operation: {
+                "count": s["count"],
+                "avg_ms": round(s["total_ms"] / s["count"], 1),
+                "max_ms": round(s["max_ms"], 1),
+            }
+            for operation, s in _stats.items()
+        },
+    }
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from bson import ObjectId
+from app.config import db
+
+# Champs du patient renvoyés en tête du dossier (pas de clé de recherche ni champs internes)
+PATIENT_PROJECTION = {
+    "user_id": 1, "nom": 1, "prenom": 1, "numero_assurance": 1,
+    "date_naissance": 1, "genre": 1, "date_creation": 1,
+}
+
+# Sections du dossier patient : collection, filtre, projection, tri
+CHART_SECTIONS = {
+    "adresse": {
+        "collection": "adresses",
+        "filter": lambda uid: {"user_id": uid},
+        "projection": {"user_id": 0},
+        "one": True,
+    },
+    "contact": {
+        "collection": "contacts",
+        "filter": lambda uid: {"user_id": uid},
+        "projection": {"user_id": 0},
+        "one": True,
+    },
+    "allergies": {
+        "collection": "allergies",
+        "filter": lambda uid: {"user_id": ObjectId(uid)},
+        "projection": {"substance": 1, "reaction": 1, "gravité": 1, "date_declaration": 1, "notes": 1},
+        "sort": [("_id", -1)],
+    },
+    "dossiers": {
+        "collection": "dossiersmedicaux",
+        "filter": lambda uid: {"patient_id": ObjectId(uid)},
+        "projection": {
+            "medecin_id": 1, "date_visite": 1, "etablissement": 1, "diagnostic": 1,
+            "traitement": 1, "resume_visite": 1, "notes_pour_medecins": 1,
+            "debut_maladie": 1, "fin_maladie": 1,
+        },
+        "sort": [("date_visite", -1)],
+    },
+    "rendezvous": {
+        "collection": "rendezvous",
+        "filter": lambda uid: {"patient_id": uid},
+        "projection": {"medecin_id": 1, "date": 1, "heure": 1, "type": 1, "motif": 1, "statut": 1, "visite_faite": 1},
+        "sort": [("date", -1), ("heure", -1)],
+    },
+}
+
+DEFAULT_CHART_LIMIT = 20
+MAX_CHART_LIMIT = 200
+
+
+def parse_sections(sections) -> list[str]:
+    """Valider la liste `sections` (séparée par des virgules) ; toutes par défaut."""
+    if not sections:
+        return list(CHART_SECTIONS)
+    requested = [s.strip() for s in sections.split(",") if s.strip()]
+    unknown = [s for s in requested if s not in CHART_SECTIONS]
+    if unknown:
+        raise ValueError(f"Sections inconnues : {', '.join(unknown)}. Disponibles : {', '.join(CHART_SECTIONS)}")
+    return requested
+
+
+def _stringify_ids(doc: dict) -> dict:
+    for key in ("_id", "user_id", "patient_id", "medecin_id"):
+        if isinstance(doc.get(key), ObjectId):
+            doc[key] = str(doc[key])
+    return doc
+
+
+async def _timed(name: str, timings: dict, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+async def _load_section(spec: dict, user_id: str, limit: int):
+    collection = db[spec["collection"]]
+    query = spec["filter"](user_id)
+    if spec.get("one"):
+        doc = await collection.find_one(query, spec["projection"])
+        return _stringify_ids(doc) if doc else None
+
+    cursor = collection.find(query, spec["projection"]).sort(spec["sort"]).limit(limit)
+    return [_stringify_ids(doc) for doc in await cursor.to_list(length=limit)]
+
+
+async def load_chart(user_id: str, sections: list[str], limit: int = DEFAULT_CHART_LIMIT):
+    """Charger le patient et les sections demandées en parallèle.
+
+    Retourne (dossier, durées en ms par section) ; le dossier vaut None si
+    le patient n'existe pas.
+    """
+    timings = {}
+    names = ["patient", *sections]
+    coros = [db["patients"].find_one({"user_id": user_id}, PATIENT_PROJECTION)]
+    coros += [_load_section(CHART_SECTIONS[name], user_id, limit) for name in sections]
+
+    results = await asyncio.gather(*(_timed(n, timings, c) for n, c in zip(names, coros)))
+
+    patient = results[0]
+    if not patient:
+        return None, timings
+    chart = {"patient": _stringify_ids(patient)}
+    chart.update(zip(sections, results[1:]))
+    return chart, timings
+
+
+def server_timing(timings: dict) -> str:
+    """Valeur d'en-tête `Server-Timing` (lisible dans l'onglet réseau du navigateur)."""
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
@@ -0,0 +1,59 @@
+from typing import Iterable, Optional
+from app.config import db
+
+# Champs patient exposables dans les listes enrichies, par collection source
+PATIENT_FIELDS = {
+    "patients": ["nom", "prenom", "genre", "date_naissance", "numero_assurance"],
+    "contacts": ["telephone", "email"],
+    "adresses": ["adresse", "rue", "ville", "code_postal", "pays"],
+}
+
+DEFAULT_FIELDS = ["nom", "prenom"]
+
+
+def parse_fields(fields: Optional[str]) -> list[str]:
+    """Transformer `fields=nom,prenom,email` en liste validée de champs patient."""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+
+    allowed = {f for champs in PATIENT_FIELDS.values() for f in champs}
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in requested if f not in allowed]
+    if invalid:
+        raise ValueError(f"Champs inconnus : {', '.join(invalid)}")
+    return requested
+
+
+async def attach_patient_fields(rows: list[dict], fields: Iterable[str]) -> list[dict]:
+    """Ajouter les champs patient demandés à chaque ligne (clé `patient_id`).
+
+    Une seule requête `$in` par collection concernée, quel que soit le nombre
+    de lignes : la liste ne coûte plus une requête par patient.
+    """
+    fields = list(fields)
+    patient_ids = list({str(r["patient_id"]) for r in rows if r.get("patient_id")})
+
+    for row in rows:
+        for field in fields:
+            row.setdefault(field, "")
+
+    if not patient_ids:
+        return rows
+
+    for collection, champs in PATIENT_FIELDS.items():
+        wanted = [f for f in fields if f in champs]
+        if not wanted:
+            continue
+
+        projection = {"_id": 0, "user_id": 1, **{f: 1 for f in wanted}}
+        by_user = {}
+        async for doc in db[collection].find({"user_id": {"$in": patient_ids}}, projection):
+            by_user.setdefault(doc["user_id"], doc)
+
+        for row in rows:
+            doc = by_user.get(str(row.get("patient_id")))
+            if doc:
+                for field in wanted:
+                    row[field] = doc.get(field, "")
+
+    return rows
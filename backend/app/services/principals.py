@@ -0,0 +1,125 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from bson.errors import InvalidId
+from jose import jwt, JWTError
+from app.config import db
+from app.utils import SECRET_KEY, ALGORITHM
+
+# Durée de vie d'un utilisateur vérifié en cache (secondes)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# Collection de comptes selon le type porté par le token
+USER_COLLECTIONS = {
+    "Patient": "UserPatients",
+    "Médecin": "UserMedecins",
+    "Admin": "admins",
+}
+
+
+class AuthError(Exception):
+    """Token invalide, expiré ou utilisateur inexistant."""
+
+
+def token_id(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    """Utilisateurs authentifiés, en LRU par token avec un TTL court.
+
+    Un token déjà vérifié est servi sans décodage ni requête MongoDB jusqu'à
+    la première échéance entre le TTL et l'expiration du token. Les routes qui
+    modifient ou suppriment un compte appellent `invalidate_user`.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_entries: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return principal
+
+    def _put(self, key: str, principal: dict, token_exp):
+        expires_at = time.time() + self.ttl
+        if token_exp:
+            expires_at = min(expires_at, token_exp)
+        self._entries[key] = (expires_at, principal)
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(principal["user_id"], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        _, principal = self._entries.pop(key)
+        keys = self._by_user.get(principal["user_id"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[principal["user_id"]]
+
+    def invalidate_user(self, user_id: str):
+        for key in list(self._by_user.get(str(user_id), ())):
+            self._drop(key)
+
+    async def authenticate(self, token: str) -> dict:
+        key = token_id(token)
+        principal = self._get(key)
+        if principal is not None:
+            self.hits += 1
+            return dict(principal)
+        self.misses += 1
+
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise AuthError("Token invalide ou utilisateur non authentifié")
+
+        # Les tokens administrateur émis par /admin/admin-login portent `user_id`
+        user_id = payload.get("sub") or payload.get("user_id")
+        user_type = payload.get("user_type")
+        collection = USER_COLLECTIONS.get(user_type)
+        if not user_id or not collection:
+            raise AuthError("Token invalide")
+
+        try:
+            user = await db[collection].find_one({"_id": ObjectId(user_id)}, {"username": 1})
+        except InvalidId:
+            raise AuthError("Token invalide")
+        if not user:
+            raise AuthError("Utilisateur non trouvé")
+
+        principal = {
+            "user_id": str(user["_id"]),
+            "user_type": user_type,
+            "username": user["username"],
+        }
+        self._put(key, principal, payload.get("exp"))
+        return dict(principal)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+principals = PrincipalCache()
@@ -0,0 +1,209 @@
+"""Enregistrement des requêtes MongoDB d'une requête HTTP.
+
+Un CommandListener pymongo note chaque commande émise pendant la requête
+(forme du filtre, durée) et `QueryRecorderMiddleware` dresse le bilan à la
+fin :
+
+- commande plus lente que SLOW_QUERY_MS → journalisée avec sa forme et sa route ;
+- même forme répétée N_PLUS_ONE_THRESHOLD fois → N+1 signalé ;
+- plus de requêtes que le budget déclaré par `@query_budget(n)` → signalé,
+  ou `QueryBudgetExceeded` levée avant l'envoi de la réponse si
+  QUERY_BUDGET_STRICT=true (tests).
+
+La forme d'un filtre remplace toutes les valeurs par "?" : aucune donnée
+patient n'apparaît dans les journaux.
+"""
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from pymongo import monitoring
+from app.services.metrics import Counter as MetricCounter, registry, route_template
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+# En test : dépasser un budget fait échouer la requête au lieu d'être seulement signalé
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+
+# Commandes techniques ou suites de curseur : hors budget
+IGNORED_COMMANDS = {
+    "getMore", "killCursors", "endSessions", "hello", "isMaster", "ismaster", "ping",
+    "saslStart", "saslContinue", "buildInfo", "listCollections", "listIndexes", "createIndexes",
+}
+
+# Emplacement du filtre selon la commande
+FILTER_FIELDS = {"find": "filter", "findAndModify": "query", "count": "query", "distinct": "query"}
+
+slow_queries = registry.register(MetricCounter(
+    "bienetre_mongo_slow_queries_total", "Commandes MongoDB au-delà de SLOW_QUERY_MS", ("route", "command")))
+n_plus_one = registry.register(MetricCounter(
+    "bienetre_mongo_n_plus_one_total", "Formes de requête répétées dans une même requête HTTP", ("route",)))
+budget_exceeded = registry.register(MetricCounter(
+    "bienetre_query_budget_exceeded_total", "Requêtes HTTP au-delà de leur budget de requêtes", ("route",)))
+
+
+class QueryBudgetExceeded(Exception):
+    """Une route a émis plus de requêtes MongoDB que son budget."""
+
+
+def query_budget(maximum: int):
+    """Déclarer le nombre maximal de requêtes MongoDB d'une route.
+
+        @router.put("/{rendezvous_id}")
+        @query_budget(9)
+        async def update_rendezvous(...):
+    """
+    def decorator(endpoint):
+        endpoint.query_budget = maximum
+        return endpoint
+    return decorator
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $and / $or : la structure compte ; $in et listes de valeurs : non
+        return [_shape(v) for v in value] if value and isinstance(value[0], dict) else "?"
+    return "?"
+
+
+def command_filter(command_name: str, command) -> dict:
+    if command_name in FILTER_FIELDS:
+        return command.get(FILTER_FIELDS[command_name]) or {}
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or [{}]
+        return statements[0].get("q") or {}
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        return pipeline[0].get("$match", {}) if pipeline else {}
+    return {}
+
+
+def query_shape(command_name: str, command) -> str:
+    """Ex. `find contacts {"user_id": "?"}`."""
+    collection = command.get(command_name)
+    shape = json.dumps(_shape(command_filter(command_name, command)), sort_keys=True, ensure_ascii=False)
+    return f"{command_name} {collection} {shape}"
+
+
+class QueryLog:
+    """Requêtes d'une requête HTTP : formes dans l'ordre, durées en millisecondes."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = []
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def start(self, request_id: int, shape: str):
+        with self._lock:
+            self._pending[request_id] = shape
+
+    def finish(self, request_id: int, duration_ms: float):
+        with self._lock:
+            shape = self._pending.pop(request_id, None)
+            if shape is not None:
+                self.queries.append((shape, duration_ms))
+        return shape
+
+    def repeated(self) -> dict:
+        counts = Counter(shape for shape, _ in self.queries)
+        return {shape: n for shape, n in counts.items() if n >= N_PLUS_ONE_THRESHOLD}
+
+
+current_log: ContextVar = ContextVar("current_query_log", default=None)
+
+
+class QueryRecorder(monitoring.CommandListener):
+    """Rattache chaque commande MongoDB au QueryLog de la requête en cours."""
+
+    def started(self, event):
+        log = current_log.get()
+        if log is None or event.command_name in IGNORED_COMMANDS:
+            return
+        log.start(event.request_id, query_shape(event.command_name, event.command))
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        log = current_log.get()
+        if log is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        shape = log.finish(event.request_id, duration_ms)
+        if shape is not None and duration_ms > SLOW_QUERY_MS:
+            route = route_template(log.scope)
+            slow_queries.inc(route, event.command_name)
+            logger.warning(f"🐢 Requête lente ({duration_ms:.0f} ms) sur {route} : {shape}")
+
+
+def _over_budget(log: QueryLog):
+    """Message de dépassement, ou None si la route n'a pas de budget ou le respecte."""
+    maximum = getattr(log.scope.get("endpoint"), "query_budget", None)
+    if maximum is None or len(log.queries) <= maximum:
+        return None
+    return f"{route_template(log.scope)} : {len(log.queries)} requêtes MongoDB pour un budget de {maximum}"
+
+
+def enforce_budget(log: QueryLog):
+    """Mode strict : lever QueryBudgetExceeded si le budget est déjà dépassé."""
+    message = _over_budget(log)
+    if message:
+        details = "\n".join(f"  {shape}" for shape, _ in log.queries)
+        raise QueryBudgetExceeded(f"{message}\n{details}")
+
+
+def check_budget(log: QueryLog):
+    """Bilan de fin de requête : signaler N+1 et dépassement de budget."""
+    route = route_template(log.scope)
+    for shape, count in log.repeated().items():
+        n_plus_one.inc(route)
+        logger.warning(f"🔁 N+1 sur {route} : {count} × {shape}")
+
+    message = _over_budget(log)
+    if message:
+        budget_exceeded.inc(route)
+        logger.warning(f"💸 Budget dépassé — {message}")
+
+
+class QueryRecorderMiddleware:
+    """Middleware ASGI : ouvre un QueryLog par requête HTTP et le vérifie à la fin.
+
+    En mode strict, le budget est vérifié au début de la réponse
+    (`http.response.start`) : un dépassement devient une erreur 500 au lieu
+    d'une exception levée après l'envoi d'un 200.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog(scope)
+
+        async def send_within_budget(message):
+            if message["type"] == "http.response.start" and QUERY_BUDGET_STRICT:
+                enforce_budget(log)
+            await send(message)
+
+        token = current_log.set(log)
+        try:
+            await self.app(scope, receive, send_within_budget)
+        finally:
+            current_log.reset(token)
+            check_budget(log)
+
+
+query_recorder = QueryRecorder()
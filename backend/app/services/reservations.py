@@ -0,0 +1,136 @@
+import logging
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from app.config import db
+from app.services.leases import run_once
+from app.services.availability import (
+    availability, weekly_template, heure_to_bit, bit_to_heure, on_grid, parse_date, jour_de_semaine,
+)
+
+logger = logging.getLogger(__name__)
+
+# Champ présent (True) uniquement sur les rendez-vous qui occupent leur créneau.
+# L'index unique partiel `slot_actif` sur (medecin_id, date, heure) en dépend.
+ACTIVE_FIELD = "slot_actif"
+
+# Champs dont la modification déplace ou libère le créneau occupé
+SLOT_FIELDS = ("medecin_id", "date", "heure", "statut")
+
+# Nombre de créneaux alternatifs proposés et horizon de recherche
+ALTERNATIVES_COUNT = 3
+ALTERNATIVES_DAYS = 14
+
+
+class SlotUnavailable(Exception):
+    """Le médecin ne consulte pas à cette date/heure."""
+
+
+class SlotTaken(Exception):
+    """Le créneau est déjà réservé ; `alternatives` propose les prochains créneaux libres."""
+
+    def __init__(self, alternatives):
+        super().__init__("Créneau déjà réservé")
+        self.alternatives = alternatives
+
+
+async def next_free_slots(medecin_id: str, date: str, heure: str, count: int = ALTERNATIVES_COUNT):
+    """Prochains créneaux libres à partir de (date, heure)."""
+    start = parse_date(date)
+    jours = await availability(medecin_id, start, start + timedelta(days=ALTERNATIVES_DAYS - 1))
+
+    alternatives = []
+    for jour in jours:
+        for libre in jour["libres"]:
+            if jour["date"] == date and libre <= heure:
+                continue
+            alternatives.append({"date": jour["date"], "heure": libre})
+            if len(alternatives) == count:
+                return alternatives
+    return alternatives
+
+
+async def reserver_creneau(medecin_id: str, patient_id: str, date: str, heure: str, type: str, motif: str):
+    """Réserver un créneau. L'insertion elle-même fait office de contrôle de conflit.
+
+    Lève SlotUnavailable si le médecin ne consulte pas à cette heure (ou si
+    l'heure ne tombe pas sur un créneau : elle n'est jamais arrondie), SlotTaken
+    si un rendez-vous actif occupe déjà le créneau.
+    """
+    day = parse_date(date)
+    if not on_grid(heure):
+        raise SlotUnavailable()
+    heure = bit_to_heure(heure_to_bit(heure))
+
+    # Lecture fraîche : un créneau fermé sur un autre worker ne doit plus être réservable
+    template = await weekly_template(medecin_id, cached=False)
+    if not (template.get(jour_de_semaine(day), 0) >> heure_to_bit(heure)) & 1:
+        raise SlotUnavailable()
+
+    new_rendezvous = {
+        "date": date,
+        "heure": heure,
+        "medecin_id": medecin_id,
+        "patient_id": patient_id,
+        "type": type,
+        "motif": motif,
+        "statut": "En attente",
+        "created_at": datetime.utcnow(),
+        "visite_faite": False,
+        ACTIVE_FIELD: True,
+    }
+    try:
+        result = await db["rendezvous"].insert_one(new_rendezvous)
+    except DuplicateKeyError:
+        raise SlotTaken(await next_free_slots(medecin_id, date, heure))
+
+    return result.inserted_id
+
+
+def slot_update(rendezvous: dict, update_fields: dict):
+    """Modification MongoDB d'un rendez-vous, ou None s'il n'y a rien à écrire.
+
+    `slot_actif` n'est touché que si le créneau change (médecin, date, heure
+    ou statut) : un doublon historique marqué False garde son drapeau quand
+    on ne modifie que son type ou son motif.
+    """
+    if not update_fields:
+        return None
+    if not any(k in update_fields and update_fields[k] != rendezvous.get(k) for k in SLOT_FIELDS):
+        return {"$set": update_fields}
+    # Un rendez-vous annulé libère son créneau ; sinon il l'occupe (conflit → 409)
+    if update_fields.get("statut", rendezvous.get("statut")) == "Annulé":
+        return {"$set": update_fields, "$unset": {ACTIVE_FIELD: ""}}
+    return {"$set": {**update_fields, ACTIVE_FIELD: True}}
+
+
+async def backfill_active_slots():
+    """Migration unique : poser `slot_actif` sur les rendez-vous antérieurs à l'index.
+
+    Exécutée par un seul worker, puis marquée terminée dans `migrations` :
+    les démarrages suivants ne parcourent plus la collection.
+    """
+    await run_once("backfill_active_slots", _backfill_active_slots)
+
+
+async def _backfill_active_slots():
+    """Un seul rendez-vous par créneau (le plus ancien) reçoit le drapeau ; les
+    doublons déjà en base sont marqués `slot_actif: False` et journalisés,
+    pour que l'index unique puisse être créé.
+    """
+    pipeline = [
+        {"$match": {"statut": {"$ne": "Annulé"}, ACTIVE_FIELD: {"$exists": False}}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {"medecin_id": "$medecin_id", "date": "$date", "heure": "$heure"},
+            "ids": {"$push": "$_id"},
+        }},
+    ]
+    async for group in db["rendezvous"].aggregate(pipeline):
+        ids = group["ids"]
+        occupied = await db["rendezvous"].find_one({**group["_id"], ACTIVE_FIELD: True}, {"_id": 1})
+        if not occupied:
+            await db["rendezvous"].update_one({"_id": ids[0]}, {"$set": {ACTIVE_FIELD: True}})
+            ids = ids[1:]
+        if ids:
+            logger.warning(f"⚠️ Double réservation existante {group['_id']} : {len(ids)} rendez-vous non actifs")
+            await db["rendezvous"].update_many({"_id": {"$in": ids}}, {"$set": {ACTIVE_FIELD: False}})
@@ -0,0 +1,81 @@
+import logging
+from pymongo import UpdateOne
+from app.config import db
+from app.services.leases import run_once
+
+logger = logging.getLogger(__name__)
+
+# `dossiersmedicaux` est la seule collection écrite ; `visites` en est une vue
+VISITES_VIEW = "visites"
+LEGACY_COLLECTION = "visites_legacy"
+MIGRATION_BATCH_SIZE = 500
+
+VISITE_FIELDS = [
+    "patient_id", "medecin_id", "etablissement", "date_visite", "resume_visite", "symptomes",
+    "diagnostic", "source_diagnostic", "traitement", "source_traitement",
+    "notes_pour_medecins", "debut_maladie", "fin_maladie",
+]
+
+# Une visite et son dossier sont le même événement : même patient, médecin, date et résumé
+DEDUP_KEY = ["patient_id", "medecin_id", "date_visite", "resume_visite"]
+
+
+def dossier_from_visite(visite: dict) -> dict:
+    """Document canonique de `dossiersmedicaux` pour une visite."""
+    dossier = {f: visite.get(f) for f in VISITE_FIELDS}
+    dossier["symptomes"] = visite.get("symptomes") or visite.get("resume_visite")
+    dossier["etablissement"] = visite.get("etablissement", "")
+    dossier["notes_pour_medecins"] = visite.get("notes_pour_medecins") or ""
+    return dossier
+
+
+async def _collection_type(name: str):
+    infos = await db.list_collections(filter={"name": name}).to_list(length=1)
+    return infos[0].get("type") if infos else None
+
+
+async def _merge_legacy(source: str) -> int:
+    """Insérer dans `dossiersmedicaux` les visites qui n'y ont pas de copie (upsert sur la clé)."""
+    inserted = 0
+    batch = []
+    async for visite in db[source].find({}):
+        dossier = dossier_from_visite(visite)
+        dossier["created_at"] = visite["_id"].generation_time.replace(tzinfo=None)
+        batch.append(UpdateOne({k: visite.get(k) for k in DEDUP_KEY}, {"$setOnInsert": dossier}, upsert=True))
+        if len(batch) >= MIGRATION_BATCH_SIZE:
+            inserted += (await db["dossiersmedicaux"].bulk_write(batch, ordered=False)).upserted_count
+            batch = []
+    if batch:
+        inserted += (await db["dossiersmedicaux"].bulk_write(batch, ordered=False)).upserted_count
+    return inserted
+
+
+async def migrate_visites():
+    """Remplacer la collection `visites` par une vue sur `dossiersmedicaux`.
+
+    Exécutée par un seul worker sous bail (`run_once`) : deux fusions
+    simultanées inséreraient chacune les visites sans dossier, faute d'index
+    unique sur la clé de déduplication.
+    """
+    await run_once("visites_view", _migrate_visites)
+
+
+async def _migrate_visites():
+    """Les visites sans dossier correspondant sont recopiées, la collection
+    d'origine est conservée sous `visites_legacy`, puis la vue est créée.
+    Reprise sans doublon après une interruption.
+    """
+    kind = await _collection_type(VISITES_VIEW)
+    if kind == "view":
+        return
+
+    if kind == "collection":
+        inserted = await _merge_legacy(VISITES_VIEW)
+        logger.info(f"🩺 Migration des visites : {inserted} dossier(s) recopié(s)")
+        await db[VISITES_VIEW].rename(LEGACY_COLLECTION, dropTarget=False)
+
+    await db.create_collection(
+        VISITES_VIEW,
+        viewOn="dossiersmedicaux",
+        pipeline=[{"$project": {f: 1 for f in VISITE_FIELDS}}],
+    )
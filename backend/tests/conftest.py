@@ -0,0 +1,52 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import types
+import pytest
+
+# Base dédiée aux tests, vidée à chaque test : jamais la base de l'application
+os.environ.setdefault("MONGO_DB_NAME", "bienetre_test")
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+os.environ.setdefault("MONGO_WARMUP_CONNECTIONS", "1")
+
+# app.services.twofa est absent de certains arbres ; sans lui app.routes.auth,
+# et donc toute route protégée, ne s'importe pas. Module vide pour les tests.
+if importlib.util.find_spec("app.services.twofa") is None:
+    twofa = types.ModuleType("app.services.twofa")
+    for name in ("store_verification_code", "verify_code", "generate_verification_code"):
+        setattr(twofa, name, lambda *args, **kwargs: None)
+    sys.modules["app.services.twofa"] = twofa
+
+
+@pytest.fixture
+def run():
+    """Exécuter une coroutine dans une boucle neuve ; le client Motor est recréé à chaque test."""
+    def _run(coro):
+        from app.config import db
+
+        try:
+            return asyncio.run(coro)
+        finally:
+            db.close()
+    return _run
+
+
+@pytest.fixture
+def mongo(run):
+    """Base MongoDB de test (MONGO_URL) vidée avant le test ; test ignoré sans serveur."""
+    pytest.importorskip("motor")
+    from pymongo.errors import PyMongoError
+    from app.config import db
+    from app.indexes import ensure_indexes
+
+    async def reset():
+        await db.ping()
+        await db.client.drop_database(db.name)
+        await ensure_indexes(db)
+
+    try:
+        run(reset())
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB indisponible : {e}")
+    return db
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("motor")
+
+from app.services.archive import ARCHIVE_LEASE, archive_as_leader
+from app.services.leases import LEASES_COLLECTION
+
+ANCIENNE = "2000-01-01"
+
+
+def test_only_closed_appointments_are_archived(mongo, run):
+    async def scenario():
+        await mongo["rendezvous"].insert_many([
+            {"_id": "annule", "date": ANCIENNE, "statut": "Annulé", "visite_faite": False},
+            {"_id": "termine", "date": ANCIENNE, "statut": "Terminé"},
+            {"_id": "visite", "date": ANCIENNE, "statut": "Confirmé", "visite_faite": True},
+            {"_id": "ouvert", "date": ANCIENNE, "statut": "Confirmé", "visite_faite": False},
+            {"_id": "recent", "date": datetime.utcnow().strftime("%Y-%m-%d"), "statut": "Annulé"},
+        ])
+        moved = await archive_as_leader()
+        hot = sorted(await mongo["rendezvous"].distinct("_id"))
+        cold = sorted(await mongo["rendezvous_archive"].distinct("_id"))
+        return moved, hot, cold
+
+    moved, hot, cold = run(scenario())
+
+    assert moved["rendezvous"] == 3
+    assert hot == ["ouvert", "recent"]
+    assert cold == ["annule", "termine", "visite"]
+
+
+def test_archiver_waits_while_another_worker_holds_the_lease(mongo, run):
+    async def scenario():
+        await mongo[LEASES_COLLECTION].insert_one(
+            {"_id": ARCHIVE_LEASE, "owner": "autre-worker", "expires_at": datetime.utcnow() + timedelta(hours=1)}
+        )
+        await mongo["rendezvous"].insert_one({"date": ANCIENNE, "statut": "Annulé"})
+        return await archive_as_leader(), await mongo["rendezvous"].count_documents({})
+
+    moved, remaining = run(scenario())
+
+    assert moved is None
+    assert remaining == 1
@@ -0,0 +1,95 @@
+from datetime import date
+import pytest
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import disponibilites
+from app.services import availability as engine
+from app.services.availability import (
+    DEFAULT_HOURS, MAX_RANGE_DAYS, bit_to_heure, free_slots_for_date, heure_to_bit, heures_to_mask,
+    mask_to_heures, on_grid,
+)
+
+LUNDI = date(2025, 6, 2)
+
+
+@pytest.fixture
+def agenda(monkeypatch):
+    """Lundi 09:00-11:00 ouvert, mardi 14:00 ; 09:30 réservé le premier lundi (sans MongoDB)."""
+    template = {"lundi": heures_to_mask(["09:00", "09:30", "10:00", "10:30"]), "mardi": heures_to_mask(["14:00"])}
+    booked = {"2025-06-02": heures_to_mask(["09:30", "18:00"])}
+
+    async def weekly_template(medecin_id, cached=True):
+        return template
+
+    async def booked_masks(medecin_id, start, end):
+        return {d: m for d, m in booked.items() if start.isoformat() <= d <= end.isoformat()}
+
+    monkeypatch.setattr(engine, "weekly_template", weekly_template)
+    monkeypatch.setattr(engine, "booked_masks", booked_masks)
+
+
+def test_hours_and_bits_round_trip():
+    assert heure_to_bit("00:00") == 0
+    assert heure_to_bit("09:15") == 37
+    assert [bit_to_heure(heure_to_bit(h)) for h in DEFAULT_HOURS] == DEFAULT_HOURS
+    assert bit_to_heure(95) == "23:45"
+
+
+def test_only_quarter_hours_are_on_the_grid():
+    assert on_grid("09:45")
+    assert not on_grid("09:07")
+    assert not on_grid("24:00")
+    assert not on_grid("9h")
+    assert not on_grid(None)
+
+
+def test_masks_ignore_invalid_hours_and_come_back_sorted():
+    mask = heures_to_mask(["18:00", "09:00", "n/a", "", "09:00"])
+    assert mask == (1 << 36) | (1 << 72)
+    assert mask_to_heures(mask) == ["09:00", "18:00"]
+    assert mask_to_heures(0) == []
+
+
+def test_booked_hours_are_removed_from_free_slots(run, agenda):
+    assert run(free_slots_for_date("m1", LUNDI)) == ["09:00", "10:00", "10:30"]
+    # Une semaine plus tard, rien n'est réservé
+    assert run(free_slots_for_date("m1", date(2025, 6, 9))) == ["09:00", "09:30", "10:00", "10:30"]
+    assert run(free_slots_for_date("m1", date(2025, 6, 4))) == []
+
+
+def test_slot_status(run, agenda):
+    assert run(engine.slot_status("m1", LUNDI, "09:00")) == "libre"
+    assert run(engine.slot_status("m1", LUNDI, "09:30")) == "reserve"
+    # Réservé mais hors des heures ouvertes : le créneau n'existe pas
+    assert run(engine.slot_status("m1", LUNDI, "18:00")) == "indisponible"
+    assert run(engine.slot_status("m1", LUNDI, "09:07")) == "indisponible"
+
+
+def test_range_endpoint(run, agenda):
+    app = FastAPI()
+    app.include_router(disponibilites.router, prefix="/disponibilites")
+
+    async def get(**params):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/disponibilites/m1/libres", params=params)
+
+    week = run(get(**{"from": "2025-06-02"}))
+    assert week.status_code == 200
+    jours = week.json()["jours"]
+    # Sans `to`, une semaine à partir de `from`
+    assert len(jours) == 7
+    assert (jours[0]["date"], jours[-1]["date"]) == ("2025-06-02", "2025-06-08")
+    assert jours[0] == {
+        "date": "2025-06-02", "jour": "lundi",
+        "heures": ["09:00", "09:30", "10:00", "10:30"],
+        "reservees": ["09:30"],
+        "libres": ["09:00", "10:00", "10:30"],
+    }
+    assert jours[1]["libres"] == ["14:00"]
+
+    assert run(get(**{"from": "2025-06-10", "to": "2025-06-02"})).status_code == 400
+    too_long = run(get(**{"from": "2025-01-01", "to": "2025-12-31"}))
+    assert too_long.status_code == 400
+    assert str(MAX_RANGE_DAYS) in too_long.json()["detail"]
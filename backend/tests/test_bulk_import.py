@@ -0,0 +1,39 @@
+import io
+import json
+import pytest
+
+pytest.importorskip("motor")
+
+from app.services import bulk_import
+
+
+def _jsonl(*rows):
+    return io.BytesIO("\n".join(json.dumps(row) for row in rows).encode())
+
+
+def test_row_whose_related_insert_fails_leaves_no_orphan(mongo, run, monkeypatch):
+    # Hachage rapide : le test porte sur les insertions, pas sur bcrypt
+    async def fast_hash(password):
+        return f"hash:{password}"
+    monkeypatch.setattr(bulk_import, "hash_password_bulk", fast_hash)
+
+    rows = [
+        {"username": f"patient{i}", "password": "secret", "nom": f"Nom{i}", "ville": "Dakar", "email": "meme@example.org"}
+        for i in range(2)
+    ]
+
+    async def scenario():
+        # Deux lignes avec le même e-mail : le second contact est refusé
+        await mongo["contacts"].create_index("email", unique=True)
+        report = await bulk_import.import_stream("patients", _jsonl(*rows), "jsonl")
+        counts = {
+            name: await mongo[name].count_documents({})
+            for name in ("UserPatients", "patients", "adresses", "contacts")
+        }
+        return report, counts
+
+    report, counts = run(scenario())
+
+    assert report["importes"] == 1
+    assert [e["ligne"] for e in report["erreurs"]] == [2]
+    assert counts == {"UserPatients": 1, "patients": 1, "adresses": 1, "contacts": 1}
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("openai")
+import httpx
+from fastapi import FastAPI
+from openai import AsyncOpenAI
+
+from app.routes import chatbot
+from app.services.openai_chat import openai_chat
+
+USER = "patient-stream"
+
+
+def _chunk(content: str) -> bytes:
+    payload = {
+        "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "test",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+class Upstream(httpx.AsyncByteStream):
+    """Corps SSE du faux serveur compatible OpenAI ; `fail` coupe le flux, `hang` le suspend."""
+
+    def __init__(self, deltas, fail=False, hang=False):
+        self.deltas = deltas
+        self.fail = fail
+        self.hang = hang
+        self.closed = False
+
+    async def __aiter__(self):
+        for delta in self.deltas:
+            yield _chunk(delta)
+        if self.fail:
+            raise httpx.ReadError("connexion amont coupée")
+        if self.hang:
+            await asyncio.Event().wait()
+        yield b"data: [DONE]\n\n"
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Remplacer le client OpenAI par un serveur simulé ; la fixture retourne un setter du flux."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    current = {}
+
+    def handler(request):
+        assert request.url.path == "/v1/chat/completions"
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=current["body"])
+
+    def serve(body):
+        current["body"] = body
+        openai_chat._client = AsyncOpenAI(
+            api_key="test", base_url="http://openai.test/v1", max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        return body
+
+    yield serve
+    openai_chat._client = None
+
+
+def _app():
+    app = FastAPI()
+    app.include_router(chatbot.router, prefix="/api")
+    return app
+
+
+def _events(body: bytes):
+    frames = body.decode().split("\n\n")
+    assert frames[-1] == ""
+    return [json.loads(frame.removeprefix("data: ")) for frame in frames[:-1]]
+
+
+async def _post(message: str):
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/chat/stream", json={"user_id": USER, "message": message})
+
+
+def test_stream_is_framed_as_server_sent_events(mongo, run, upstream):
+    upstream(Upstream(["Bonjour", ", comment ", "allez-vous ?"]))
+
+    async def scenario():
+        response = await _post("Bonjour")
+        return response, await mongo["chat_history"].find_one({"user_id": USER})
+
+    response, history = run(scenario())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.content)
+    assert [e["delta"] for e in events[:-1]] == ["Bonjour", ", comment ", "allez-vous ?"]
+    assert events[-1] == {"done": True, "message": "Bonjour", "response": "Bonjour, comment allez-vous ?"}
+    assert history["response"] == "Bonjour, comment allez-vous ?"
+
+
+def test_upstream_error_mid_stream_ends_with_an_error_event(mongo, run, upstream):
+    upstream(Upstream(["Début"], fail=True))
+
+    async def scenario():
+        response = await _post("Bonjour")
+        return response, await mongo["chat_history"].count_documents({})
+
+    response, saved = run(scenario())
+
+    events = _events(response.content)
+    assert events[0] == {"delta": "Début"}
+    assert events[-1]["done"] is True
+    assert events[-1]["error"]
+    # Réponse tronquée : rien n'est enregistré
+    assert saved == 0
+
+
+def test_client_disconnect_closes_the_upstream_stream(mongo, run, upstream):
+    body = upstream(Upstream(["Début"], hang=True))
+
+    async def scenario():
+        disconnected = asyncio.Event()
+        sent = []
+        requests = [{"type": "http.request", "body": json.dumps({"user_id": USER, "message": "Bonjour"}).encode()}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body" and message["body"]:
+                disconnected.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/api/chat/stream", "raw_path": b"/api/chat/stream", "root_path": "",
+            "query_string": b"", "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+            "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        await asyncio.wait_for(_app()(scope, receive, send), timeout=5)
+        # Fermé dès la déconnexion, pas à la finalisation de la boucle
+        return sent, body.closed, await mongo["chat_history"].count_documents({})
+
+    sent, closed, saved = run(scenario())
+
+    bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+    assert bodies == [b'data: {"delta": "D\xc3\xa9but"}\n\n']
+    assert closed
+    assert saved == 0
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from pymongo import monitoring
+
+from app.config import Database, check_read_preferences
+
+
+class Listener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def test_invalid_read_preference_names_the_variable_and_the_choices():
+    with pytest.raises(ValueError, match="MONGO_READ_PREFERENCE_MEDECINS='secondaire'.*secondaryPreferred"):
+        check_read_preferences({"MONGO_READ_PREFERENCE": "primary", "MONGO_READ_PREFERENCE_MEDECINS": "secondaire"})
+
+
+def test_router_read_preference_is_validated_when_used(monkeypatch):
+    monkeypatch.setenv("MONGO_READ_PREFERENCE_PATIENTS", "Nearest")
+    database = Database()
+    try:
+        with pytest.raises(ValueError, match="MONGO_READ_PREFERENCE_PATIENTS"):
+            database.for_reads("patients")
+    finally:
+        database.close()
+
+
+def test_listeners_are_passed_to_the_client_and_cannot_be_added_later():
+    listener = Listener()
+    database = Database(listeners=[listener])
+    try:
+        assert database.client_options()["event_listeners"] == [listener]
+        database.database
+        with pytest.raises(RuntimeError):
+            database.add_listener(Listener())
+    finally:
+        database.close()
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import face_encoder as encoder_module
+from app.services.face_encoder import EncoderBusy, FaceEncoder, _encode_image
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    """cv2 et face_recognition factices : une photo 1920x1280 et un visage détecté sur la copie réduite."""
+    calls = {}
+
+    cv2 = SimpleNamespace(
+        IMREAD_COLOR=1, COLOR_BGR2RGB=4, INTER_AREA=3,
+        imdecode=lambda buffer, flags: np.zeros((1280, 1920, 3), np.uint8),
+        cvtColor=lambda image, code: image,
+        resize=lambda image, size, interpolation: np.zeros((size[1], size[0], 3), np.uint8),
+    )
+
+    def face_locations(image, model):
+        calls["detected_on"] = image.shape[:2]
+        return [(100, 300, 200, 150)]
+
+    def face_encodings(image, known_face_locations):
+        calls["encoded_on"] = image.shape[:2]
+        calls["boxes"] = known_face_locations
+        return [np.zeros(128)]
+
+    monkeypatch.setitem(sys.modules, "cv2", cv2)
+    monkeypatch.setitem(sys.modules, "face_recognition", SimpleNamespace(
+        face_locations=face_locations, face_encodings=face_encodings,
+    ))
+    return calls
+
+
+def test_boxes_are_reprojected_onto_the_full_image(detector):
+    encoding = _encode_image(b"jpeg", max_side=640)
+
+    assert len(encoding) == 128
+    # Détection sur la copie réduite au tiers, encodage en pleine résolution
+    assert detector["detected_on"] == (426, 640)
+    assert detector["encoded_on"] == (1280, 1920)
+    assert detector["boxes"] == [(300, 900, 600, 450)]
+
+
+def test_small_images_are_not_rescaled(detector):
+    _encode_image(b"jpeg", max_side=4000)
+
+    assert detector["detected_on"] == (1280, 1920)
+    assert detector["boxes"] == [(100, 300, 200, 150)]
+
+
+def test_queue_is_bounded(run, monkeypatch):
+    release = threading.Event()
+
+    def blocked_encode(data, max_side):
+        release.wait(5)
+        return [0.0] * 128, time.perf_counter()
+
+    monkeypatch.setattr(encoder_module, "_timed_encode", blocked_encode)
+    encoder = FaceEncoder(workers=2, queue_max=2)
+    encoder._executor = ThreadPoolExecutor(max_workers=2)
+
+    async def scenario():
+        tasks = [asyncio.create_task(encoder.encode(b"jpeg")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(EncoderBusy):
+            await encoder.encode(b"jpeg")
+        busy = encoder.metrics()
+        release.set()
+        await asyncio.gather(*tasks)
+        return busy, encoder.metrics()
+
+    try:
+        busy, done = run(scenario())
+    finally:
+        encoder.shutdown()
+
+    assert busy["queue_depth"] == 2
+    assert busy["rejected"] == 1
+    assert done["queue_depth"] == 0
+    assert done["completed"] == 2
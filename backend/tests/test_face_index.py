@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+import pytest
+
+np = pytest.importorskip("numpy")
+from bson import ObjectId
+
+from app import features
+from app.services import face_index as face_index_module
+from app.services.face_index import ENCODING_SIZE, FACE_EVENTS_COLLECTION, FaceIndex
+
+
+def encoding(position: int, value: float = 1.0) -> list[float]:
+    vector = [0.0] * ENCODING_SIZE
+    vector[position] = value
+    return vector
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        return self.setdefault(name, FakeCollection())
+
+
+class FakeCollection:
+    """Collection en mémoire : juste ce que l'index facial utilise."""
+
+    def __init__(self):
+        self.docs = []
+
+    @staticmethod
+    def _matches(doc, filter):
+        for field, condition in filter.items():
+            if isinstance(condition, dict) and "$gt" in condition:
+                if not doc.get(field) or doc[field] <= condition["$gt"]:
+                    return False
+            elif isinstance(condition, dict) and "$type" in condition:
+                if not isinstance(doc.get(field), list):
+                    return False
+            elif doc.get(field) != condition:
+                return False
+        return True
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def find(self, filter, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if self._matches(d, filter)])
+
+    async def find_one(self, filter, projection=None):
+        return next((dict(d) for d in self.docs if self._matches(d, filter)), None)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(face_index_module, "db", db)
+    return db
+
+
+@pytest.fixture(autouse=True)
+def face_login(monkeypatch):
+    monkeypatch.setattr(features, "enabled", lambda name: True)
+
+
+def test_search_matches_the_brute_force_distances():
+    index = FaceIndex()
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, ENCODING_SIZE)).astype(np.float32) * 0.1
+    for i, vector in enumerate(vectors):
+        index.upsert("Patient" if i % 2 else "Médecin", f"u{i}", f"user{i}", vector.tolist())
+    probe = vectors[17] + 0.01
+
+    candidates = index.search(probe.tolist(), k=3, tolerance=10.0)
+
+    expected = np.linalg.norm(vectors - probe, axis=1)
+    assert [c["_id"] for c in candidates] == [f"u{i}" for i in np.argsort(expected)[:3]]
+    assert candidates[0]["user_type"] == "Patient"
+    assert candidates[0]["distance"] == pytest.approx(float(expected[17]), abs=1e-4)
+
+
+def test_tolerance_is_an_inclusive_threshold():
+    index = FaceIndex()
+    index.upsert("Patient", "p1", "awa", encoding(0))
+    probe = encoding(0, 1.5)  # à 0.5 de l'encodage enregistré
+
+    assert index.match(probe)["username"] == "awa"
+    assert index.match(probe, tolerance=0.5)["_id"] == "p1"
+    assert index.match(probe, tolerance=0.4) is None
+
+
+def test_removal_keeps_the_matrix_contiguous():
+    index = FaceIndex()
+    for i in range(3):
+        index.upsert("Patient", f"p{i}", f"user{i}", encoding(i))
+
+    index.remove("Patient", "p0")
+    # Un encodage invalide retire l'utilisateur au lieu de l'indexer
+    index.upsert("Patient", "p1", "user1", [0.1] * 3)
+
+    assert len(index) == 1
+    assert index.match(encoding(2))["_id"] == "p2"
+    assert index.match(encoding(0)) is None
+
+
+def test_changes_reach_other_workers_through_events(run, fake_db):
+    users = fake_db["UserPatients"]
+    alice = {"_id": ObjectId(), "username": "alice", "face_encoding": encoding(0)}
+    bob = {"_id": ObjectId(), "username": "bob", "face_encoding": encoding(1)}
+    users.docs.append(alice)
+
+    async def scenario():
+        worker_a, worker_b = FaceIndex(), FaceIndex()
+        await worker_a.load(fake_db)
+        await worker_b.load(fake_db)
+
+        # Worker A enrôle bob, renomme puis supprime alice
+        users.docs.append(bob)
+        await worker_a.changed("Patient", str(bob["_id"]))
+        alice["username"] = "alice.diop"
+        await worker_a.changed("Patient", str(alice["_id"]))
+
+        before = worker_b.match(encoding(1))
+        applied = await worker_b.sync()
+        renamed = worker_b.match(encoding(0))["username"]
+
+        users.docs.remove(alice)
+        await worker_a.changed("Patient", str(alice["_id"]))
+        applied_again = await worker_b.sync()
+        return before, applied, renamed, applied_again, worker_b
+
+    before, applied, renamed, applied_again, worker_b = run(scenario())
+
+    assert before is None
+    assert applied == 2
+    assert worker_b.match(encoding(1))["username"] == "bob"
+    assert renamed == "alice.diop"
+    # Les événements déjà appliqués ne sont pas rejoués
+    assert applied_again == 1
+    assert worker_b.match(encoding(0)) is None
+    assert len(fake_db[FACE_EVENTS_COLLECTION].docs) == 3
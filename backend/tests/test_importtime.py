@@ -0,0 +1,35 @@
+import pytest
+
+from app.importtime import IMPORT_TIME_BUDGET_MS, LAZY_MODULES, TARGET, measure
+
+# Modules absents de certains environnements : remplacés par un module vide,
+# sans quoi app.main ne s'importe pas et le budget n'est jamais vérifié
+STUBS = {
+    "app.services.twofa": ["store_verification_code", "verify_code", "generate_verification_code"],
+}
+
+PRELUDE = f"""
+import importlib.util, sys, types
+for name, attrs in {STUBS!r}.items():
+    if importlib.util.find_spec(name) is None:
+        stub = types.ModuleType(name)
+        for attr in attrs:
+            setattr(stub, attr, lambda *args, **kwargs: None)
+        sys.modules[name] = stub
+"""
+
+
+@pytest.fixture(scope="module")
+def cold_import():
+    """Import à froid de app.main dans un interpréteur neuf (mesuré une fois pour le module)."""
+    return measure(prelude=PRELUDE)
+
+
+def test_heavy_modules_are_imported_on_first_use(cold_import):
+    _, loaded = cold_import
+    assert [m for m in LAZY_MODULES if m in loaded] == []
+
+
+def test_app_import_stays_within_budget(cold_import):
+    cumulative, _ = cold_import
+    assert cumulative[TARGET] / 1000 <= IMPORT_TIME_BUDGET_MS
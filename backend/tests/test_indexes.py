@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("motor")
+from pymongo import ASCENDING
+
+from app.indexes import QUERY_SHAPES, IndexConflict, ensure_indexes, find_collscans, migrate_indexes
+
+
+def test_registered_query_shapes_are_served_by_an_index(mongo, run):
+    async def scenario():
+        # Sur une collection vide ou absente le plan est EOF : un document par collection
+        for collection in {collection for _, collection, _ in QUERY_SHAPES}:
+            await mongo[collection].insert_one({"_seed": True})
+        return await find_collscans(mongo)
+
+    assert run(scenario()) == []
+
+
+def test_conflicting_index_is_reported_not_dropped(mongo, run):
+    async def scenario():
+        await mongo["UserPatients"].drop_indexes()
+        await mongo["UserPatients"].create_index([("username", ASCENDING)], name="username_unique", unique=True)
+        with pytest.raises(IndexConflict) as conflict:
+            await ensure_indexes(mongo)
+        return conflict.value, await mongo["UserPatients"].index_information()
+
+    conflict, indexes = run(scenario())
+
+    assert [(c, m.document["name"]) for c, m in conflict.conflicts] == [("UserPatients", "username")]
+    assert indexes["username_unique"]["unique"] is True
+
+
+def test_migrate_replaces_conflicting_indexes_explicitly(mongo, run):
+    async def scenario():
+        await mongo["UserPatients"].drop_indexes()
+        await mongo["UserPatients"].create_index([("username", ASCENDING)], name="username_unique", unique=True)
+        replaced = await migrate_indexes(mongo)
+        await ensure_indexes(mongo)
+        return replaced, await mongo["UserPatients"].index_information()
+
+    replaced, indexes = run(scenario())
+
+    assert [(c, m.document["name"]) for c, m in replaced] == [("UserPatients", "username")]
+    assert "username_unique" not in indexes
+    assert "username" in indexes
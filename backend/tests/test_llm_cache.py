@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.services import llm_cache as cache_module
+from app.services.llm_cache import LLMCache, cache_key, normalize_text
+
+
+def prompt(text):
+    return f"Symptômes : {text}"
+
+
+def test_symptom_lists_ignore_order_case_and_accents():
+    assert normalize_text("Fièvre, Toux et maux de tête", symptoms=True) == \
+        normalize_text("maux de tete et toux ; fievre", symptoms=True)
+
+
+def test_free_text_keeps_its_order():
+    a = "infection virale et non bacterienne"
+    b = "infection bacterienne et non virale"
+    assert normalize_text(a) != normalize_text(b)
+    assert cache_key("m", prompt, a) != cache_key("m", prompt, b)
+    assert cache_key("m", prompt, "Grippe  saisonnière.") == cache_key("m", prompt, "grippe saisonniere")
+
+
+class _Unavailable:
+    async def find_one(self, *args, **kwargs):
+        raise ServerSelectionTimeoutError("mongo injoignable")
+
+    async def update_one(self, *args, **kwargs):
+        raise ServerSelectionTimeoutError("mongo injoignable")
+
+
+def test_mongo_errors_degrade_to_a_miss(monkeypatch):
+    monkeypatch.setattr(cache_module, "db", {"llm_cache": _Unavailable()})
+    cache = LLMCache()
+
+    async def scenario():
+        assert await cache.get("k") is None
+        await cache.set("k", "réponse")
+        # La valeur reste servie depuis la mémoire
+        return await cache.get("k")
+
+    assert asyncio.run(scenario()) == "réponse"
+    assert cache.stats()["errors"] == 2
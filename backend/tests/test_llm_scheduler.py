@@ -0,0 +1,129 @@
+import asyncio
+import json
+import pytest
+
+httpx = pytest.importorskip("httpx")
+from fastapi import FastAPI
+
+from app.routes import assistant_ia, auth
+from app.services.llm import OllamaClient
+from app.services.llm_scheduler import LLMScheduler, QueueFull
+
+
+class FakeOllama:
+    """Faux serveur Ollama : note l'ordre des prompts et retient les générations jusqu'à `release()`."""
+
+    def __init__(self):
+        self.prompts = []
+        self.gate = asyncio.Event()
+
+    def release(self):
+        self.gate.set()
+
+    async def handler(self, request):
+        prompt = json.loads(request.content)["prompt"]
+        self.prompts.append(prompt)
+        await self.gate.wait()
+        return httpx.Response(200, json={"response": f"réponse à {prompt}", "done": True})
+
+    def scheduler(self, **options) -> LLMScheduler:
+        client = OllamaClient(base_url="http://ollama.test")
+        client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(self.handler))
+        return LLMScheduler(client=client, **options)
+
+
+async def _settle():
+    # Laisser chaque tâche atteindre la file ou le faux serveur
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_queue_is_served_by_priority_then_arrival(run):
+    async def scenario():
+        ollama = FakeOllama()
+        scheduler = ollama.scheduler(max_in_flight=1)
+        tasks = [asyncio.create_task(scheduler.generate("en cours"))]
+        await _settle()
+        for prompt, kind in [("libre", "libre"), ("traitement", "traitement"), ("diagnostic", "diagnostic")]:
+            tasks.append(asyncio.create_task(scheduler.generate(prompt, kind)))
+            await _settle()
+        ollama.release()
+        await asyncio.gather(*tasks)
+        return ollama.prompts
+
+    assert run(scenario()) == ["en cours", "diagnostic", "traitement", "libre"]
+
+
+def test_identical_prompts_share_one_generation(run):
+    async def scenario():
+        ollama = FakeOllama()
+        scheduler = ollama.scheduler()
+        tasks = [asyncio.create_task(scheduler.generate("toux", "diagnostic")) for _ in range(3)]
+        await _settle()
+        ollama.release()
+        return await asyncio.gather(*tasks), ollama.prompts, scheduler.stats()
+
+    results, prompts, stats = run(scenario())
+
+    assert results == ["réponse à toux"] * 3
+    assert prompts == ["toux"]
+    assert stats["deduplicated"] == 2
+
+
+def test_queue_wait_has_its_own_deadline(run):
+    async def scenario():
+        ollama = FakeOllama()
+        scheduler = ollama.scheduler(max_in_flight=1)
+        holder = asyncio.create_task(scheduler.generate("en cours"))
+        await _settle()
+        # Génération autorisée 60 s, mais au plus 50 ms d'attente d'un créneau
+        with pytest.raises(QueueFull):
+            await scheduler.generate("en attente", timeout=60, queue_timeout=0.05)
+        ollama.release()
+        await holder
+        return scheduler.stats()
+
+    stats = run(scenario())
+
+    assert stats["timed_out"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_full_queue_is_shed_with_429(run, monkeypatch):
+    async def scenario():
+        ollama = FakeOllama()
+        scheduler = ollama.scheduler(max_in_flight=1, max_queue=1)
+        monkeypatch.setattr(assistant_ia, "llm_scheduler", scheduler)
+        app = FastAPI()
+        app.include_router(assistant_ia.router, prefix="/api")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            post = lambda symptoms: client.post("/api/assistant-ia/", json={"symptoms": symptoms})
+            accepted = [asyncio.create_task(post("fièvre")), asyncio.create_task(post("toux"))]
+            await _settle()
+            rejected = await post("migraine")
+            ollama.release()
+            return rejected, await asyncio.gather(*accepted)
+
+    rejected, accepted = run(scenario())
+
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert [r.status_code for r in accepted] == [200, 200]
+
+
+@pytest.mark.parametrize("path", ["/api/assistant-ia/cache-stats", "/api/assistant-ia/queue-stats"])
+def test_stats_are_reserved_to_administrators(run, path):
+    app = FastAPI()
+    app.include_router(assistant_ia.router, prefix="/api")
+
+    async def get(user_type=None):
+        if user_type:
+            app.dependency_overrides[auth.get_current_user] = lambda: {"user_id": "u", "user_type": user_type}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return (await client.get(path)).status_code
+
+    assert run(get()) == 401
+    assert run(get("Médecin")) == 403
+    assert run(get("Admin")) == 200
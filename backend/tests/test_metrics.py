@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.services.metrics import (
+    BACKGROUND_ROUTE, Counter, Histogram, MetricsMiddleware, Registry, mongo_listener, registry,
+)
+
+
+def _mongo_command(name: str, micros: int = 2000):
+    """Simuler une commande MongoDB terminée, vue par le listener (sans serveur)."""
+    mongo_listener.succeeded(SimpleNamespace(command_name=name, duration_micros=micros))
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/{user_id}")
+    async def fiche(user_id: str):
+        _mongo_command("find")
+        _mongo_command("aggregate")
+        return {"user_id": user_id}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(registry.render())
+
+    return TestClient(app)
+
+
+def _samples(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_requests_are_labelled_by_route_template():
+    client = _client()
+    client.get("/metrics-test/abc")
+    client.get("/metrics-test/def")
+    client.get("/inconnue")
+
+    text = client.get("/metrics").text
+    samples = _samples(text)
+
+    assert samples['bienetre_http_requests_total{method="GET",route="/metrics-test/{user_id}",status="200"}'] == 2
+    assert samples['bienetre_http_requests_total{method="GET",route="<unmatched>",status="404"}'] >= 1
+    assert "abc" not in text
+    # /metrics lui-même n'est pas mesuré
+    assert 'route="/metrics"' not in text
+    assert samples['bienetre_http_request_duration_seconds_count{method="GET",route="/metrics-test/{user_id}"}'] == 2
+
+
+def test_mongo_commands_are_attributed_to_the_current_route():
+    client = _client()
+    client.get("/metrics-test/abc")
+    _mongo_command("find")
+
+    samples = _samples(client.get("/metrics").text)
+
+    route = "/metrics-test/{user_id}"
+    assert samples[f'bienetre_mongo_commands_total{{route="{route}",command="find",outcome="ok"}}'] >= 1
+    assert samples[f'bienetre_mongo_commands_total{{route="{route}",command="aggregate",outcome="ok"}}'] >= 1
+    # Hors requête, la commande est comptée en tâche de fond
+    assert samples[f'bienetre_mongo_commands_total{{route="{BACKGROUND_ROUTE}",command="find",outcome="ok"}}'] >= 1
+
+
+def test_text_exposition_format():
+    local = Registry()
+    hits = local.register(Counter("demo_total", "Démo", ("path",)))
+    latency = local.register(Histogram("demo_seconds", "Durée", ("path",), buckets=(0.1, 1)))
+    hits.inc('a"b\\c')
+    hits.inc('a"b\\c', amount=2)
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, "/x")
+
+    assert local.render().splitlines() == [
+        "# HELP demo_total Démo",
+        "# TYPE demo_total counter",
+        'demo_total{path="a\\"b\\\\c"} 3',
+        "# HELP demo_seconds Durée",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{path="/x",le="0.1"} 1',
+        'demo_seconds_bucket{path="/x",le="1"} 2',
+        'demo_seconds_bucket{path="/x",le="+Inf"} 3',
+        'demo_seconds_sum{path="/x"} 5.55',
+        'demo_seconds_count{path="/x"} 3',
+    ]
@@ -0,0 +1,33 @@
+from app.services.name_index import NameIndex
+
+
+def _index(*docs):
+    index = NameIndex()
+    for i, doc in enumerate(docs):
+        index.add(str(i), doc)
+    return index
+
+
+def test_exact_name_wins_over_a_longer_prefix_match():
+    index = _index(
+        {"nom": "Martin", "prenom": "Paul", "specialite": "Cardiologie"},
+        {"nom": "Martinez", "prenom": "Sofia", "specialite": "Dermatologie"},
+    )
+    best, candidates = index.best("Dr Martin")
+    assert best == "0"
+    assert len(candidates) == 2
+
+
+def test_margin_comparison_tolerates_float_rounding():
+    # Prénom et nom inversés : pas de correspondance exacte, 1.0 contre 0.9 (écart de 0.0999… en flottants)
+    index = _index({"nom": "Martin", "prenom": "Paul"}, {"nom": "Martinez", "prenom": "Paula"})
+    best, candidates = index.best("martin paul")
+    assert [score for score, _ in candidates] == [1.0, 0.9]
+    assert best == "0"
+
+
+def test_two_exact_matches_stay_ambiguous():
+    index = _index({"nom": "Martin", "prenom": "Paul"}, {"nom": "Martin", "prenom": "Claire"})
+    best, candidates = index.best("Martin")
+    assert best is None
+    assert {key for _, key in candidates} == {"0", "1"}
@@ -0,0 +1,117 @@
+import socket
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from app.services import outbox
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+        # Réponse SMTP imposée pour certains destinataires, ex: {"x@y": "550 ..."}
+        self.refuse = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return self.refuse[address]
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode("utf-8", "replace")))
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    monkeypatch.setattr(outbox, "SMTP_HOST", controller.hostname)
+    monkeypatch.setattr(outbox, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(outbox, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(outbox, "SMTP_USER", None)
+    yield inbox
+    controller.stop()
+
+
+def test_message_is_delivered_then_redacted(mongo, run, smtp):
+    async def scenario():
+        await outbox.enqueue_notification("verification", "patient@example.org", code="481516")
+        assert await outbox.dispatch_once() == 1
+        return await mongo["notifications_outbox"].find_one({})
+
+    notification = run(scenario())
+
+    assert len(smtp.messages) == 1
+    recipients, content = smtp.messages[0]
+    assert recipients == ["patient@example.org"]
+    assert "Votre code de vérification BienEtre" in content
+    assert "481516" in content
+
+    assert notification["status"] == "sent"
+    assert notification["sent_at"]
+    assert "params" not in notification
+
+
+def test_unreachable_server_schedules_a_retry(mongo, run, monkeypatch):
+    monkeypatch.setattr(outbox, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(outbox, "SMTP_PORT", _free_port())
+
+    async def scenario():
+        await outbox.enqueue_notification(
+            "creation", "patient@example.org", nom_medecin="Martin", date="2025-01-01", heure="09:00"
+        )
+        assert await outbox.dispatch_once() == 1
+        # Le message n'est pas repris avant la fin du délai de backoff
+        assert await outbox.dispatch_once() == 0
+        return await mongo["notifications_outbox"].find_one({})
+
+    notification = run(scenario())
+
+    assert notification["status"] == "pending"
+    assert notification["attempts"] == 1
+    assert notification["last_error"]
+    assert notification["params"]["nom_medecin"] == "Martin"
+    assert notification["next_attempt_at"] > notification["created_at"]
+
+
+def _notification(to):
+    return {"_id": to, "kind": "verification", "to": to, "params": {"code": "481516"}}
+
+
+def test_refusals_are_classified_permanent_or_temporary(smtp):
+    smtp.refuse = {"inconnu@example.org": "550 No such user", "plein@example.org": "452 Mailbox full"}
+    batch = [_notification(to) for to in ("inconnu@example.org", "plein@example.org", "patient@example.org")]
+
+    results = outbox._send_batch(batch)
+
+    assert results["inconnu@example.org"][1] is True
+    assert results["plein@example.org"][1] is False
+    assert results["patient@example.org"] is None
+    # Une erreur de connexion reste temporaire
+    assert not outbox.is_permanent(ConnectionRefusedError())
+
+
+def test_refused_recipient_is_dead_lettered_at_once(mongo, run, smtp):
+    smtp.refuse = {"inconnu@example.org": "550 No such user"}
+
+    async def scenario():
+        await outbox.enqueue_notification("verification", "inconnu@example.org", code="481516")
+        assert await outbox.dispatch_once() == 1
+        return await mongo["notifications_outbox"].find_one({})
+
+    notification = run(scenario())
+
+    assert notification["status"] == "dead"
+    assert notification["attempts"] == 1
+    assert "params" not in notification
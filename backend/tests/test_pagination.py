@@ -0,0 +1,21 @@
+from bson import ObjectId
+
+from app.services.pagination import NOM_KEY, decode_cursor, encode_cursor, prefix_filter, with_search_key
+
+
+def test_prefix_filter_is_case_sensitive_on_the_normalized_key():
+    query = prefix_filter("Lé")
+    assert query == {NOM_KEY: {"$regex": "^le"}}
+    assert with_search_key({"nom": "Lefèvre"})[NOM_KEY].startswith("le")
+
+
+def test_cursor_after_a_document_without_nom_keeps_the_remaining_ones():
+    last_id = ObjectId()
+    after = decode_cursor(NOM_KEY, encode_cursor(NOM_KEY, {"_id": last_id}))
+    assert {NOM_KEY: None, "_id": {"$gt": last_id}} in after["$or"]
+    assert {NOM_KEY: {"$ne": None}} in after["$or"]
+
+
+def test_descending_cursor_keeps_documents_without_value():
+    after = decode_cursor(NOM_KEY, encode_cursor(NOM_KEY, {"_id": ObjectId(), NOM_KEY: "dupont"}), direction=-1)
+    assert {NOM_KEY: None} in after["$or"]
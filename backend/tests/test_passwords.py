@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from passlib.hash import bcrypt
+
+from app.services import passwords
+from app.services.passwords import BCRYPT_ROUNDS, hash_password, verify_and_update, verify_password
+
+
+def test_hash_then_verify(run):
+    async def scenario():
+        hashed = await hash_password("s3cret!")
+        return hashed, await verify_password("s3cret!", hashed), await verify_password("autre", hashed)
+
+    hashed, valid, invalid = run(scenario())
+
+    assert bcrypt.from_string(hashed).rounds == BCRYPT_ROUNDS
+    assert valid and not invalid
+    assert passwords.password_metrics()["hash"]["count"] >= 1
+
+
+def test_hash_with_another_cost_is_upgraded_on_login(run):
+    old = bcrypt.using(rounds=4).hash("s3cret!")
+    current = bcrypt.using(rounds=BCRYPT_ROUNDS).hash("s3cret!")
+
+    valid, new_hash = run(verify_and_update("s3cret!", old))
+
+    assert valid
+    assert bcrypt.from_string(new_hash).rounds == BCRYPT_ROUNDS
+    assert bcrypt.verify("s3cret!", new_hash)
+    # Mauvais mot de passe ou coût déjà à jour : rien à réécrire
+    assert run(verify_and_update("autre", old)) == (False, None)
+    assert run(verify_and_update("s3cret!", current)) == (True, None)
+
+
+def test_semaphore_bounds_concurrent_hashes(run):
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def slow_hash(password):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return password
+
+    async def scenario():
+        # Pool plus large que le sémaphore : seule la borne limite le parallélisme
+        executor = ThreadPoolExecutor(max_workers=8)
+        semaphore = asyncio.Semaphore(2)
+        try:
+            return await asyncio.gather(*(
+                passwords._run("test", slow_hash, str(i), executor=executor, semaphore=semaphore)
+                for i in range(8)
+            ))
+        finally:
+            executor.shutdown()
+
+    assert run(scenario()) == [str(i) for i in range(8)]
+    assert running["max"] == 2
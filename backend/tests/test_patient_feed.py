@@ -0,0 +1,81 @@
+import pytest
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import dossiersmedicaux
+from app.services import patient_feed
+from app.services.patient_feed import attach_patient_fields, parse_fields
+
+
+class FakeCollection:
+    """Collection en mémoire qui note chaque filtre de `find`."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = []
+
+    def find(self, filter, projection):
+        self.finds.append(filter)
+        ids = filter["user_id"]["$in"]
+
+        async def cursor():
+            for doc in self.docs:
+                if doc["user_id"] in ids:
+                    yield {k: v for k, v in doc.items() if projection.get(k)}
+        return cursor()
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    fake = {
+        "patients": FakeCollection([
+            {"user_id": "p1", "nom": "Diop", "prenom": "Awa", "genre": "F"},
+            {"user_id": "p2", "nom": "Fall", "prenom": "Moussa", "genre": "M"},
+        ]),
+        "contacts": FakeCollection([{"user_id": "p1", "email": "awa@example.org", "telephone": "77"}]),
+        "adresses": FakeCollection([]),
+    }
+    monkeypatch.setattr(patient_feed, "db", fake)
+    return fake
+
+
+def test_unknown_fields_are_rejected():
+    assert parse_fields(None) == ["nom", "prenom"]
+    assert parse_fields(" nom, email ,") == ["nom", "email"]
+    with pytest.raises(ValueError, match="password"):
+        parse_fields("nom,password")
+
+
+def test_unknown_fields_answer_400(run):
+    app = FastAPI()
+    app.include_router(dossiersmedicaux.router, prefix="/dossiersmedicaux")
+
+    async def get():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/dossiersmedicaux/by-medecin/m1", params={"fields": "nom,password"})
+
+    response = run(get())
+
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+
+def test_one_batched_lookup_per_collection(run, collections):
+    rows = [{"patient_id": pid} for pid in ("p1", "p2", "p1", "p2")]
+
+    run(attach_patient_fields(rows, ["nom", "email"]))
+
+    assert [r["nom"] for r in rows] == ["Diop", "Fall", "Diop", "Fall"]
+    assert [len(c.finds) for c in collections.values()] == [1, 1, 0]
+    assert sorted(collections["patients"].finds[0]["user_id"]["$in"]) == ["p1", "p2"]
+
+
+def test_missing_patient_gets_empty_fields(run, collections):
+    rows = [{"patient_id": "p2"}, {"patient_id": "inconnu"}, {"motif": "sans patient"}]
+
+    run(attach_patient_fields(rows, ["prenom", "email"]))
+
+    assert rows[0] == {"patient_id": "p2", "prenom": "Moussa", "email": ""}
+    assert rows[1] == {"patient_id": "inconnu", "prenom": "", "email": ""}
+    assert rows[2] == {"motif": "sans patient", "prenom": "", "email": ""}
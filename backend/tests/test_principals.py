@@ -0,0 +1,118 @@
+from datetime import timedelta
+from types import SimpleNamespace
+import pytest
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from app.routes import auth
+from app.services import principals as principals_module
+from app.services.principals import AuthError, PrincipalCache
+from app.utils import create_access_token
+
+
+class FakeUsers:
+    """Collection de comptes en mémoire qui compte les lectures."""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    def add(self, username):
+        _id = ObjectId()
+        self.docs[_id] = {"_id": _id, "username": username}
+        return str(_id)
+
+    async def find_one(self, filter, projection=None):
+        self.reads += 1
+        return self.docs.get(filter["_id"])
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collections = {"UserPatients": FakeUsers(), "UserMedecins": FakeUsers(), "admins": FakeUsers()}
+    monkeypatch.setattr(principals_module, "db", collections)
+    return collections
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(principals_module, "time", SimpleNamespace(time=lambda: now["t"]))
+    return now
+
+
+def token(user_id, user_type="Patient", minutes=60):
+    return create_access_token({"sub": user_id, "user_type": user_type}, timedelta(minutes=minutes))
+
+
+def test_verified_tokens_are_served_from_cache_until_the_ttl(run, users, clock):
+    patients = users["UserPatients"]
+    jwt = token(patients.add("awa"))
+    cache = PrincipalCache(ttl=60)
+
+    first = run(cache.authenticate(jwt))
+    clock["t"] += 59
+    assert run(cache.authenticate(jwt)) == first
+    assert patients.reads == 1
+
+    clock["t"] += 2
+    run(cache.authenticate(jwt))
+    assert patients.reads == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_token_is_evicted(run, users, clock):
+    patients = users["UserPatients"]
+    a, b, c = (token(patients.add(name)) for name in ("a", "b", "c"))
+    cache = PrincipalCache(ttl=60, max_entries=2)
+
+    for jwt in (a, b, a, c):
+        run(cache.authenticate(jwt))
+    reads = patients.reads
+    run(cache.authenticate(a))
+    assert patients.reads == reads
+    run(cache.authenticate(b))
+    assert patients.reads == reads + 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_invalidate_user_drops_all_of_their_tokens(run, users, clock):
+    patients = users["UserPatients"]
+    user_id = patients.add("awa")
+    tokens = [token(user_id, minutes=m) for m in (30, 60)]
+    cache = PrincipalCache(ttl=60)
+    for jwt in tokens:
+        run(cache.authenticate(jwt))
+
+    # Compte supprimé : sans invalidation, le cache le servirait encore
+    del patients.docs[ObjectId(user_id)]
+    assert run(cache.authenticate(tokens[0]))["username"] == "awa"
+    cache.invalidate_user(user_id)
+
+    assert cache.stats()["entries"] == 0
+    for jwt in tokens:
+        with pytest.raises(AuthError, match="non trouvé"):
+            run(cache.authenticate(jwt))
+
+
+def test_admin_route_answers_403_to_other_users(run, users):
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    patient = token(users["UserPatients"].add("awa"))
+    admin = token(users["admins"].add("root"), "Admin")
+
+    async def get(jwt=None):
+        headers = {"Authorization": f"Bearer {jwt}"} if jwt else {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/auth/admin/me", headers=headers)
+
+    assert run(get()).status_code == 401
+    assert run(get("pas-un-jwt")).status_code == 401
+    # Authentifié mais pas administrateur : 403 (401 avant le cache)
+    assert run(get(patient)).status_code == 403
+    response = run(get(admin))
+    assert response.status_code == 200
+    assert response.json()["username"] == "root"
@@ -0,0 +1,122 @@
+import itertools
+from types import SimpleNamespace
+import pytest
+
+import httpx
+from fastapi import FastAPI
+
+from app import features
+from app.routes import medecins
+from app.services import query_recorder as recorder
+from app.services.query_recorder import QueryBudgetExceeded, QueryRecorderMiddleware, query_budget
+
+_request_ids = itertools.count()
+
+
+def _command(collection: str):
+    """Simuler une commande MongoDB vue par le listener (sans serveur)."""
+    event = SimpleNamespace(
+        command_name="find", command={"find": collection, "filter": {"user_id": "u"}},
+        request_id=next(_request_ids), duration_micros=100,
+    )
+    recorder.query_recorder.started(event)
+    recorder.query_recorder.succeeded(event)
+
+
+def _app(queries: int, budget: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryRecorderMiddleware)
+
+    @app.get("/fiche")
+    @query_budget(budget)
+    async def fiche():
+        for _ in range(queries):
+            _command("contacts")
+        return {"ok": True}
+
+    return app
+
+
+async def _call(app):
+    """Appel ASGI brut : messages envoyés au serveur et exception éventuelle."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/fiche", "raw_path": b"/fiche", "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"test")], "server": ("test", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    except QueryBudgetExceeded as e:
+        return sent, e
+    return sent, None
+
+
+def _statuses(sent):
+    return [m["status"] for m in sent if m["type"] == "http.response.start"]
+
+
+def test_strict_budget_fails_before_the_response_starts(run, monkeypatch):
+    monkeypatch.setattr(recorder, "QUERY_BUDGET_STRICT", True)
+
+    sent, error = run(_call(_app(queries=3, budget=2)))
+
+    # Aucun 200 n'est parti avant l'erreur : le client reçoit un 500 complet
+    assert _statuses(sent) == [500]
+    assert "3 requêtes MongoDB pour un budget de 2" in str(error)
+    assert "find contacts" in str(error)
+
+
+def test_strict_budget_lets_a_compliant_route_through(run, monkeypatch):
+    monkeypatch.setattr(recorder, "QUERY_BUDGET_STRICT", True)
+
+    sent, error = run(_call(_app(queries=2, budget=2)))
+
+    assert _statuses(sent) == [200]
+    assert error is None
+
+
+def test_exceeded_budget_is_counted_outside_strict_mode(run, monkeypatch):
+    monkeypatch.setattr(recorder, "QUERY_BUDGET_STRICT", False)
+    before = recorder.budget_exceeded._values.get(("/fiche",), 0)
+
+    sent, error = run(_call(_app(queries=3, budget=2)))
+
+    assert _statuses(sent) == [200]
+    assert error is None
+    assert recorder.budget_exceeded._values.get(("/fiche",), 0) == before + 1
+
+
+def test_create_medecin_stays_within_its_budget(mongo, run, monkeypatch):
+    monkeypatch.setattr(recorder, "QUERY_BUDGET_STRICT", True)
+    # 7 requêtes ; 9 quand l'empreinte faciale est indexée (événement + relecture)
+    expected = 9 if features.enabled("face_login") else 7
+    app = FastAPI()
+    app.add_middleware(QueryRecorderMiddleware)
+    app.include_router(medecins.router, prefix="/api/medecins")
+
+    def payload(username):
+        return {
+            "user": {"username": username, "password": "secret", "face_encoding": [0.1] * 128},
+            "medecin": {"nom": "Martin", "prenom": "Paul", "specialite": "Cardiologie"},
+            "adresse": {"ville": "Dakar"},
+            "contact": {"email": f"{username}@example.org"},
+        }
+
+    async def create(username):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/medecins/", json=payload(username))
+
+    assert run(create("dr.martin")).status_code == 200
+
+    # Le budget déclaré est serré : une requête de moins fait échouer la route
+    monkeypatch.setattr(medecins.create_medecin, "query_budget", expected - 1)
+    assert run(create("dr.martin2")).status_code == 500
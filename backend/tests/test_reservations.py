@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+
+pytest.importorskip("motor")
+
+from app.services.availability import jour_de_semaine, parse_date, invalidate_template, weekly_template
+from app.services.reservations import (
+    ACTIVE_FIELD, SlotTaken, SlotUnavailable, backfill_active_slots, reserver_creneau, slot_update,
+)
+
+MEDECIN = "medecin-concurrence"
+DATE = "2030-03-04"
+HEURE = "09:00"
+
+
+async def _open_slot(db):
+    await db["disponibilites"].insert_one(
+        {"medecin_id": MEDECIN, "jour": jour_de_semaine(parse_date(DATE)), "heures": [HEURE]}
+    )
+    invalidate_template(MEDECIN)
+
+
+def test_concurrent_bookings_of_one_slot_have_a_single_winner(mongo, run):
+    async def scenario():
+        await _open_slot(mongo)
+        results = await asyncio.gather(
+            *(reserver_creneau(MEDECIN, f"patient-{i}", DATE, HEURE, "Consultation", "test") for i in range(100)),
+            return_exceptions=True,
+        )
+        actifs = await mongo["rendezvous"].count_documents({"medecin_id": MEDECIN, ACTIVE_FIELD: True})
+        return results, actifs
+
+    results, actifs = run(scenario())
+
+    winners = [r for r in results if not isinstance(r, BaseException)]
+    losers = [r for r in results if isinstance(r, SlotTaken)]
+    assert len(winners) == 1
+    assert len(losers) == 99
+    assert actifs == 1
+
+
+def test_cancelled_booking_frees_the_slot(mongo, run):
+    async def scenario():
+        await _open_slot(mongo)
+        first = await reserver_creneau(MEDECIN, "patient-1", DATE, HEURE, "Consultation", "test")
+        await mongo["rendezvous"].update_one(
+            {"_id": first}, {"$set": {"statut": "Annulé"}, "$unset": {ACTIVE_FIELD: ""}}
+        )
+        return await reserver_creneau(MEDECIN, "patient-2", DATE, HEURE, "Consultation", "test")
+
+    assert run(scenario())
+
+
+def test_backfill_runs_once(mongo, run):
+    async def scenario():
+        # Rendez-vous antérieurs à l'index : pas de drapeau, dont un doublon
+        await mongo["rendezvous"].insert_many([
+            {"medecin_id": MEDECIN, "date": DATE, "heure": HEURE, "statut": "En attente", "created_at": 1},
+            {"medecin_id": MEDECIN, "date": DATE, "heure": HEURE, "statut": "Confirmé", "created_at": 2},
+        ])
+        await backfill_active_slots()
+        flags = sorted(
+            [d.get(ACTIVE_FIELD) async for d in mongo["rendezvous"].find({}).sort("created_at", 1)],
+            key=str,
+        )
+        await mongo["rendezvous"].insert_one(
+            {"medecin_id": "autre", "date": DATE, "heure": HEURE, "statut": "En attente", "created_at": 3}
+        )
+        await backfill_active_slots()
+        later = await mongo["rendezvous"].find_one({"medecin_id": "autre"})
+        return flags, later
+
+    flags, later = run(scenario())
+
+    assert flags == [False, True]
+    # Déjà migrée : le second démarrage ne parcourt plus la collection
+    assert ACTIVE_FIELD not in later
+
+
+def test_hour_closed_by_another_worker_is_not_bookable(mongo, run):
+    async def scenario():
+        await _open_slot(mongo)
+        # Gabarit mis en cache par ce worker, puis heure fermée par un autre (sans invalidation locale)
+        await weekly_template(MEDECIN)
+        await mongo["disponibilites"].update_one({"medecin_id": MEDECIN}, {"$set": {"heures": []}})
+        await reserver_creneau(MEDECIN, "patient-1", DATE, HEURE, "Consultation", "test")
+
+    with pytest.raises(SlotUnavailable):
+        run(scenario())
+
+
+def test_off_grid_hour_is_rejected_not_rounded(mongo, run):
+    async def scenario():
+        await _open_slot(mongo)
+        await reserver_creneau(MEDECIN, "patient-1", DATE, "09:07", "Consultation", "test")
+
+    with pytest.raises(SlotUnavailable):
+        run(scenario())
+
+
+HISTORIQUE = {"medecin_id": MEDECIN, "date": DATE, "heure": HEURE, "statut": "Confirmé", ACTIVE_FIELD: False}
+
+
+def test_editing_only_details_keeps_the_slot_flag():
+    assert slot_update(HISTORIQUE, {"type": "Suivi", "motif": "Contrôle"}) == {"$set": {"type": "Suivi", "motif": "Contrôle"}}
+    # Même valeur renvoyée par le formulaire : le créneau ne change pas
+    assert slot_update(HISTORIQUE, {"heure": HEURE, "motif": "Contrôle"}) == {"$set": {"heure": HEURE, "motif": "Contrôle"}}
+    assert slot_update(HISTORIQUE, {}) is None
+
+
+def test_moving_or_cancelling_updates_the_slot_flag():
+    assert slot_update(HISTORIQUE, {"heure": "10:00"}) == {"$set": {"heure": "10:00", ACTIVE_FIELD: True}}
+    assert slot_update(HISTORIQUE, {"statut": "Annulé"}) == {"$set": {"statut": "Annulé"}, "$unset": {ACTIVE_FIELD: ""}}
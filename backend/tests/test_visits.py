@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from app.services.leases import MIGRATIONS_COLLECTION
+from app.services.visits import LEGACY_COLLECTION, VISITES_VIEW, migrate_visites
+
+VISITE = {"patient_id": "p", "medecin_id": "m", "date_visite": "2024-05-02", "resume_visite": "Toux"}
+
+
+def test_legacy_visits_are_merged_once_then_served_by_the_view(mongo, run):
+    async def scenario():
+        await mongo["dossiersmedicaux"].insert_one({**VISITE, "diagnostic": "Bronchite"})
+        await mongo[VISITES_VIEW].insert_many([dict(VISITE), {**VISITE, "date_visite": "2024-06-10"}])
+
+        await migrate_visites()
+        await migrate_visites()
+
+        infos = await mongo.list_collections(filter={"name": VISITES_VIEW}).to_list(length=1)
+        return (
+            infos[0]["type"],
+            await mongo["dossiersmedicaux"].count_documents({}),
+            await mongo[LEGACY_COLLECTION].count_documents({}),
+            await mongo[MIGRATIONS_COLLECTION].find_one({"_id": "visites_view"}),
+        )
+
+    kind, dossiers, legacy, marker = run(scenario())
+
+    assert kind == "view"
+    # La visite déjà présente n'est pas dupliquée
+    assert dossiers == 2
+    assert legacy == 2
+    assert marker
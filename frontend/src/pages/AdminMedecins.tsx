@@ -45,6 +45,7 @@ interface MedecinFull {
 const AdminMedecins = () => {
   const navigate = useNavigate();
   const [medecins, setMedecins] = useState<MedecinFull[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [editingId, setEditingId] = useState<string | null>(null);
   const [showForm, setShowForm] = useState(false);
@@ -85,10 +86,13 @@ const AdminMedecins = () => {
     fetchMedecins();
   }, [navigate]);
 
-  const fetchMedecins = async () => {
+  const fetchMedecins = async (cursor?: string) => {
     try {
-      const res = await api.get("/medecins");
-      setMedecins(res.data);
+      const res = await api.get("/medecins", {
+        params: { sort: "nom", cursor },
+      });
+      setMedecins((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setNextCursor(res.headers["x-next-cursor"] ?? null);
     } catch (err) {
       console.error("Erreur lors du chargement des médecins :", err);
     } finally {
@@ -470,6 +474,15 @@ const AdminMedecins = () => {
             </tbody>
           </table>
         )}
+
+        {nextCursor && (
+          <button
+            className="mt-4 text-blue-600 hover:underline"
+            onClick={() => fetchMedecins(nextCursor)}
+          >
+            Charger plus de médecins
+          </button>
+        )}
       </div>
     </div>
   );
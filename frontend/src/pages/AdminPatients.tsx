@@ -43,6 +43,7 @@ interface FullPatient {
 const AdminPatients = () => {
   const navigate = useNavigate();
   const [patients, setPatients] = useState<FullPatient[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [editingId, setEditingId] = useState<string | null>(null);
   const [showForm, setShowForm] = useState(false);
@@ -83,10 +84,13 @@ const AdminPatients = () => {
     fetchPatients();
   }, [navigate]);
 
-  const fetchPatients = async () => {
+  const fetchPatients = async (cursor?: string) => {
     try {
-      const res = await api.get("/patients");
-      setPatients(res.data);
+      const res = await api.get("/patients", {
+        params: { sort: "nom", cursor },
+      });
+      setPatients((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setNextCursor(res.headers["x-next-cursor"] ?? null);
     } catch (err) {
       console.error("Erreur lors du chargement des patients :", err);
     } finally {
@@ -474,6 +478,15 @@ const AdminPatients = () => {
             </tbody>
           </table>
         )}
+
+        {nextCursor && (
+          <button
+            className="mt-4 text-blue-600 hover:underline"
+            onClick={() => fetchPatients(nextCursor)}
+          >
+            Charger plus de patients
+          </button>
+        )}
       </div>
     </div>
   );
@@ -70,8 +70,10 @@ const AjouterVisite = () => {
     const fetchAllergies = async () => {
       if (showAllergies && rendezvous?.patient_id) {
         try {
-          const res = await api.get(`/allergies/user/${rendezvous.patient_id}`);
-          setAllergies(res.data);
+          const res = await api.get(`/patients/${rendezvous.patient_id}/chart`, {
+            params: { sections: "allergies" },
+          });
+          setAllergies(res.data.allergies);
         } catch (error) {
           console.error(
             "Erreur lors de la récupération des allergies :",
@@ -1,5 +1,4 @@
 import { useState } from "react";
-import axios from "axios";
 import { FaRobot, FaStethoscope } from "react-icons/fa";
 
 const AssistantIA = () => {
@@ -16,14 +15,41 @@ const AssistantIA = () => {
     setError("");
 
     try {
-      const res = await axios.post("http://localhost:8000/assistant-ia/", {
-        symptoms,
+      const res = await fetch("http://localhost:8000/assistant-ia/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ symptoms }),
       });
+      if (res.status === 429) {
+        const delai = res.headers.get("Retry-After") ?? "quelques";
+        setError(`L'assistant IA est très sollicité. Réessayez dans ${delai} secondes.`);
+        return;
+      }
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+      // Flux NDJSON : une ligne {"response": fragment} par fragment généré
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let result = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() ?? "";
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const chunk = JSON.parse(line);
+          if (chunk.error) throw new Error(chunk.error);
+          if (chunk.response) {
+            result += chunk.response;
+            setResponse(result);
+          }
+        }
+      }
 
-      const result = res.data.response;
-      if (result && result.trim() !== "Pas de réponse.") {
-        setResponse(result.trim());
-      } else {
+      if (!result.trim()) {
         setResponse("Pas de réponse utile de l'IA pour cette requête.");
       }
     } catch (err: any) {
@@ -1,5 +1,4 @@
 import { useState, useEffect, useRef } from "react";
-import api from "../services/api";
 import { getUserSession } from "../services/auth";
 import { FaPaperPlane, FaRobot, FaUser } from "react-icons/fa";
 import SpeechRecognition, {
@@ -81,16 +80,41 @@ const Chatbox = () => {
     const userMessage: Message = { sender: "user", text: input };
 
     try {
-      const response = await api.post("http://127.0.0.1:8000/api/chat", {
-        user_id: user.user_id,
-        message: input,
+      const res = await fetch("http://127.0.0.1:8000/api/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ user_id: user.user_id, message: input }),
       });
-
-      const botMessage: Message = {
-        sender: "bot",
-        text: response.data.response,
-      };
-
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+      // Flux SSE : événements {"delta": ...} puis {"done": true, "response": ...}
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let text = "";
+      const showBot = (botText: string) =>
+        setMessages([...messages, userMessage, { sender: "bot", text: botText }]);
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const event of events) {
+          if (!event.startsWith("data: ")) continue;
+          const payload = JSON.parse(event.slice(6));
+          if (payload.error) throw new Error(payload.error);
+          if (payload.done) {
+            text = payload.response ?? text;
+          } else if (payload.delta) {
+            text += payload.delta;
+          }
+          showBot(text);
+        }
+      }
+
+      const botMessage: Message = { sender: "bot", text };
       const updatedMessages = [...messages, userMessage, botMessage];
       setMessages(updatedMessages);
       sessionStorage.setItem("chatHistory", JSON.stringify(updatedMessages));
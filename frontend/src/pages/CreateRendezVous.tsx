@@ -38,8 +38,17 @@ const CreateRendezvous = () => {
   useEffect(() => {
     const fetchMedecins = async () => {
       try {
-        const response = await api.get<MedecinType[]>("/medecins");
-        setMedecins(response.data);
+        // Liste paginée côté serveur : on suit X-Next-Cursor jusqu'à la dernière page
+        const tous: MedecinType[] = [];
+        let cursor: string | undefined;
+        do {
+          const response = await api.get<MedecinType[]>("/medecins", {
+            params: { sort: "nom", limit: 500, cursor },
+          });
+          tous.push(...response.data);
+          cursor = response.headers["x-next-cursor"] ?? undefined;
+        } while (cursor);
+        setMedecins(tous);
       } catch (error) {
         console.error(
           "❌ Erreur lors de la récupération des médecins :",
@@ -56,38 +65,11 @@ const CreateRendezvous = () => {
       const { medecin_id, date } = formData;
       if (!medecin_id || !date) return;
 
-      const dateParts = date.split("-");
-      const jsDate = new Date(
-        Number(dateParts[0]),
-        Number(dateParts[1]) - 1,
-        Number(dateParts[2])
-      );
-      const jours = [
-        "dimanche",
-        "lundi",
-        "mardi",
-        "mercredi",
-        "jeudi",
-        "vendredi",
-        "samedi",
-      ];
-      const jour = jours[jsDate.getDay()];
-      console.log("📅 Jour détecté:", jour);
-
       try {
-        console.log("📅 Jour détecté:", jour);
-        const dispoResponse = await api.get(
-          `/disponibilites/${medecin_id}/${jour}`
-        );
-        const occupeesResponse = await api.get(
-          `/rendezvous/occupees/${medecin_id}/${date}`
-        );
-
-        const toutes = dispoResponse.data.heures as string[];
-        const occupees = occupeesResponse.data.occupees as string[];
-
-        const libres = toutes.filter((h) => !occupees.includes(h));
-        setHeuresDisponibles(libres);
+        const response = await api.get(`/disponibilites/${medecin_id}/libres`, {
+          params: { from: date, to: date },
+        });
+        setHeuresDisponibles(response.data.jours[0]?.libres ?? []);
       } catch (error) {
         setHeuresDisponibles([]);
         console.error(
@@ -145,8 +127,18 @@ const CreateRendezvous = () => {
       setTimeout(() => navigate("/dashboard-patient"), 2000);
     } catch (error: any) {
       console.error("❌ Erreur lors de la création du rendez-vous :", error);
-      if (error.response && error.response.data && error.response.data.detail) {
-        alert(error.response.data.detail);
+      const detail = error.response?.data?.detail;
+      if (detail && typeof detail === "object") {
+        const alternatives = (detail.alternatives || [])
+          .map((a: { date: string; heure: string }) => `${a.date} à ${a.heure}`)
+          .join(", ");
+        alert(
+          alternatives
+            ? `${detail.message}\nCréneaux libres : ${alternatives}`
+            : detail.message
+        );
+      } else if (detail) {
+        alert(detail);
       }
     } finally {
       setLoading(false);
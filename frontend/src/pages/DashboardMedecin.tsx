@@ -58,23 +58,10 @@ const DashboardMedecin = () => {
 
   const fetchAppointments = async (userId: string) => {
     try {
-      const response = await api.get(`/rendezvous/${userId}`);
-      const allAppointments = response.data;
-
-      const withPatientNames = await Promise.all(
-        allAppointments.map(async (rdv: RendezvousType) => {
-          try {
-            const res = await api.get(`/patients/${rdv.patient_id}`);
-            return {
-              ...rdv,
-              nom: res.data?.patient?.nom || "",
-              prenom: res.data?.patient?.prenom || "",
-            };
-          } catch {
-            return { ...rdv, nom: "", prenom: "" };
-          }
-        })
-      );
+      const response = await api.get(`/rendezvous/${userId}`, {
+        params: { enrich: true, fields: "nom,prenom" },
+      });
+      const withPatientNames: RendezvousType[] = response.data;
 
       setAppointments(withPatientNames);
     } catch (error) {
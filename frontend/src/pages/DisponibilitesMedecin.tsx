@@ -31,38 +31,29 @@ const DisponibilitesMedecin = () => {
     const allDisponibilites: Record<string, string[]> = {};
     const allReservees: Record<string, string[]> = {};
 
-    for (const jour of joursSemaine) {
-      try {
-        const dispoRes = await api.get(`/disponibilites/${id}/${jour}`);
-        allDisponibilites[jour] = dispoRes.data.heures;
-
-        const rendezvousRes = await api.get(`/rendezvous/${id}`);
-        const rendezvous = rendezvousRes.data;
-
-        const joursFR = {
-          Monday: "lundi",
-          Tuesday: "mardi",
-          Wednesday: "mercredi",
-          Thursday: "jeudi",
-          Friday: "vendredi",
-        };
-
-        const heures = rendezvous
-          .filter((r: any) => {
-            const d = new Date(r.date);
-            const jourRDV =
-              joursFR[d.toLocaleDateString("fr-FR", { weekday: "long" })];
-            return (
-              r.medecin_id === id && jourRDV === jour && r.statut !== "Annulé"
-            );
-          })
-          .map((r: any) => r.heure);
+    const debut = new Date();
+    const fin = new Date();
+    fin.setDate(debut.getDate() + 6);
+    const toISO = (d: Date) =>
+      `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(
+        d.getDate()
+      ).padStart(2, "0")}`;
 
-        allReservees[jour] = heures;
-      } catch {
-        allDisponibilites[jour] = [];
-        allReservees[jour] = [];
+    try {
+      const res = await api.get(`/disponibilites/${id}/libres`, {
+        params: { from: toISO(debut), to: toISO(fin) },
+      });
+      for (const j of res.data.jours) {
+        allDisponibilites[j.jour] = j.heures;
+        allReservees[j.jour] = j.reservees;
       }
+    } catch {
+      // On affiche des listes vides en cas d'erreur
+    }
+
+    for (const jour of joursSemaine) {
+      allDisponibilites[jour] = allDisponibilites[jour] || [];
+      allReservees[jour] = allReservees[jour] || [];
     }
 
     setDisponibilites(allDisponibilites);
@@ -21,47 +21,42 @@ interface DossierMedical {
 
 const DossierMedical = () => {
   const [dossiers, setDossiers] = useState<DossierMedical[]>([]);
-  const [filtered, setFiltered] = useState<DossierMedical[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [filters, setFilters] = useState({
     date: "",
     periodeDebut: "",
     periodeFin: "",
   });
 
-  useEffect(() => {
+  // Les filtres sont appliqués par l'API : une date précise, sinon une période
+  const dateParams = () =>
+    filters.date
+      ? { from: filters.date, to: filters.date }
+      : {
+          from: filters.periodeDebut || undefined,
+          to: filters.periodeFin || undefined,
+        };
+
+  const fetchDossiers = async (cursor?: string) => {
     const session = getUserSession();
     const patientId = session?.user_id;
     if (!patientId || session.user_type !== "Patient") return;
 
-    const fetchDossiers = async () => {
-      try {
-        const res = await api.get(`/dossiersmedicaux/${patientId}`);
-        setDossiers(res.data);
-        setFiltered(res.data);
-      } catch (error) {
-        console.error("Erreur lors de la récupération des dossiers :", error);
-      }
-    };
-
-    fetchDossiers();
-  }, []);
+    try {
+      const res = await api.get(`/dossiersmedicaux/${patientId}`, {
+        params: { cursor, ...dateParams() },
+      });
+      setDossiers((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setNextCursor(res.headers["x-next-cursor"] ?? null);
+    } catch (error) {
+      console.error("Erreur lors de la récupération des dossiers :", error);
+    }
+  };
 
+  // Nouveau filtre : on repart de la première page
   useEffect(() => {
-    const result = dossiers.filter((d) => {
-      const matchDate = filters.date
-        ? d.date_visite.startsWith(filters.date)
-        : true;
-
-      const matchPeriode =
-        filters.periodeDebut && filters.periodeFin
-          ? d.date_visite >= filters.periodeDebut &&
-            d.date_visite <= filters.periodeFin
-          : true;
-
-      return matchDate && matchPeriode;
-    });
-    setFiltered(result);
-  }, [filters, dossiers]);
+    fetchDossiers();
+  }, [filters]);
 
   const handleChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const { name, value } = e.target;
@@ -113,12 +108,12 @@ const DossierMedical = () => {
           />
         </div>
 
-        {filtered.length === 0 ? (
+        {dossiers.length === 0 ? (
           <p className="text-center text-gray-500">
             Aucun dossier médical disponible pour les filtres sélectionnés.
           </p>
         ) : (
-          filtered.map((dossier) => (
+          dossiers.map((dossier) => (
             <div
               key={dossier._id}
               className="border border-gray-300 rounded p-4 mb-6 shadow-sm bg-white"
@@ -201,6 +196,15 @@ const DossierMedical = () => {
             </div>
           ))
         )}
+
+        {nextCursor && (
+          <button
+            className="mt-4 text-blue-600 hover:underline"
+            onClick={() => fetchDossiers(nextCursor)}
+          >
+            Charger plus de dossiers
+          </button>
+        )}
       </div>
     </div>
   );
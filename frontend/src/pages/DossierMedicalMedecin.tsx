@@ -39,68 +39,66 @@ const DossierMedicalMedecin = () => {
   });
   const [isEditing, setIsEditing] = useState<string | null>(null);
   const [formData, setFormData] = useState<Partial<DossierMedical>>({});
-
-  useEffect(() => {
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+
+  // Les filtres de date sont appliqués par l'API : une date précise, sinon une période
+  const dateParams = () =>
+    filters.date
+      ? { from: filters.date, to: filters.date }
+      : {
+          from: filters.periodeDebut || undefined,
+          to: filters.periodeFin || undefined,
+        };
+
+  const fetchDossiers = async (cursor?: string) => {
     const session = getUserSession();
     if (!session || session.user_type !== "Médecin") return;
-    setUser(session);
 
-    const fetchDossiers = async () => {
-      try {
-        const res = await api.get(
-          `/dossiersmedicaux/by-medecin/${session.user_id}`
-        );
-        const dossiers = res.data;
+    try {
+      const res = await api.get(
+        `/dossiersmedicaux/by-medecin/${session.user_id}`,
+        {
+          params: {
+            enrich: true,
+            fields: "nom,prenom",
+            cursor,
+            ...dateParams(),
+          },
+        }
+      );
+      const dossiersWithNames: DossierMedical[] = res.data;
 
-        const dossiersWithNames = await Promise.all(
-          dossiers.map(async (d: DossierMedical) => {
-            try {
-              const p = await api.get(`/patients/${d.patient_id}`);
-              return {
-                ...d,
-                nom: p.data.patient.nom,
-                prenom: p.data.patient.prenom,
-              };
-            } catch {
-              return d;
-            }
-          })
-        );
+      setDossiers((prev) => (cursor ? [...prev, ...dossiersWithNames] : dossiersWithNames));
+      setNextCursor(res.headers["x-next-cursor"] ?? null);
+    } catch (error) {
+      console.error("Erreur lors du chargement des dossiers:", error);
+    } finally {
+      setLoading(false);
+    }
+  };
 
-        setDossiers(dossiersWithNames);
-        setFiltered(dossiersWithNames);
-      } catch (error) {
-        console.error("Erreur lors du chargement des dossiers:", error);
-      } finally {
-        setLoading(false);
-      }
-    };
+  useEffect(() => {
+    const session = getUserSession();
+    if (!session || session.user_type !== "Médecin") return;
+    setUser(session);
+  }, []);
 
+  // Nouveau filtre de date : on repart de la première page
+  useEffect(() => {
     fetchDossiers();
-  }, []);
+  }, [filters.date, filters.periodeDebut, filters.periodeFin]);
 
   useEffect(() => {
+    // Le nom du patient n'est connu qu'après enrichissement : filtré sur les pages chargées
     const search = filters.nom.toLowerCase();
-    const result = dossiers.filter((d) => {
-      const matchNom =
+    const result = dossiers.filter(
+      (d) =>
         d.nom?.toLowerCase().includes(search) ||
         d.prenom?.toLowerCase().includes(search) ||
-        search === "";
-
-      const matchDate = filters.date
-        ? d.date_visite?.startsWith(filters.date)
-        : true;
-
-      const matchPeriode =
-        filters.periodeDebut && filters.periodeFin
-          ? d.date_visite >= filters.periodeDebut &&
-            d.date_visite <= filters.periodeFin
-          : true;
-
-      return matchNom && matchDate && matchPeriode;
-    });
+        search === ""
+    );
     setFiltered(result);
-  }, [filters, dossiers]);
+  }, [filters.nom, dossiers]);
 
   const handleChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const { name, value } = e.target;
@@ -397,6 +395,15 @@ const DossierMedicalMedecin = () => {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <button
+          className="mt-4 text-blue-600 hover:underline"
+          onClick={() => fetchDossiers(nextCursor)}
+        >
+          Charger plus de dossiers
+        </button>
+      )}
     </div>
   );
 };
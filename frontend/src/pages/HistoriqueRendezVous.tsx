@@ -31,24 +31,10 @@ const HistoriqueRendezVous = () => {
 
     const fetchAppointments = async () => {
       try {
-        const response = await api.get(`/rendezvous/${user.user_id}`);
-        const data: RendezvousType[] = response.data;
-
-        // Obtener nombres de pacientes
-        const rendezvousWithNames = await Promise.all(
-          data.map(async (rdv) => {
-            try {
-              const patientRes = await api.get(`/patients/${rdv.patient_id}`);
-              return {
-                ...rdv,
-                nom: patientRes.data?.patient?.nom || "",
-                prenom: patientRes.data?.patient?.prenom || "",
-              };
-            } catch {
-              return { ...rdv, nom: "", prenom: "" };
-            }
-          })
-        );
+        const response = await api.get(`/rendezvous/${user.user_id}`, {
+          params: { enrich: true, fields: "nom,prenom", include_archive: true },
+        });
+        const rendezvousWithNames: RendezvousType[] = response.data;
 
         setAppointments(rendezvousWithNames);
         setFiltered(rendezvousWithNames);